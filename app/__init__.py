@@ -1,7 +1,9 @@
 # app/__init__.py
 import os
 from flask import Flask, redirect, url_for, flash
-from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import orm
+from sqlalchemy.sql.dml import UpdateBase
 from flask_migrate import Migrate
 from flask_login import LoginManager, login_required, current_user, logout_user
 from flask_caching import Cache
@@ -11,8 +13,42 @@ from app.logging_config import setup_logging
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
 
+# Bind da réplica de leitura (DATABASE_REPLICA_URL) e marca na sessão das
+# rotas @somente_leitura (app/decorators.py)
+BIND_REPLICA = 'replica'
+SESSAO_SOMENTE_LEITURA = 'somente_leitura'
+
+
+class SessaoRoteada(SignallingSession):
+    """
+    Sessão que envia as consultas das rotas @somente_leitura para a réplica.
+
+    Continuam no primário: flush (INSERT/UPDATE/DELETE do ORM), comandos
+    INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE e conexões pedidas sem
+    consulta (session.connection()). Sem réplica configurada, tudo vai para
+    o primário.
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        if (self.info.get(SESSAO_SOMENTE_LEITURA)
+                and not self._flushing
+                and (mapper is not None or clause is not None)
+                and not isinstance(clause, UpdateBase)
+                and getattr(clause, '_for_update_arg', None) is None
+                and BIND_REPLICA in (self.app.config.get('SQLALCHEMY_BINDS') or {})):
+            return db.get_engine(self.app, bind=BIND_REPLICA)
+        return super().get_bind(mapper, clause)
+
+
+class SQLAlchemyRoteado(SQLAlchemy):
+    """SQLAlchemy do Flask-SQLAlchemy usando a SessaoRoteada."""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=SessaoRoteada, db=self, **options)
+
+
 # Instâncias das extensões
-db = SQLAlchemy()
+db = SQLAlchemyRoteado()
 login_manager = LoginManager()
 cache = Cache()
 
@@ -48,6 +84,14 @@ def create_app():
         'DATABASE_URL', 'sqlite:///doug_moving.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     # app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Pool de conexões (DB_POOL_SIZE, DB_MAX_OVERFLOW, ... em app/config/database.py)
+    from .utils.pool_banco import opcoes_engine
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_engine(
+        app.config['SQLALCHEMY_DATABASE_URI'])
+    # Réplica de leitura (opcional) para relatórios, dashboard e auditoria
+    if os.environ.get('DATABASE_REPLICA_URL'):
+        app.config['SQLALCHEMY_BINDS'] = {
+            BIND_REPLICA: os.environ['DATABASE_REPLICA_URL']}
     # Para não mostrar as queries SQL no terminal.
     app.config['SQLALCHEMY_ECHO'] = False
     app.config['UPLOAD_FOLDER'] = os.path.join(os.path.abspath(
@@ -57,6 +101,12 @@ def create_app():
     app.config['CACHE_TYPE'] = 'SimpleCache'  # Cache em memória
     app.config['CACHE_DEFAULT_TIMEOUT'] = 3600  # 1 hora
 
+    # Retenção da auditoria: meses mantidos no banco e pasta dos arquivos
+    app.config['AUDIT_RETENCAO_MESES'] = int(
+        os.environ.get('AUDIT_RETENCAO_MESES', '12'))
+    app.config['AUDIT_ARQUIVO_DIR'] = os.environ.get(
+        'AUDIT_ARQUIVO_DIR', os.path.join('arquivos', 'auditoria'))
+
     # ✅ ADICIONAR: Configurar logging
     setup_logging(app)
 
@@ -73,10 +123,20 @@ def create_app():
     def load_user(user_id):
         return User.query.get(int(user_id))
 
+    @login_manager.request_loader
+    def load_user_from_request(request):
+        # Integrações via API: Authorization: Bearer <token>
+        autorizacao = request.headers.get('Authorization', '')
+        if autorizacao.startswith('Bearer '):
+            return User.buscar_por_token_api(autorizacao[7:].strip())
+        return None
+
     # Aponta para a rota 'login' dentro do blueprint 'auth'
     login_manager.login_view = 'auth.login'
     login_manager.login_message = "Por favor, faça o login para acessar esta página."
     login_manager.login_message_category = "info"
+    # API: sem redirecionamento para o login, responde 401
+    login_manager.blueprint_login_views['api'] = None
 
     # --- REGISTRO DOS BLUEPRINTS ---
     # Importa e registra cada blueprint da sua nova estrutura
@@ -117,6 +177,10 @@ def create_app():
     from .blueprints.operador import operador_bp
     app.register_blueprint(operador_bp)
 
+    # Registrar blueprint da API de integração
+    from .blueprints.api import api_bp
+    app.register_blueprint(api_bp)
+
     # --- FILTROS PERSONALIZADOS DO JINJA2 ---
 
     @app.template_filter('number_format')
@@ -135,6 +199,14 @@ def create_app():
         from flask import render_template
         return render_template('offline.html')
 
+    # --- SERVICE WORKER (ESCOPO '/') ---
+    @app.route('/service-worker.js')
+    def service_worker():
+        """Service worker servido na raiz: o escopo cobre /motorista e a API do app."""
+        resposta = app.send_static_file('service-worker.js')
+        resposta.headers['Cache-Control'] = 'no-cache'
+        return resposta
+
     # --- ROTA INSTRUÇÕES DE INSTALAÇÃO PWA ---
     @app.route('/instalar')
     def instalar():
@@ -14,6 +14,7 @@ Estrutura Modular:
 - agrupamento.py: Agrupamento de solicitações
 - viagens.py: Gestão de viagens
 - configuracoes.py: Configurações e importações
+- linhas_fixas.py: Linhas fixas (solicitações recorrentes)
 
 Autor: Sistema Go Mobi
 Data: 2024-10-13
@@ -45,6 +46,7 @@ from . import agrupamento
 from . import viagens
 from . import configuracoes
 from . import fretados
+from . import linhas_fixas
 # =============================================================================
 # INFORMAÇÕES DO MÓDULO
 # =============================================================================
@@ -63,6 +65,7 @@ MODULOS_CARREGADOS = [
     'viagens',
     'fretados',
     'configuracoes',
+    'linhas_fixas',
 ]
 
 
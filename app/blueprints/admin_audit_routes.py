@@ -26,14 +26,21 @@ import csv
 
 from .. import db
 from ..models import AuditLog, ViagemAuditoria, Viagem, User, Motorista
-from ..decorators import role_required
+from ..decorators import role_required, somente_leitura
 from ..utils.admin_audit import (
     get_user_activity,
     get_viagem_history,
     get_recent_logs,
     get_failed_operations,
+    get_contadores_resumo,
+    get_estatisticas_periodo,
     AuditAction
 )
+from ..utils.audit_particoes import (
+    filtrar_periodo,
+    get_contadores_viagens,
+    get_filtros_auditoria
+)
 
 # Blueprint
 audit_bp = Blueprint('audit', __name__, url_prefix='/admin/audit')
@@ -46,6 +53,7 @@ audit_bp = Blueprint('audit', __name__, url_prefix='/admin/audit')
 @audit_bp.route('/')
 @login_required
 @role_required('admin')
+@somente_leitura
 def logs_gerais():
     """Página principal de logs gerais do sistema."""
     
@@ -75,19 +83,8 @@ def logs_gerais():
         query = query.filter_by(severity=severity)
     if status:
         query = query.filter_by(status=status)
-    if data_inicio:
-        try:
-            dt_inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
-            query = query.filter(AuditLog.timestamp >= dt_inicio)
-        except:
-            pass
-    if data_fim:
-        try:
-            dt_fim = datetime.strptime(data_fim, '%Y-%m-%d')
-            dt_fim = dt_fim.replace(hour=23, minute=59, second=59)
-            query = query.filter(AuditLog.timestamp <= dt_fim)
-        except:
-            pass
+    # Filtro de período sobre a chave de particionamento (partition pruning)
+    query = filtrar_periodo(query, AuditLog.timestamp, data_inicio, data_fim)
     
     # Ordena e pagina
     logs_pagination = query.order_by(desc(AuditLog.timestamp)).paginate(
@@ -96,36 +93,21 @@ def logs_gerais():
         error_out=False
     )
     
-    # Estatísticas rápidas
-    total_logs = AuditLog.query.count()
-    logs_hoje = AuditLog.query.filter(
-        AuditLog.timestamp >= datetime.utcnow().replace(hour=0, minute=0, second=0)
-    ).count()
-    logs_erro = AuditLog.query.filter(
-        AuditLog.status.in_(['FAILED', 'ERROR'])
-    ).count()
-    
-    # Lista de ações disponíveis para filtro
-    acoes_disponiveis = db.session.query(AuditLog.action).distinct().all()
-    acoes_disponiveis = [a[0] for a in acoes_disponiveis]
+    # Estatísticas rápidas (rollup diário)
+    contadores = get_contadores_resumo()
     
-    # Lista de tipos de recurso para filtro
-    recursos_disponiveis = db.session.query(AuditLog.resource_type).distinct().all()
-    recursos_disponiveis = [r[0] for r in recursos_disponiveis]
-    
-    # Lista de usuários para filtro
-    usuarios = User.query.all()
+    # Listas de ações e tipos de recurso para filtro (em cache)
+    filtros_disponiveis = get_filtros_auditoria()
     
     return render_template(
         'admin/audit_logs.html',
         logs=logs_pagination.items,
         pagination=logs_pagination,
-        total_logs=total_logs,
-        logs_hoje=logs_hoje,
-        logs_erro=logs_erro,
-        acoes_disponiveis=acoes_disponiveis,
-        recursos_disponiveis=recursos_disponiveis,
-        usuarios=usuarios,
+        total_logs=contadores['total_logs'],
+        logs_hoje=contadores['logs_hoje'],
+        logs_erro=contadores['logs_erro'],
+        acoes_disponiveis=filtros_disponiveis['acoes'],
+        recursos_disponiveis=filtros_disponiveis['recursos'],
         filtros={
             'action': action,
             'resource_type': resource_type,
@@ -141,6 +123,7 @@ def logs_gerais():
 @audit_bp.route('/viagens')
 @login_required
 @role_required('admin')
+@somente_leitura
 def logs_viagens():
     """Página de logs específicos de viagens."""
     
@@ -163,19 +146,7 @@ def logs_viagens():
         query = query.filter_by(motorista_id=motorista_id)
     if action:
         query = query.filter_by(action=action)
-    if data_inicio:
-        try:
-            dt_inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
-            query = query.filter(ViagemAuditoria.timestamp >= dt_inicio)
-        except:
-            pass
-    if data_fim:
-        try:
-            dt_fim = datetime.strptime(data_fim, '%Y-%m-%d')
-            dt_fim = dt_fim.replace(hour=23, minute=59, second=59)
-            query = query.filter(ViagemAuditoria.timestamp <= dt_fim)
-        except:
-            pass
+    query = filtrar_periodo(query, ViagemAuditoria.timestamp, data_inicio, data_fim)
     
     # Ordena e pagina
     logs_pagination = query.order_by(desc(ViagemAuditoria.timestamp)).paginate(
@@ -184,34 +155,21 @@ def logs_viagens():
         error_out=False
     )
     
-    # Estatísticas
-    total_logs = ViagemAuditoria.query.count()
-    viagens_aceitas_hoje = ViagemAuditoria.query.filter(
-        and_(
-            ViagemAuditoria.action == 'VIAGEM_ACEITA',
-            ViagemAuditoria.timestamp >= datetime.utcnow().replace(hour=0, minute=0, second=0)
-        )
-    ).count()
-    cancelamentos_hoje = ViagemAuditoria.query.filter(
-        and_(
-            ViagemAuditoria.action.in_(['VIAGEM_CANCELADA', 'MOTORISTA_DESASSOCIADO']),
-            ViagemAuditoria.timestamp >= datetime.utcnow().replace(hour=0, minute=0, second=0)
-        )
-    ).count()
-    
-    # Listas para filtros
-    acoes_disponiveis = db.session.query(ViagemAuditoria.action).distinct().all()
-    acoes_disponiveis = [a[0] for a in acoes_disponiveis]
-    
-    motoristas = Motorista.query.all()
+    # Estatísticas (contadores em cache)
+    contadores = get_contadores_viagens()
+    
+    # Listas para filtros (em cache)
+    filtros_disponiveis = get_filtros_auditoria()
+    acoes_disponiveis = filtros_disponiveis['acoes_viagem']
+    motoristas = filtros_disponiveis['motoristas']
     
     return render_template(
         'admin/audit_viagens.html',
         logs=logs_pagination.items,
         pagination=logs_pagination,
-        total_logs=total_logs,
-        viagens_aceitas_hoje=viagens_aceitas_hoje,
-        cancelamentos_hoje=cancelamentos_hoje,
+        total_logs=contadores['total_logs'],
+        viagens_aceitas_hoje=contadores['viagens_aceitas_hoje'],
+        cancelamentos_hoje=contadores['cancelamentos_hoje'],
         acoes_disponiveis=acoes_disponiveis,
         motoristas=motoristas,
         filtros={
@@ -227,6 +185,7 @@ def logs_viagens():
 @audit_bp.route('/viagem/<int:viagem_id>/historico')
 @login_required
 @role_required('admin')
+@somente_leitura
 def historico_viagem(viagem_id):
     """Exibe histórico completo de uma viagem específica."""
     
@@ -243,6 +202,7 @@ def historico_viagem(viagem_id):
 @audit_bp.route('/usuario/<int:user_id>/atividades')
 @login_required
 @role_required('admin')
+@somente_leitura
 def atividades_usuario(user_id):
     """Exibe atividades de um usuário específico."""
     
@@ -261,6 +221,7 @@ def atividades_usuario(user_id):
 @audit_bp.route('/falhas')
 @login_required
 @role_required('admin')
+@somente_leitura
 def operacoes_falhadas():
     """Exibe operações que falharam."""
     
@@ -280,6 +241,7 @@ def operacoes_falhadas():
 @audit_bp.route('/api/log/<int:log_id>')
 @login_required
 @role_required('admin')
+@somente_leitura
 def detalhes_log(log_id):
     """Retorna detalhes de um log específico em JSON."""
     
@@ -290,6 +252,7 @@ def detalhes_log(log_id):
 @audit_bp.route('/api/viagem-audit/<int:audit_id>')
 @login_required
 @role_required('admin')
+@somente_leitura
 def detalhes_viagem_audit(audit_id):
     """Retorna detalhes de um log de viagem em JSON."""
     
@@ -300,60 +263,23 @@ def detalhes_viagem_audit(audit_id):
 @audit_bp.route('/api/estatisticas')
 @login_required
 @role_required('admin')
+@somente_leitura
 def estatisticas():
-    """Retorna estatísticas gerais de auditoria."""
+    """Retorna estatísticas gerais de auditoria (a partir do rollup diário)."""
     
     # Período (últimos 7 dias por padrão)
     dias = request.args.get('dias', 7, type=int)
-    data_inicio = datetime.utcnow() - timedelta(days=dias)
-    
-    # Total de logs
-    total_logs = AuditLog.query.filter(
-        AuditLog.timestamp >= data_inicio
-    ).count()
-    
-    # Logs por dia
-    logs_por_dia = db.session.query(
-        db.func.date(AuditLog.timestamp).label('dia'),
-        db.func.count(AuditLog.id).label('total')
-    ).filter(
-        AuditLog.timestamp >= data_inicio
-    ).group_by('dia').all()
-    
-    # Ações mais comuns
-    acoes_comuns = db.session.query(
-        AuditLog.action,
-        db.func.count(AuditLog.id).label('total')
-    ).filter(
-        AuditLog.timestamp >= data_inicio
-    ).group_by(AuditLog.action).order_by(desc('total')).limit(10).all()
-    
-    # Usuários mais ativos
-    usuarios_ativos = db.session.query(
-        AuditLog.user_name,
-        db.func.count(AuditLog.id).label('total')
-    ).filter(
-        and_(
-            AuditLog.timestamp >= data_inicio,
-            AuditLog.user_name.isnot(None)
-        )
-    ).group_by(AuditLog.user_name).order_by(desc('total')).limit(10).all()
-    
-    # Erros
-    total_erros = AuditLog.query.filter(
-        and_(
-            AuditLog.timestamp >= data_inicio,
-            AuditLog.status.in_(['FAILED', 'ERROR'])
-        )
-    ).count()
+    data_inicio = (datetime.utcnow() - timedelta(days=dias)).date()
+    
+    stats = get_estatisticas_periodo(data_inicio)
     
     return jsonify({
         'periodo_dias': dias,
-        'total_logs': total_logs,
-        'total_erros': total_erros,
-        'logs_por_dia': [{'dia': str(dia), 'total': total} for dia, total in logs_por_dia],
-        'acoes_comuns': [{'action': action, 'total': total} for action, total in acoes_comuns],
-        'usuarios_ativos': [{'user': user, 'total': total} for user, total in usuarios_ativos]
+        'total_logs': stats['total_logs'],
+        'total_erros': stats['total_erros'],
+        'logs_por_dia': [{'dia': str(dia), 'total': int(total)} for dia, total in stats['logs_por_dia']],
+        'acoes_comuns': [{'action': action, 'total': int(total)} for action, total in stats['acoes_comuns']],
+        'usuarios_ativos': [{'user': user, 'total': int(total)} for user, total in stats['usuarios_ativos']]
     })
 
 
@@ -364,6 +290,7 @@ def estatisticas():
 @audit_bp.route('/exportar/csv')
 @login_required
 @role_required('admin')
+@somente_leitura
 def exportar_csv():
     """Exporta logs para CSV."""
     
@@ -380,18 +307,7 @@ def exportar_csv():
         query = query.filter_by(action=action)
     if resource_type:
         query = query.filter_by(resource_type=resource_type)
-    if data_inicio:
-        try:
-            dt_inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
-            query = query.filter(AuditLog.timestamp >= dt_inicio)
-        except:
-            pass
-    if data_fim:
-        try:
-            dt_fim = datetime.strptime(data_fim, '%Y-%m-%d')
-            query = query.filter(AuditLog.timestamp <= dt_fim)
-        except:
-            pass
+    query = filtrar_periodo(query, AuditLog.timestamp, data_inicio, data_fim)
     
     logs = query.order_by(desc(AuditLog.timestamp)).limit(10000).all()  # Limite de 10k registros
     
@@ -435,11 +351,14 @@ def exportar_csv():
 @audit_bp.route('/exportar/viagens-csv')
 @login_required
 @role_required('admin')
+@somente_leitura
 def exportar_viagens_csv():
     """Exporta logs de viagens para CSV."""
     
     viagem_id = request.args.get('viagem_id', type=int)
     motorista_id = request.args.get('motorista_id', type=int)
+    data_inicio = request.args.get('data_inicio', '')
+    data_fim = request.args.get('data_fim', '')
     
     query = ViagemAuditoria.query
     
@@ -447,6 +366,7 @@ def exportar_viagens_csv():
         query = query.filter_by(viagem_id=viagem_id)
     if motorista_id:
         query = query.filter_by(motorista_id=motorista_id)
+    query = filtrar_periodo(query, ViagemAuditoria.timestamp, data_inicio, data_fim)
     
     logs = query.order_by(desc(ViagemAuditoria.timestamp)).limit(10000).all()
     
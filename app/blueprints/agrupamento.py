@@ -957,64 +957,25 @@ def finalizar_agrupamento():
                 # [OK] NOVA: Armazena ID para notificar depois
                 viagens_ids_para_notificar.append(nova_viagem.id)
 
+        # [OK] Enfileira 1 mensagem por motorista (em lote) na mesma transação
+        # das viagens; o envio é feito pelo worker de notificações
+        if viagens_ids_para_notificar:
+            quantidade_viagens = len(viagens_ids_para_notificar)
+            try:
+                enviadas = notification_service.notificar_novas_viagens_em_lote(
+                    quantidade_viagens=quantidade_viagens
+                )
+                logger.info(
+                    f"[OK] {enviadas} motorista(s) na fila de notificação sobre {quantidade_viagens} nova(s) viagem(ns)")
+            except Exception as e:
+                logger.error(
+                    f"[ERRO] Erro ao enfileirar notificações em lote: {e}")
+
         # [FIX] CORREÇÃO: Commit final com log de confirmação
         db.session.commit()
         logger.info(
             f"[OK] COMMIT REALIZADO: {viagens_criadas} viagem(ns), {fretados_criados} fretado(s), {solicitacoes_agrupadas} solicitação(ões) agrupada(s)")
 
-        # [OK] NOVA: Envia notificações WhatsApp em background (assíncrono)
-        if viagens_ids_para_notificar:
-            import threading
-            from flask import current_app
-
-            # [OK] Captura o app ANTES de criar a thread
-            app = current_app._get_current_object()
-
-            def enviar_notificacoes():
-                """Worker thread que cria sua própria sessão do banco de dados"""
-                from app import db as db_module
-                from app.models import Viagem
-                from sqlalchemy.orm import scoped_session, sessionmaker
-
-                # Usa o contexto da aplicação (app capturado antes da thread)
-                with app.app_context():
-                    # Cria nova sessão para esta thread
-                    session_factory = sessionmaker(bind=db_module.engine)
-                    Session = scoped_session(session_factory)
-                    session_local = Session()  # Retorna Session
-
-                    try:
-                        # [OK] OTIMIZAÇÃO: Envia 1 mensagem única por motorista (em lote)
-                        # Ao invés de enviar 1 mensagem para cada viagem criada
-                        quantidade_viagens = len(viagens_ids_para_notificar)
-
-                        enviadas = notification_service.notificar_novas_viagens_em_lote(
-                            quantidade_viagens=quantidade_viagens
-                        )
-
-                        if enviadas > 0:
-                            logger.info(
-                                f"[OK] {enviadas} motorista(s) notificado(s) sobre {quantidade_viagens} nova(s) viagem(ns)")
-                        else:
-                            logger.warning(
-                                f"[AVISO]  Nenhum motorista notificado sobre as {quantidade_viagens} viagem(ns) criadas")
-
-                    except Exception as e:
-                        logger.error(
-                            f"[ERRO] Erro ao enviar notificações em lote: {e}")
-
-                    finally:
-                        # Fecha a sessão da thread
-                        session_local.close()   # [OK] Fecha a sessão
-                        # [OK] Remove do registry do scoped_session
-                        Session.remove()
-
-            # Inicia thread em background
-            thread = threading.Thread(target=enviar_notificacoes, daemon=True)
-            thread.start()
-            logger.info(
-                f"[>>>] Iniciando envio de notificação em lote sobre {len(viagens_ids_para_notificar)} viagem(ns) criada(s)...")
-
         # Limpa a sessão
         from flask import session
         session.pop('grupos_sugeridos', None)
@@ -1028,7 +989,7 @@ def finalizar_agrupamento():
         mensagem += f' Total: {solicitacoes_agrupadas} solicitação(ões) agrupada(s).'
 
         if viagens_ids_para_notificar:
-            mensagem += f' Notificações WhatsApp sendo enviadas em background.'
+            mensagem += f' Notificações WhatsApp na fila de envio.'
 
         return jsonify({
             'success': True,
@@ -0,0 +1,234 @@
+"""
+Blueprint da API de Integração
+==============================
+
+Endpoints JSON para sistemas externos (ex: RH do cliente enviando a escala
+de turnos). Autenticação por token: Authorization: Bearer <token>, gerado
+com 'flask gerar-token-api <email>'.
+
+POST /api/solicitacoes/lote
+    Cria solicitações em lote. Aceita o cabeçalho Idempotency-Key: repetir
+    a chamada com a mesma chave devolve a resposta original, sem duplicar.
+
+    Corpo:
+        {
+            "planta_id": 1,
+            "solicitacoes": [
+                {"matricula": "123", "tipo_corrida": "entrada",
+                 "horario": "2025-01-10T06:00", "turno": "1° Turno"},
+                ...
+            ]
+        }
+
+    Resposta: totais e um resultado por item, na ordem enviada
+    ("criada" com o id, "duplicada" ou "rejeitada" com os erros).
+"""
+
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from datetime import datetime, timedelta
+
+from ..models import Planta, Supervisor
+from ..decorators import permission_required
+from ..utils.idempotencia import executar_idempotente, ChaveIdempotenciaInvalida
+from ..utils.solicitacoes_lote import (
+    COLUNA_HORARIO, LoteSolicitacoes, gravar_solicitacoes
+)
+
+# IMPORTAR SISTEMA DE AUDITORIA
+from ..utils.admin_audit import log_audit, AuditAction
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+MAX_ITENS_LOTE = 5000
+TIPOS_CORRIDA_API = ('entrada', 'saida', 'desligamento')
+TIPOS_LINHA = ('EXTRA', 'FIXA')
+
+
+class ErroApi(Exception):
+    """Erro que interrompe a chamada inteira (corpo inválido, permissão...)."""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+@api_bp.errorhandler(401)
+def nao_autenticado(erro):
+    return jsonify({'erro': 'Token de acesso ausente ou inválido.'}), 401
+
+
+@api_bp.errorhandler(403)
+def sem_permissao(erro):
+    return jsonify({'erro': 'Usuário sem permissão para esta operação.'}), 403
+
+
+def _supervisor_da_planta(planta_id):
+    """Supervisor responsável pelas solicitações, conforme o perfil do usuário."""
+    if current_user.role == 'supervisor':
+        supervisor = current_user.supervisor
+        if planta_id not in [p.id for p in supervisor.plantas]:
+            raise ErroApi('Planta inválida para este supervisor.', 403)
+        return supervisor
+
+    query = Supervisor.query.join(Supervisor.plantas).filter(Planta.id == planta_id)
+    if current_user.role == 'gerente':
+        query = query.filter(Supervisor.gerente_id == current_user.gerente.id)
+    supervisor = query.first()
+    if not supervisor:
+        raise ErroApi('Nenhum supervisor encontrado para esta planta.', 422)
+    return supervisor
+
+
+def _ler_horario(valor):
+    try:
+        return datetime.fromisoformat(str(valor)).replace(tzinfo=None, second=0, microsecond=0)
+    except ValueError:
+        return None
+
+
+def _processar_lote(dados):
+    """Valida e grava o lote (sem commit). Retorna (resposta, status)."""
+    if not isinstance(dados, dict) or not isinstance(dados.get('solicitacoes'), list):
+        raise ErroApi('Corpo deve ser um objeto JSON com a lista "solicitacoes".')
+    itens = dados['solicitacoes']
+    if not itens:
+        raise ErroApi('A lista "solicitacoes" está vazia.')
+    if len(itens) > MAX_ITENS_LOTE:
+        raise ErroApi(f'Máximo de {MAX_ITENS_LOTE} solicitações por chamada.', 413)
+
+    planta = Planta.query.get(dados.get('planta_id') or 0)
+    if not planta:
+        raise ErroApi('Planta não encontrada.', 422)
+    supervisor = _supervisor_da_planta(planta.id)
+
+    itens = [item if isinstance(item, dict) else {} for item in itens]
+    lote = LoteSolicitacoes(
+        planta.id,
+        colaborador_ids=[item.get('colaborador_id') for item in itens if item.get('colaborador_id')],
+        matriculas=[item.get('matricula') for item in itens if item.get('matricula')]
+    )
+    hoje = (datetime.utcnow() - timedelta(hours=3)).date()
+
+    resultados = [None] * len(itens)
+    registros, indices = [], []
+    for i, item in enumerate(itens):
+        erros = []
+        if item.get('matricula'):
+            colaborador = lote.por_matricula.get(str(item['matricula']).strip())
+        else:
+            colaborador = lote.colaborador(item.get('colaborador_id'))
+        if not colaborador or colaborador.planta_id != planta.id:
+            erros.append('Colaborador não encontrado nesta planta.')
+        elif colaborador.status != 'Ativo':
+            erros.append('Colaborador inativo.')
+        elif not colaborador.bloco_id:
+            erros.append('Colaborador sem bloco definido.')
+
+        tipo = item.get('tipo_corrida')
+        if tipo not in TIPOS_CORRIDA_API:
+            erros.append(f'tipo_corrida deve ser um de: {", ".join(TIPOS_CORRIDA_API)}.')
+        tipo_linha = str(item.get('tipo_linha') or 'EXTRA').upper()
+        if tipo_linha not in TIPOS_LINHA:
+            erros.append('tipo_linha deve ser EXTRA ou FIXA.')
+
+        horario = _ler_horario(item.get('horario'))
+        if not horario:
+            erros.append('horario inválido (use AAAA-MM-DDTHH:MM).')
+        elif horario.date() < hoje:
+            erros.append('Não é permitido criar solicitações com data no passado.')
+
+        turno_id = None
+        if item.get('turno'):
+            turno_id = lote.turno_id(item['turno'])
+            if not turno_id:
+                erros.append(f'Turno "{item["turno"]}" não existe nesta planta.')
+
+        if erros:
+            resultados[i] = {'indice': i, 'status': 'rejeitada', 'erros': erros}
+            continue
+
+        registro = {
+            'colaborador_id': colaborador.id,
+            'supervisor_id': supervisor.id,
+            'empresa_id': planta.empresa_id,
+            'planta_id': planta.id,
+            'bloco_id': colaborador.bloco_id,
+            'tipo_linha': tipo_linha,
+            'tipo_corrida': tipo,
+            COLUNA_HORARIO[tipo]: horario,
+            'status': 'Pendente',
+            'created_by_user_id': current_user.id,
+        }
+        if turno_id:
+            registro[f'turno_{tipo}_id'] = turno_id
+            valor, repasse = lote.valores(colaborador.bloco_id, turno_id)
+            registro['valor'] = valor
+            registro['valor_repasse'] = repasse
+        registros.append(registro)
+        indices.append(i)
+
+    ids, ignorados = gravar_solicitacoes(registros)
+    ignorados = set(ignorados)
+    criados = iter(ids)
+    for posicao, i in enumerate(indices):
+        if posicao in ignorados:
+            resultados[i] = {'indice': i, 'status': 'duplicada'}
+        else:
+            resultados[i] = {'indice': i, 'status': 'criada', 'id': next(criados)}
+
+    resposta = {
+        'total': len(itens),
+        'criadas': len(ids),
+        'duplicadas': len(ignorados),
+        'rejeitadas': len(itens) - len(indices),
+        'resultados': resultados,
+    }
+    return resposta, 200
+
+
+@api_bp.route('/solicitacoes/lote', methods=['POST'])
+@login_required
+@permission_required(['admin', 'operador', 'gerente', 'supervisor'])
+def solicitacoes_lote():
+    dados = request.get_json(silent=True)
+
+    def processar():
+        try:
+            return _processar_lote(dados)
+        except ErroApi as erro:
+            return {'erro': erro.mensagem}, erro.status
+
+    try:
+        resposta, status, repetida = executar_idempotente(
+            request.headers.get('Idempotency-Key'), 'solicitacoes_lote',
+            request.get_data(), processar)
+    except ChaveIdempotenciaInvalida as erro:
+        return jsonify({'erro': str(erro)}), 422
+
+    # AUDITORIA: um registro por lote (fora da transação idempotente, pois
+    # log_audit faz o próprio commit)
+    if not repetida and resposta.get('criadas'):
+        log_audit(
+            action=AuditAction.BULK_CREATE,
+            resource_type='Solicitacao',
+            status='SUCCESS',
+            severity='INFO',
+            changes={
+                'origem': 'api',
+                'planta_id': dados.get('planta_id'),
+                'quantidade': resposta['criadas'],
+                'solicitacoes_ids': [r['id'] for r in resposta['resultados']
+                                     if r['status'] == 'criada'],
+                'duplicadas': resposta['duplicadas'],
+                'rejeitadas': resposta['rejeitadas'],
+                'idempotency_key': request.headers.get('Idempotency-Key')
+            }
+        )
+
+    retorno = jsonify(resposta)
+    retorno.status_code = status
+    if repetida:
+        retorno.headers['Idempotent-Replayed'] = 'true'
+    return retorno
@@ -25,6 +25,7 @@ from ..decorators import permission_required
 from app import query_filters
 
 from .admin import admin_bp
+from ..utils import bairros, tarifas
 
 # IMPORTAR SISTEMA DE AUDITORIA
 from ..utils.admin_audit import log_audit, AuditAction
@@ -489,6 +490,10 @@ def editar_bloco(bloco_id):
 
     if request.method == 'POST':
         valores_antigos = {'codigo_bloco': bloco.codigo_bloco}
+        campos_tarifa = [campo for campos in Bloco.CAMPOS_TARIFA.values()
+                         for campo in campos]
+        tarifas_antigas = {campo: float(getattr(bloco, campo) or 0)
+                           for campo in campos_tarifa}
 
         # Processa os valores dos 4 turnos fixos
         def processar_valor(campo_nome):
@@ -512,19 +517,38 @@ def editar_bloco(bloco_id):
 
         db.session.commit()
 
-        # AUDITORIA
+        alteracoes = {}
         if valores_antigos['codigo_bloco'] != bloco.codigo_bloco:
+            alteracoes['codigo_bloco'] = {
+                'before': valores_antigos['codigo_bloco'], 'after': bloco.codigo_bloco}
+        for campo in campos_tarifa:
+            if tarifas_antigas[campo] != float(getattr(bloco, campo) or 0):
+                alteracoes[campo] = {
+                    'before': tarifas_antigas[campo], 'after': float(getattr(bloco, campo) or 0)}
+
+        # Tarifas alteradas: reprecia o que ainda não foi atribuído a motorista
+        repreciadas = None
+        if any(campo in alteracoes for campo in campos_tarifa):
+            repreciadas = tarifas.repreciar(bloco.id)
+            db.session.commit()
+            alteracoes['repreciadas'] = {
+                'solicitacoes': repreciadas[0], 'viagens': repreciadas[1]}
+
+        # AUDITORIA
+        if alteracoes:
             log_audit(
                 action=AuditAction.UPDATE,
                 resource_type='Bloco',
                 resource_id=bloco.id,
                 status='SUCCESS',
                 severity='INFO',
-                changes={'codigo_bloco': {
-                    'before': valores_antigos['codigo_bloco'], 'after': bloco.codigo_bloco}}
+                changes=alteracoes
             )
         flash(
             f'Bloco "{bloco.codigo_bloco}" atualizado com sucesso!', 'success')
+        if repreciadas and any(repreciadas):
+            flash(f'Valores atualizados em {repreciadas[0]} solicitação(ões) e '
+                  f'{repreciadas[1]} viagem(ns) ainda sem motorista.', 'info')
         return redirect(url_for('admin.admin_dashboard', aba='blocos'))
 
     empresas = Empresa.query.filter_by(
@@ -665,6 +689,8 @@ def associar_bairros_bloco(bloco_id):
 
         # 3. Salva todas as alterações no banco de dados
         db.session.commit()
+        # O update em massa não dispara os eventos do ORM
+        bairros.invalidar_cache_bairros()
 
         flash('Associações de bairros salvas com sucesso!', 'success')
         return redirect(url_for('admin.associar_bairros_bloco', bloco_id=bloco_id))
@@ -23,6 +23,7 @@ from ..models import (
 )
 from ..decorators import permission_required
 from app import query_filters
+from ..utils import bairros
 
 from .admin import admin_bp
 
@@ -304,45 +305,21 @@ def excluir_colaborador(colaborador_id):
 @login_required
 # @cache.cached(timeout=3600, query_string=True) Cache que guarda por 1 hora (3600 segundos) os bairros.
 def buscar_bloco_por_bairro():
-    import unicodedata
-
     nome_bairro_input = request.args.get('bairro', '', type=str).strip()
     if not nome_bairro_input:
         return jsonify({'error': 'Nome do bairro não fornecido'}), 400
 
-    def normalizar_texto(texto):
-        """
-        Normaliza o texto removendo acentos, pontos e convertendo para minúsculas.
-        Exemplo: 'JD. ITAPUÃ' -> 'jd itapua'
-        """
-        # Remove acentos (NFD = Normalization Form Decomposed)
-        texto_sem_acento = unicodedata.normalize('NFD', texto)
-        texto_sem_acento = ''.join(
-            c for c in texto_sem_acento if unicodedata.category(c) != 'Mn')
-        # Remove pontos e espaços duplos, converte para minúsculas
-        texto_limpo = texto_sem_acento.lower().replace(
-            '.', '').replace('  ', ' ').strip()
-        return texto_limpo
-
-    # 1. Normaliza a entrada do usuário
-    termo_busca_limpo = normalizar_texto(nome_bairro_input)
-
-    # 2. Busca todos os bairros e compara manualmente (já que SQLite não tem função de remover acentos)
-    todos_bairros = Bairro.query.all()
-
-    for bairro_obj in todos_bairros:
-        nome_banco_normalizado = normalizar_texto(bairro_obj.nome)
-        if nome_banco_normalizado == termo_busca_limpo:
-            if bairro_obj.bloco:
-                return jsonify({
-                    'bloco_id': bairro_obj.bloco.id,
-                    'bloco_codigo': bairro_obj.bloco.codigo_bloco
-                })
-            else:
-                # Bairro encontrado mas sem bloco associado
-                return jsonify({'bloco_codigo': 'Bloco não encontrado'}), 404
-
-    # Bairro não encontrado
+    # Busca pelo nome normalizado (sem acentos/pontuação, ex: 'JD. ITAPUÃ' -> 'jd itapua')
+    # usando o índice de bairro.nome_normalizado e o cache em memória
+    encontrado = bairros.buscar_bloco_por_nome(nome_bairro_input)
+    if encontrado:
+        bloco_id, bloco_codigo = encontrado
+        return jsonify({
+            'bloco_id': bloco_id,
+            'bloco_codigo': bloco_codigo
+        })
+
+    # Bairro não encontrado ou sem bloco associado
     return jsonify({'bloco_codigo': 'Bloco não encontrado'}), 404
 
 
@@ -7,10 +7,10 @@ Configurações e importações.
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, jsonify, abort
 from flask_login import login_required, current_user
-from werkzeug.security import generate_password_hash
 from werkzeug.utils import secure_filename
 from datetime import datetime
 from sqlalchemy import func, or_
+from sqlalchemy.orm import joinedload
 from io import StringIO
 import io
 import csv
@@ -22,6 +22,8 @@ from ..models import (
 )
 from ..decorators import permission_required, role_required
 from app import query_filters
+from ..utils import busca, importacao
+from ..utils.texto import normalizar_texto
 
 from .admin import admin_bp
 
@@ -229,6 +231,26 @@ def pagina_importacoes():
     return render_template('config/pagina_importacoes.html')
 
 
+def _flash_resultado_importacao(resultado, entidade):
+    """Exibe o resumo de uma importação (contadores e os primeiros erros)."""
+    if resultado.adicionados > 0:
+        flash(
+            f'{resultado.adicionados} {entidade} importados com sucesso!', 'success')
+    if resultado.ignorados > 0:
+        flash(
+            f'{resultado.ignorados} linhas foram ignoradas por problemas nos dados.', 'warning')
+    if resultado.erros:
+        # Mostra os primeiros 5 erros
+        for erro in resultado.erros[:5]:
+            flash(erro, 'info')
+        if len(resultado.erros) > 5:
+            flash(f'... e mais {len(resultado.erros) - 5} erros.', 'info')
+    if (resultado.adicionados == 0 and resultado.ignorados == 0
+            and resultado.atualizados == 0 and resultado.inalterados == 0):
+        flash(
+            'O arquivo estava vazio ou não continha dados válidos para importação.', 'info')
+
+
 @admin_bp.route('/importar_colaboradores', methods=['GET', 'POST'])
 @login_required
 @role_required('admin')
@@ -237,149 +259,22 @@ def importar_colaboradores():
     if request.method == 'POST':
         file = request.files.get('csv_file')
         if not file or not file.filename:
-            flash('Por favor, selecione um arquivo CSV válido.', 'warning')
+            flash('Por favor, selecione um arquivo CSV ou Excel (.xlsx) válido.', 'warning')
             return redirect(request.url)
 
         try:
-            # Lê o conteúdo e decodifica, tratando o BOM do Windows
-            decoded_content = file.stream.read().decode('utf-8-sig')
-            lines = decoded_content.splitlines()
-            csv_reader = csv.reader(lines, delimiter=';')
-
-            # Pula o cabeçalho
-            next(csv_reader, None)
-
-            colaboradores_adicionados = 0
-            linhas_ignoradas = 0
-            erros = []
-
-            # Começa em 2 por causa do cabeçalho
-            for i, row in enumerate(csv_reader, 2):
-                # Validação para garantir que a linha não está vazia
-                if not any(field.strip() for field in row):
-                    continue
-
-                # Limpa todos os campos
-                row = [field.strip() for field in row]
-
-                # Valida número de campos
-                if len(row) < 7:
-                    erros.append(
-                        f"Linha {i}: Número insuficiente de campos (esperado pelo menos 7, encontrado {len(row)})")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Desempacota os campos (com valores padrão para campos opcionais)
-                # Formato: matricula;nome;empresa;planta;email;telefone;endereco;nro;bairro;cidade;uf;bloco;status
-                matricula = row[0] if len(row) > 0 else ''
-                nome = row[1] if len(row) > 1 else ''
-                empresa_nome = row[2] if len(row) > 2 else ''
-                planta_nome = row[3] if len(row) > 3 else ''
-                email = row[4] if len(row) > 4 else ''
-                telefone = row[5] if len(row) > 5 else ''
-                endereco = row[6] if len(row) > 6 else ''
-                nro = row[7] if len(row) > 7 else ''
-                bairro = row[8] if len(row) > 8 else ''
-                cidade = row[9] if len(row) > 9 else ''
-                uf = row[10] if len(row) > 10 else ''
-                bloco_codigo = row[11] if len(row) > 11 else ''
-                status = row[12] if len(row) > 12 else 'Ativo'
-
-                # Validações
-                if not matricula or not nome:
-                    erros.append(
-                        f"Linha {i}: Matrícula e nome são obrigatórios")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Verifica se matrícula já existe
-                if Colaborador.query.filter_by(matricula=matricula).first():
-                    erros.append(
-                        f"Linha {i}: Matrícula '{matricula}' já existe no sistema")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Busca bloco (se fornecido)
-                bloco_id = None
-                if bloco_codigo:
-                    bloco = Bloco.query.filter_by(
-                        codigo_bloco=bloco_codigo).first()
-                    if bloco:
-                        bloco_id = bloco.id
-                    else:
-                        erros.append(
-                            f"Linha {i}: Bloco '{bloco_codigo}' não encontrado (colaborador será criado sem bloco)")
-
-                # Limpa e valida telefone (remove caracteres especiais e garante 11 dígitos)
-                if telefone:
-                    telefone_limpo = telefone.replace(' ', '').replace(
-                        '-', '').replace('(', '').replace(')', '').replace('.', '')
-                    if telefone_limpo and (not telefone_limpo.isdigit() or len(telefone_limpo) != 11):
-                        erros.append(
-                            f"Linha {i}: Telefone '{telefone}' inválido (deve ter 11 dígitos). Colaborador será criado sem telefone.")
-                        telefone_limpo = None
-                else:
-                    telefone_limpo = None
-
-                # Busca empresa
-                empresa = Empresa.query.filter_by(nome=empresa_nome).first()
-                if not empresa:
-                    erros.append(
-                        f"Linha {i}: Empresa '{empresa_nome}' não encontrada")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Busca planta
-                planta = Planta.query.filter_by(
-                    nome=planta_nome, empresa_id=empresa.id).first()
-                if not planta:
-                    erros.append(
-                        f"Linha {i}: Planta '{planta_nome}' não encontrada para a empresa '{empresa_nome}'")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Valida status
-                status_validos = ['Ativo', 'Inativo', 'Desligado', 'Ausente']
-                if status and status not in status_validos:
-                    status = 'Ativo'  # Valor padrão
-
-                # Cria colaborador
-                novo_colaborador = Colaborador(
-                    matricula=matricula,
-                    nome=nome,
-                    empresa_id=empresa.id,
-                    planta_id=planta.id,
-                    email=email if email else None,
-                    telefone=telefone_limpo,
-                    endereco=endereco if endereco else None,
-                    nro=nro if nro else None,
-                    bairro=bairro if bairro else None,
-                    cidade=cidade if cidade else None,
-                    uf=uf if uf else None,
-                    bloco_id=bloco_id,
-                    status=status if status else 'Ativo'
-                )
-
-                db.session.add(novo_colaborador)
-                colaboradores_adicionados += 1
-
-            db.session.commit()
-
-            # Mensagens de feedback
-            if colaboradores_adicionados > 0:
-                flash(
-                    f'{colaboradores_adicionados} colaboradores importados com sucesso!', 'success')
-            if linhas_ignoradas > 0:
-                flash(
-                    f'{linhas_ignoradas} linhas foram ignoradas por problemas nos dados.', 'warning')
-                # Mostra os primeiros 5 erros
-                for erro in erros[:5]:
-                    flash(erro, 'info')
-                if len(erros) > 5:
-                    flash(f'... e mais {len(erros) - 5} erros.', 'info')
-            if colaboradores_adicionados == 0 and linhas_ignoradas == 0:
-                flash(
-                    'O arquivo estava vazio ou não continha dados válidos para importação.', 'info')
+            # Leitura em streaming + validação e inserção em lotes
+            linhas = importacao.ler_linhas_arquivo(file.stream, file.filename)
+            if request.form.get('modo') == 'sincronizar':
+                # Upsert por matrícula: atualiza apenas o que mudou
+                resultado = importacao.sincronizar_colaboradores(linhas)
+                if resultado.atualizados > 0 or resultado.inalterados > 0:
+                    flash(
+                        f'{resultado.atualizados} colaboradores atualizados, '
+                        f'{resultado.inalterados} sem alterações.', 'success')
+            else:
+                resultado = importacao.importar_colaboradores(linhas)
+            _flash_resultado_importacao(resultado, 'colaboradores')
 
             return redirect(url_for('admin.admin_dashboard', aba='colaboradores'))
 
@@ -403,118 +298,13 @@ def importar_supervisores():
     if request.method == 'POST':
         file = request.files.get('csv_file')
         if not file or not file.filename:
-            flash('Por favor, selecione um arquivo CSV válido.', 'warning')
+            flash('Por favor, selecione um arquivo CSV ou Excel (.xlsx) válido.', 'warning')
             return redirect(request.url)
 
         try:
-            decoded_content = file.stream.read().decode('utf-8-sig')
-            lines = decoded_content.splitlines()
-            csv_reader = csv.reader(lines, delimiter=';')
-
-            # Pula o cabeçalho
-            next(csv_reader, None)
-
-            supervisores_adicionados = 0
-            linhas_ignoradas = 0
-            erros = []
-
-            # Começa em 2 por causa do cabeçalho
-            for i, row in enumerate(csv_reader, 2):
-                if not any(field.strip() for field in row):
-                    continue
-
-                row = [field.strip() for field in row]
-
-                # Valida número de campos
-                if len(row) < 7:
-                    erros.append(
-                        f"Linha {i}: Número insuficiente de campos (esperado 7, encontrado {len(row)})")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Ordem: matricula;nome;empresa;planta;email;senha;status
-                matricula, nome, empresa_nome, planta_nome, email, senha, status = row[:7]
-
-                # Validações
-                if not matricula or not nome or not email or not senha:
-                    erros.append(
-                        f"Linha {i}: Matrícula, nome, email e senha são obrigatórios")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Verifica se matrícula já existe
-                if Supervisor.query.filter_by(matricula=matricula).first():
-                    erros.append(
-                        f"Linha {i}: Matrícula '{matricula}' já existe no sistema")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Verifica se email já existe
-                if User.query.filter_by(email=email).first():
-                    erros.append(f"Linha {i}: E-mail '{email}' já está em uso")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Busca empresa
-                empresa = Empresa.query.filter_by(nome=empresa_nome).first()
-                if not empresa:
-                    erros.append(
-                        f"Linha {i}: Empresa '{empresa_nome}' não encontrada")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Busca planta
-                planta = Planta.query.filter_by(
-                    nome=planta_nome, empresa_id=empresa.id).first()
-                if not planta:
-                    erros.append(
-                        f"Linha {i}: Planta '{planta_nome}' não encontrada para a empresa '{empresa_nome}'")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Valida status
-                status_validos = ['Ativo', 'Inativo', 'Desligado', 'Ausente']
-                if status and status not in status_validos:
-                    status = 'Ativo'  # Valor padrão
-
-                # Cria usuário
-                hashed_password = generate_password_hash(
-                    senha, method='pbkdf2:sha256')
-                new_user = User(
-                    email=email, password=hashed_password, role='supervisor')
-                db.session.add(new_user)
-                db.session.flush()  # Para obter o user_id
-
-                # Cria supervisor
-                novo_supervisor = Supervisor(
-                    user_id=new_user.id,
-                    matricula=matricula,
-                    nome=nome,
-                    empresa_id=empresa.id,
-                    planta_id=planta.id,
-                    email=email,
-                    status=status if status else 'Ativo'
-                )
-                db.session.add(novo_supervisor)
-                supervisores_adicionados += 1
-
-            db.session.commit()
-
-            # Mensagens de feedback
-            if supervisores_adicionados > 0:
-                flash(
-                    f'{supervisores_adicionados} supervisores importados com sucesso!', 'success')
-            if linhas_ignoradas > 0:
-                flash(
-                    f'{linhas_ignoradas} linhas foram ignoradas por problemas nos dados.', 'warning')
-                # Mostra os primeiros 5 erros
-                for erro in erros[:5]:
-                    flash(erro, 'info')
-                if len(erros) > 5:
-                    flash(f'... e mais {len(erros) - 5} erros.', 'info')
-            if supervisores_adicionados == 0 and linhas_ignoradas == 0:
-                flash(
-                    'O arquivo estava vazio ou não continha dados válidos para importação.', 'info')
+            resultado = importacao.importar_supervisores(
+                importacao.ler_linhas_arquivo(file.stream, file.filename))
+            _flash_resultado_importacao(resultado, 'supervisores')
 
             return redirect(url_for('admin.admin_dashboard', aba='supervisores'))
 
@@ -538,106 +328,13 @@ def importar_motoristas():
     if request.method == 'POST':
         file = request.files.get('csv_file')
         if not file or not file.filename:
-            flash('Por favor, selecione um arquivo CSV válido.', 'warning')
+            flash('Por favor, selecione um arquivo CSV ou Excel (.xlsx) válido.', 'warning')
             return redirect(request.url)
 
         try:
-            decoded_content = file.stream.read().decode('utf-8-sig')
-            lines = decoded_content.splitlines()
-            csv_reader = csv.reader(lines, delimiter=';')
-
-            # Pula o cabeçalho
-            next(csv_reader, None)
-
-            motoristas_adicionados = 0
-            linhas_ignoradas = 0
-            erros = []
-
-            # Começa em 2 por causa do cabeçalho
-            for i, row in enumerate(csv_reader, 2):
-                if not any(field.strip() for field in row):
-                    continue
-
-                row = [field.strip() for field in row]
-
-                # Valida número de campos
-                if len(row) < 8:
-                    erros.append(
-                        f"Linha {i}: Número insuficiente de campos (esperado 8, encontrado {len(row)})")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Ordem: nome;cpf_cnpj;email;senha;telefone;chave_pix;veiculo_nome;veiculo_placa
-                nome, cpf_cnpj, email, senha, telefone, chave_pix, veiculo_nome, veiculo_placa = row[
-                    :8]
-
-                # Validações
-                if not nome or not cpf_cnpj or not email or not senha:
-                    erros.append(
-                        f"Linha {i}: Nome, CPF/CNPJ, email e senha são obrigatórios")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Verifica se email já existe
-                if User.query.filter_by(email=email).first():
-                    erros.append(f"Linha {i}: E-mail '{email}' já está em uso")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Verifica se CPF/CNPJ já existe
-                if Motorista.query.filter_by(cpf_cnpj=cpf_cnpj).first():
-                    erros.append(
-                        f"Linha {i}: CPF/CNPJ '{cpf_cnpj}' já está cadastrado")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Verifica se placa já existe (se fornecida)
-                if veiculo_placa and Motorista.query.filter_by(veiculo_placa=veiculo_placa).first():
-                    erros.append(
-                        f"Linha {i}: Placa '{veiculo_placa}' já está em uso")
-                    linhas_ignoradas += 1
-                    continue
-
-                # Cria usuário
-                hashed_password = generate_password_hash(
-                    senha, method='pbkdf2:sha256')
-                new_user = User(
-                    email=email, password=hashed_password, role='motorista')
-                db.session.add(new_user)
-                db.session.flush()  # Para obter o user_id
-
-                # Cria motorista
-                novo_motorista = Motorista(
-                    user_id=new_user.id,
-                    nome=nome,
-                    cpf_cnpj=cpf_cnpj,
-                    email=email,
-                    telefone=telefone if telefone else None,
-                    chave_pix=chave_pix if chave_pix else None,
-                    veiculo_nome=veiculo_nome if veiculo_nome else None,
-                    veiculo_placa=veiculo_placa if veiculo_placa else None,
-                    status='Ativo'
-                )
-                db.session.add(novo_motorista)
-                motoristas_adicionados += 1
-
-            db.session.commit()
-
-            # Mensagens de feedback
-            if motoristas_adicionados > 0:
-                flash(
-                    f'{motoristas_adicionados} motoristas importados com sucesso!', 'success')
-            if linhas_ignoradas > 0:
-                flash(
-                    f'{linhas_ignoradas} linhas foram ignoradas por problemas nos dados.', 'warning')
-                # Mostra os primeiros 5 erros
-                for erro in erros[:5]:
-                    flash(erro, 'info')
-                if len(erros) > 5:
-                    flash(f'... e mais {len(erros) - 5} erros.', 'info')
-            if motoristas_adicionados == 0 and linhas_ignoradas == 0:
-                flash(
-                    'O arquivo estava vazio ou não continha dados válidos para importação.', 'info')
+            resultado = importacao.importar_motoristas(
+                importacao.ler_linhas_arquivo(file.stream, file.filename))
+            _flash_resultado_importacao(resultado, 'motoristas')
 
             return redirect(url_for('admin.admin_dashboard', aba='motoristas'))
 
@@ -668,27 +365,17 @@ def api_buscar_colaboradores():
     if current_user.role in ['admin', 'operador'] and not planta_id:
         return jsonify({'error': 'Selecione uma planta antes de buscar colaboradores'}), 400
 
-    # Monta a query base
-    query = Colaborador.query.filter(Colaborador.status == 'Ativo')
-
-    # Filtra por planta se especificado
+    # Restringe às plantas permitidas
+    plantas_ids = None
     if planta_id:
-        query = query.filter(Colaborador.planta_id == planta_id)
+        plantas_ids = [planta_id]
     elif current_user.role == 'supervisor':
         # Supervisor só vê colaboradores das suas plantas
         plantas_ids = [p.id for p in current_user.supervisor.plantas]
-        if plantas_ids:
-            query = query.filter(Colaborador.planta_id.in_(plantas_ids))
 
-    # Busca por nome ou matrícula
-    query = query.filter(
-        or_(
-            Colaborador.nome.ilike(f'%{query_str}%'),
-            Colaborador.matricula.ilike(f'%{query_str}%')
-        )
-    ).limit(10)
-
-    colaboradores = query.all()
+    # Busca por nome ou matrícula (sem diferenciar acentos), com bloco e
+    # turnos já carregados e ordenada pelo ranking (prefixo da matrícula primeiro)
+    colaboradores = busca.buscar_colaboradores(query_str, plantas_ids)
 
     # Retorna JSON com os dados necessários
     resultado = []
@@ -715,10 +402,14 @@ def api_buscar_bairros():
     if len(query) < 2:
         return jsonify([])
 
-    # Busca bairros que contenham o texto digitado (case-insensitive)
-    # Usando ilike para busca sem diferenciar maiúsculas/minúsculas
-    bairros = Bairro.query.filter(
-        Bairro.nome.ilike(f'%{query}%')
+    # Busca bairros que contenham o texto digitado, sem diferenciar
+    # maiúsculas, acentos e pontuação (coluna nome_normalizado)
+    termo = normalizar_texto(query)
+    if not termo:
+        return jsonify([])
+
+    bairros = Bairro.query.options(joinedload(Bairro.bloco)).filter(
+        Bairro.nome_normalizado.like(f'%{busca._escapar_like(termo)}%', escape='\\')
     ).order_by(Bairro.nome).limit(20).all()
 
     # Retorna lista de bairros com informações do bloco
@@ -784,3 +475,12 @@ def api_turnos_por_planta(planta_id):
         })
 
     return jsonify(resultado)
+
+
+@admin_bp.route('/sistema/pool')
+@login_required
+@role_required('admin')
+def metricas_pool_banco():
+    """Métricas do pool de conexões do banco (deste processo/worker)."""
+    from ..utils.pool_banco import metricas_pool
+    return jsonify(metricas_pool(db.engine))
@@ -20,6 +20,7 @@ from app.models import (
 )
 
 from ..admin import admin_bp
+from ...decorators import somente_leitura
 
 # Importa módulos do dashboard
 from .dash_utils import get_filtros, get_permissoes_usuario
@@ -30,6 +31,7 @@ from .dash_graficos import get_todos_graficos
 
 @admin_bp.route('/dashboard')
 @login_required
+@somente_leitura
 def admin_dashboard():
     """
     Rota principal do dashboard administrativo.
@@ -12,8 +12,13 @@ from app.models import (
     Viagem, Empresa, Motorista, User
 )
 from app.decorators import permission_required
+from app.services.financeiro import (
+    pagina_titulos, totais_por_status, viagem_nao_faturada, viagem_nao_paga,
+    viagens_a_faturar, viagens_a_pagar
+)
+from app.utils.numeracao import bloquear_serie, proximo_numero_titulo
 from datetime import datetime, date
-from sqlalchemy import and_, or_
+from sqlalchemy import or_
 
 financeiro_bp = Blueprint('financeiro', __name__,
                           url_prefix='/admin/financeiro')
@@ -35,42 +40,49 @@ def contas_receber():
     filtro_data_inicio = request.args.get('data_inicio', '')
     filtro_data_fim = request.args.get('data_fim', '')
 
-    # Query base
-    query = FinContasReceber.query
-
-    # Aplicar filtros
+    # Aplicar filtros (valem para a página e para os totalizadores)
+    filtros = []
     if filtro_status:
-        query = query.filter(FinContasReceber.status == filtro_status)
+        filtros.append(FinContasReceber.status == filtro_status)
 
     if filtro_empresa_id:
-        query = query.filter(FinContasReceber.empresa_id ==
-                             int(filtro_empresa_id))
+        filtros.append(FinContasReceber.empresa_id == int(filtro_empresa_id))
 
     if filtro_data_inicio:
         data_inicio = datetime.strptime(filtro_data_inicio, '%Y-%m-%d').date()
-        query = query.filter(FinContasReceber.data_emissao >= data_inicio)
+        filtros.append(FinContasReceber.data_emissao >= data_inicio)
 
     if filtro_data_fim:
         data_fim = datetime.strptime(filtro_data_fim, '%Y-%m-%d').date()
-        query = query.filter(FinContasReceber.data_emissao <= data_fim)
+        filtros.append(FinContasReceber.data_emissao <= data_fim)
 
-    # Ordenar por data de emissão decrescente
-    titulos = query.order_by(FinContasReceber.data_emissao.desc()).all()
+    # Página atual, por vencimento decrescente (paginação por chave)
+    pagina = pagina_titulos(
+        FinContasReceber, filtros, apos=request.args.get('apos'),
+        antes=request.args.get('antes'),
+        opcoes=(db.joinedload(FinContasReceber.empresa),))
 
     # Buscar empresas para o filtro
     empresas = Empresa.query.filter_by(
         status='Ativo').order_by(Empresa.nome).all()
 
-    # Calcular totalizadores
-    total_aberto = sum([float(t.valor_total)
-                       for t in titulos if t.status == 'Aberto'])
-    total_recebido = sum([float(t.valor_total)
-                         for t in titulos if t.status == 'Recebido'])
-    total_vencido = sum([float(t.valor_total)
-                        for t in titulos if t.status == 'Vencido'])
+    # Calcular totalizadores (GROUP BY status no banco)
+    totais = totais_por_status(FinContasReceber, filtros)
+    total_titulos = sum(quantidade for quantidade, _ in totais.values())
+    total_aberto = totais.get('Aberto', (0, 0.0))[1]
+    total_recebido = totais.get('Recebido', (0, 0.0))[1]
+    total_vencido = totais.get('Vencido', (0, 0.0))[1]
+
+    # Filtros repetidos nos links de paginação
+    filtros_url = {chave: valor for chave, valor in (
+        ('status', filtro_status), ('empresa_id', filtro_empresa_id),
+        ('data_inicio', filtro_data_inicio), ('data_fim', filtro_data_fim)) if valor}
 
     return render_template('financeiro/contas_receber.html',
-                           titulos=titulos,
+                           titulos=pagina.titulos,
+                           pagina=pagina,
+                           filtros_url=filtros_url,
+                           total_titulos=total_titulos,
                            empresas=empresas,
                            filtro_status=filtro_status,
                            filtro_empresa_id=filtro_empresa_id,
@@ -100,13 +112,25 @@ def gerar_fatura():
             return redirect(url_for('financeiro.gerar_fatura'))
 
         try:
-            # Buscar viagens selecionadas (com hora parada)
+            # Espera um faturamento em lote em andamento ('flask faturar-periodo')
+            bloquear_serie('REC')
+
+            # Buscar viagens selecionadas (com hora parada), sem as já faturadas
             viagens = Viagem.query.options(db.joinedload(Viagem.hora_parada)).filter(
-                Viagem.id.in_(viagens_ids)).all()
+                Viagem.id.in_(viagens_ids), viagem_nao_faturada()).all()
 
+            ja_faturadas = sorted({viagem_id for (viagem_id,) in db.session.query(
+                FinReceberViagens.viagem_id).filter(
+                FinReceberViagens.viagem_id.in_(viagens_ids)).distinct()})
             if not viagens:
-                flash('Nenhuma viagem selecionada!', 'danger')
+                if ja_faturadas:
+                    flash('Todas as viagens selecionadas já foram faturadas!', 'danger')
+                else:
+                    flash('Nenhuma viagem selecionada!', 'danger')
                 return redirect(url_for('financeiro.gerar_fatura'))
+            if ja_faturadas:
+                flash(f'{len(ja_faturadas)} viagem(ns) já faturada(s) e não incluída(s): '
+                      f'#{", #".join(map(str, ja_faturadas))}', 'warning')
 
             # Calcular valor total (incluindo hora parada)
             valor_total = 0.0
@@ -115,14 +139,8 @@ def gerar_fatura():
                 if v.hora_parada:
                     valor_total += float(v.hora_parada.valor_adicional)
 
-            # Gerar número do título
-            ultimo_titulo = FinContasReceber.query.order_by(
-                FinContasReceber.id.desc()).first()
-            if ultimo_titulo:
-                ultimo_numero = int(ultimo_titulo.numero_titulo.split('-')[-1])
-                novo_numero = f"REC-{date.today().year}-{str(ultimo_numero + 1).zfill(4)}"
-            else:
-                novo_numero = f"REC-{date.today().year}-0001"
+            # Gerar número do título (contador no banco, ver app/utils/numeracao.py)
+            novo_numero = proximo_numero_titulo('REC')
 
             # Criar título a receber
             titulo = FinContasReceber(
@@ -184,20 +202,7 @@ def buscar_viagens_receber():
         dt_fim = datetime.strptime(data_fim, '%Y-%m-%d')
 
         # Buscar viagens finalizadas que ainda não foram faturadas
-        viagens_faturadas_ids = db.session.query(
-            FinReceberViagens.viagem_id).all()
-        viagens_faturadas_ids = [v[0] for v in viagens_faturadas_ids]
-
-        viagens = Viagem.query.options(db.joinedload(Viagem.hora_parada)).filter(
-            and_(
-                Viagem.empresa_id == int(empresa_id),
-                Viagem.status == 'Finalizada',
-                Viagem.data_criacao >= dt_inicio,
-                Viagem.data_criacao <= dt_fim,
-                ~Viagem.id.in_(
-                    viagens_faturadas_ids) if viagens_faturadas_ids else True
-            )
-        ).order_by(Viagem.data_criacao.desc()).all()
+        viagens = viagens_a_faturar(int(empresa_id), dt_inicio, dt_fim)
 
         # Montar resposta
         viagens_data = []
@@ -315,42 +320,49 @@ def contas_pagar():
     filtro_data_inicio = request.args.get('data_inicio', '')
     filtro_data_fim = request.args.get('data_fim', '')
 
-    # Query base
-    query = FinContasPagar.query
-
-    # Aplicar filtros
+    # Aplicar filtros (valem para a página e para os totalizadores)
+    filtros = []
     if filtro_status:
-        query = query.filter(FinContasPagar.status == filtro_status)
+        filtros.append(FinContasPagar.status == filtro_status)
 
     if filtro_motorista_id:
-        query = query.filter(FinContasPagar.motorista_id ==
-                             int(filtro_motorista_id))
+        filtros.append(FinContasPagar.motorista_id == int(filtro_motorista_id))
 
     if filtro_data_inicio:
         data_inicio = datetime.strptime(filtro_data_inicio, '%Y-%m-%d').date()
-        query = query.filter(FinContasPagar.data_emissao >= data_inicio)
+        filtros.append(FinContasPagar.data_emissao >= data_inicio)
 
     if filtro_data_fim:
         data_fim = datetime.strptime(filtro_data_fim, '%Y-%m-%d').date()
-        query = query.filter(FinContasPagar.data_emissao <= data_fim)
+        filtros.append(FinContasPagar.data_emissao <= data_fim)
 
-    # Ordenar por data de emissão decrescente
-    titulos = query.order_by(FinContasPagar.data_emissao.desc()).all()
+    # Página atual, por vencimento decrescente (paginação por chave)
+    pagina = pagina_titulos(
+        FinContasPagar, filtros, apos=request.args.get('apos'),
+        antes=request.args.get('antes'),
+        opcoes=(db.joinedload(FinContasPagar.motorista),))
 
     # Buscar motoristas para o filtro
     motoristas = Motorista.query.filter_by(
         status='Ativo').order_by(Motorista.nome).all()
 
-    # Calcular totalizadores
-    total_aberto = sum([float(t.valor_total)
-                       for t in titulos if t.status == 'Aberto'])
-    total_pago = sum([float(t.valor_total)
-                     for t in titulos if t.status == 'Pago'])
-    total_vencido = sum([float(t.valor_total)
-                        for t in titulos if t.status == 'Vencido'])
+    # Calcular totalizadores (GROUP BY status no banco)
+    totais = totais_por_status(FinContasPagar, filtros)
+    total_titulos = sum(quantidade for quantidade, _ in totais.values())
+    total_aberto = totais.get('Aberto', (0, 0.0))[1]
+    total_pago = totais.get('Pago', (0, 0.0))[1]
+    total_vencido = totais.get('Vencido', (0, 0.0))[1]
+
+    # Filtros repetidos nos links de paginação
+    filtros_url = {chave: valor for chave, valor in (
+        ('status', filtro_status), ('motorista_id', filtro_motorista_id),
+        ('data_inicio', filtro_data_inicio), ('data_fim', filtro_data_fim)) if valor}
 
     return render_template('financeiro/contas_pagar.html',
-                           titulos=titulos,
+                           titulos=pagina.titulos,
+                           pagina=pagina,
+                           filtros_url=filtros_url,
+                           total_titulos=total_titulos,
                            motoristas=motoristas,
                            filtro_status=filtro_status,
                            filtro_motorista_id=filtro_motorista_id,
@@ -380,12 +392,15 @@ def gerar_pagamento():
             return redirect(url_for('financeiro.gerar_pagamento'))
 
         try:
-            # Buscar viagens selecionadas (com hora parada)
+            # Espera um repasse em lote em andamento ('flask pagar-periodo')
+            bloquear_serie('PAG')
+
+            # Buscar viagens selecionadas (com hora parada), sem as já pagas
             viagens = Viagem.query.options(db.joinedload(Viagem.hora_parada)).filter(
-                Viagem.id.in_(viagens_ids)).all()
+                Viagem.id.in_(viagens_ids), viagem_nao_paga()).all()
 
             if not viagens:
-                flash('Nenhuma viagem selecionada!', 'danger')
+                flash('Nenhuma viagem selecionada (ou todas já pagas)!', 'danger')
                 return redirect(url_for('financeiro.gerar_pagamento'))
 
             # Calcular valor total de repasse (incluindo hora parada)
@@ -395,14 +410,8 @@ def gerar_pagamento():
                 if v.hora_parada:
                     valor_total += float(v.hora_parada.repasse_adicional)
 
-            # Gerar número do título
-            ultimo_titulo = FinContasPagar.query.order_by(
-                FinContasPagar.id.desc()).first()
-            if ultimo_titulo:
-                ultimo_numero = int(ultimo_titulo.numero_titulo.split('-')[-1])
-                novo_numero = f"PAG-{date.today().year}-{str(ultimo_numero + 1).zfill(4)}"
-            else:
-                novo_numero = f"PAG-{date.today().year}-0001"
+            # Gerar número do título (contador no banco, ver app/utils/numeracao.py)
+            novo_numero = proximo_numero_titulo('PAG')
 
             # Criar título a pagar
             titulo = FinContasPagar(
@@ -465,19 +474,7 @@ def buscar_viagens_pagar():
         dt_fim = datetime.strptime(data_fim, '%Y-%m-%d')
 
         # Buscar viagens finalizadas que ainda não foram pagas
-        viagens_pagas_ids = db.session.query(FinPagarViagens.viagem_id).all()
-        viagens_pagas_ids = [v[0] for v in viagens_pagas_ids]
-
-        viagens = Viagem.query.options(db.joinedload(Viagem.hora_parada)).filter(
-            and_(
-                Viagem.motorista_id == int(motorista_id),
-                Viagem.status == 'Finalizada',
-                Viagem.data_criacao >= dt_inicio,
-                Viagem.data_criacao <= dt_fim,
-                ~Viagem.id.in_(
-                    viagens_pagas_ids) if viagens_pagas_ids else True
-            )
-        ).order_by(Viagem.data_criacao.desc()).all()
+        viagens = viagens_a_pagar(int(motorista_id), dt_inicio, dt_fim)
 
         # Montar resposta
         viagens_data = []
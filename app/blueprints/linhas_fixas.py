@@ -0,0 +1,214 @@
+"""
+Módulo de Linhas Fixas
+======================
+
+Cadastro das linhas fixas (corridas recorrentes) dos colaboradores e
+geração manual das solicitações 'FIXA' dos próximos dias. A geração
+diária é feita pelo comando 'flask gerar-linhas-fixas' (agendado no cron).
+"""
+
+from flask import render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+from datetime import datetime
+from sqlalchemy.orm import joinedload
+import re
+
+from .. import db
+from ..models import LinhaFixa, Colaborador, Planta, Supervisor, Turno
+from ..decorators import permission_required
+from ..utils.linhas_fixas import gerar_solicitacoes_fixas, DIAS_PADRAO
+
+from .admin import admin_bp
+
+# IMPORTAR SISTEMA DE AUDITORIA
+from ..utils.admin_audit import log_audit, AuditAction
+
+
+def _plantas_do_usuario():
+    """Plantas que o usuário pode usar nas linhas fixas."""
+    if current_user.role == 'supervisor':
+        return list(current_user.supervisor.plantas)
+    return Planta.query.order_by(Planta.nome).all()
+
+
+@admin_bp.route('/linhas_fixas')
+@login_required
+@permission_required(['admin', 'supervisor', 'operador'])
+def linhas_fixas():
+    plantas = _plantas_do_usuario()
+    planta_ids = [p.id for p in plantas]
+
+    query = LinhaFixa.query.options(
+        joinedload(LinhaFixa.colaborador),
+        joinedload(LinhaFixa.turno),
+        joinedload(LinhaFixa.planta)
+    ).filter(LinhaFixa.planta_id.in_(planta_ids))
+
+    if request.args.get('planta_id'):
+        query = query.filter(LinhaFixa.planta_id == request.args.get('planta_id', type=int))
+    if request.args.get('situacao', 'ativas') == 'ativas':
+        query = query.filter(LinhaFixa.ativa.is_(True))
+
+    page = request.args.get('page', 1, type=int)
+    pagination = query.order_by(LinhaFixa.planta_id, LinhaFixa.turno_id, LinhaFixa.id).paginate(
+        page=page, per_page=50, error_out=False)
+
+    turnos = Turno.query.filter(Turno.planta_id.in_(planta_ids)).order_by(
+        Turno.planta_id, Turno.nome).all()
+
+    return render_template(
+        'linhas_fixas.html',
+        linhas=pagination.items,
+        pagination=pagination,
+        plantas=plantas,
+        turnos=turnos,
+        tipos_corrida=LinhaFixa.TIPOS_CORRIDA,
+        nomes_dias=LinhaFixa.NOMES_DIAS,
+        dias_padrao=DIAS_PADRAO,
+        filtros={k: v for k, v in request.args.items() if k != 'page'}
+    )
+
+
+@admin_bp.route('/linhas_fixas/cadastrar', methods=['POST'])
+@login_required
+@permission_required(['admin', 'supervisor', 'operador'])
+def cadastrar_linhas_fixas():
+    """Cria uma linha fixa para cada matrícula informada."""
+    planta_id = request.form.get('planta_id', type=int)
+    turno = Turno.query.get(request.form.get('turno_id', type=int) or 0)
+    tipo_corrida = request.form.get('tipo_corrida')
+    dias = sorted({int(d) for d in request.form.getlist('dias_semana') if d.isdigit() and int(d) < 7})
+    matriculas = [m for m in re.split(r'[\s,;]+', request.form.get('matriculas', '')) if m]
+
+    if planta_id not in [p.id for p in _plantas_do_usuario()]:
+        flash('Planta inválida.', 'danger')
+        return redirect(url_for('admin.linhas_fixas'))
+    if not turno or turno.planta_id != planta_id:
+        flash('Selecione um turno da planta.', 'danger')
+        return redirect(url_for('admin.linhas_fixas'))
+    if tipo_corrida not in LinhaFixa.TIPOS_CORRIDA:
+        flash('Tipo de corrida inválido.', 'danger')
+        return redirect(url_for('admin.linhas_fixas'))
+    if not dias or not matriculas:
+        flash('Informe os dias da semana e ao menos uma matrícula.', 'warning')
+        return redirect(url_for('admin.linhas_fixas'))
+
+    try:
+        data_inicio = datetime.strptime(request.form.get('data_inicio'), '%Y-%m-%d').date()
+        data_fim = request.form.get('data_fim')
+        data_fim = datetime.strptime(data_fim, '%Y-%m-%d').date() if data_fim else None
+    except (TypeError, ValueError):
+        flash('Datas de vigência inválidas.', 'danger')
+        return redirect(url_for('admin.linhas_fixas'))
+    if data_fim and data_fim < data_inicio:
+        flash('O fim da vigência deve ser posterior ao início.', 'danger')
+        return redirect(url_for('admin.linhas_fixas'))
+
+    if current_user.role == 'supervisor':
+        supervisor_id = current_user.supervisor.id
+    else:
+        supervisor = Supervisor.query.join(
+            Supervisor.plantas).filter(Planta.id == planta_id).first()
+        if not supervisor:
+            flash('Nenhum supervisor encontrado para esta planta.', 'danger')
+            return redirect(url_for('admin.linhas_fixas'))
+        supervisor_id = supervisor.id
+
+    # Colaboradores da planta, em uma consulta
+    colaboradores = {
+        c.matricula: c for c in db.session.query(
+            Colaborador.id, Colaborador.matricula, Colaborador.empresa_id
+        ).filter(Colaborador.matricula.in_(matriculas),
+                 Colaborador.planta_id == planta_id)
+    }
+    nao_encontradas = [m for m in matriculas if m not in colaboradores]
+
+    registros = [{
+        'colaborador_id': c.id,
+        'supervisor_id': supervisor_id,
+        'empresa_id': c.empresa_id,
+        'planta_id': planta_id,
+        'turno_id': turno.id,
+        'tipo_corrida': tipo_corrida,
+        'dias_semana': ','.join(str(d) for d in dias),
+        'data_inicio': data_inicio,
+        'data_fim': data_fim,
+        'ativa': True,
+        'created_by_user_id': current_user.id,
+    } for c in colaboradores.values()]
+
+    if registros:
+        db.session.bulk_insert_mappings(LinhaFixa, registros)
+        db.session.commit()
+
+        log_audit(
+            action=AuditAction.BULK_CREATE,
+            resource_type='LinhaFixa',
+            status='SUCCESS',
+            severity='INFO',
+            changes={
+                'planta_id': planta_id,
+                'turno_id': turno.id,
+                'tipo_corrida': tipo_corrida,
+                'dias_semana': dias,
+                'quantidade': len(registros)
+            }
+        )
+        flash(f'{len(registros)} linha(s) fixa(s) cadastrada(s). As solicitações '
+              f'serão geradas na próxima execução do agendador.', 'success')
+
+    if nao_encontradas:
+        flash(f'Matrículas não encontradas nesta planta: {", ".join(nao_encontradas)}', 'warning')
+    return redirect(url_for('admin.linhas_fixas'))
+
+
+@admin_bp.route('/linhas_fixas/desativar/<int:linha_id>', methods=['POST'])
+@login_required
+@permission_required(['admin', 'supervisor', 'operador'])
+def desativar_linha_fixa(linha_id):
+    linha = LinhaFixa.query.get_or_404(linha_id)
+    if linha.planta_id not in [p.id for p in _plantas_do_usuario()]:
+        flash('Linha fixa de outra planta.', 'danger')
+        return redirect(url_for('admin.linhas_fixas'))
+
+    linha.ativa = False
+    db.session.commit()
+
+    log_audit(
+        action=AuditAction.UPDATE,
+        resource_type='LinhaFixa',
+        resource_id=linha.id,
+        status='SUCCESS',
+        severity='INFO',
+        changes={'ativa': {'before': True, 'after': False}}
+    )
+    flash('Linha fixa desativada. Solicitações já geradas não são alteradas.', 'success')
+    return redirect(url_for('admin.linhas_fixas'))
+
+
+@admin_bp.route('/linhas_fixas/gerar', methods=['POST'])
+@login_required
+@permission_required(['admin', 'operador'])
+def gerar_linhas_fixas():
+    """Executa o agendador agora (mesmo efeito do comando agendado)."""
+    dias = request.form.get('dias', DIAS_PADRAO, type=int)
+    resultado = gerar_solicitacoes_fixas(dias=max(1, min(dias, 31)))
+
+    if resultado.criadas:
+        log_audit(
+            action=AuditAction.BULK_CREATE,
+            resource_type='Solicitacao',
+            status='SUCCESS',
+            severity='INFO',
+            changes={
+                'origem': 'linhas_fixas',
+                'inicio': resultado.inicio.isoformat(),
+                'fim': resultado.fim.isoformat(),
+                'quantidade': resultado.criadas,
+                'duplicadas': resultado.ignoradas
+            }
+        )
+    flash(f'{resultado.criadas} solicitação(ões) FIXA gerada(s) de '
+          f'{resultado.inicio.strftime("%d/%m")} a {resultado.fim.strftime("%d/%m")} '
+          f'({resultado.ignoradas} já existiam).', 'success')
+    return redirect(url_for('admin.linhas_fixas'))
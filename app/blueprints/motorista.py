@@ -14,19 +14,24 @@ Funcionalidades:
 - Cancelar viagem aceita
 - Iniciar viagem
 - Finalizar viagem
+- Stream (SSE) das viagens disponíveis e API JSON com delta-sync para o app
 
 Autor: Sistema DOUG Moving
 Data: 2025
 """
 
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app
+from flask import Blueprint, Response, render_template, request, jsonify, flash, redirect, url_for, current_app
 from flask_login import login_required, current_user
 from datetime import datetime
 from sqlalchemy import and_, or_
+import hashlib
+import json
+import queue
 
 from .. import db
 from ..models import Viagem, Motorista, Solicitacao, Colaborador, User, Empresa, Planta, CentroCusto, Turno, Bloco, Bairro
 from ..decorators import role_required
+from ..utils import eventos_viagem, sincronizacao
 
 # Importação condicional de notificações
 try:
@@ -127,6 +132,9 @@ def dashboard_motorista():
             )
         ).count()
 
+    # Eventos posteriores a este ponto chegam pelo /motorista/stream
+    ultimo_evento_id = eventos_viagem.ultimo_id()
+
     # Viagens disponíveis (Pendente, sem motorista) - limit(30) - quantidade de viagens aparece na tela
     viagens_disponiveis = Viagem.query.filter_by(
         status='Pendente',
@@ -148,7 +156,8 @@ def dashboard_motorista():
         viagens_em_andamento=viagens_em_andamento,
         viagens_finalizadas_mes=viagens_finalizadas_mes,
         viagens_disponiveis=viagens_disponiveis,
-        minhas_viagens=minhas_viagens
+        minhas_viagens=minhas_viagens,
+        ultimo_evento_id=ultimo_evento_id
     )
 
 
@@ -211,10 +220,157 @@ def detalhes_viagem(viagem_id):
     )
 
 
+STREAM_HEARTBEAT = 20     # segundos entre comentários de keep-alive
+STREAM_RECONEXAO = 5000   # ms que o navegador espera para reconectar
+
+
+def _mensagem_sse(tipo, dados, evento_id=None):
+    linhas = []
+    if evento_id:
+        linhas.append(f'id: {evento_id}')
+    linhas.append(f'event: {tipo}')
+    linhas.append(f'data: {json.dumps(dados, ensure_ascii=False)}')
+    return '\n'.join(linhas) + '\n\n'
+
+
+def _stream_viagens(engine, assinante, pendentes):
+    """Gerador do SSE: replay/snapshot inicial e depois os eventos ao vivo."""
+    try:
+        yield f'retry: {STREAM_RECONEXAO}\n\n'
+        if pendentes is None:
+            yield _mensagem_sse('snapshot', eventos_viagem.carregar_disponiveis(engine),
+                                eventos_viagem.ultimo_id())
+        else:
+            for evento in pendentes:
+                yield _mensagem_sse(evento.tipo, evento.dados, evento.id)
+
+        while True:
+            try:
+                evento = assinante.fila.get(timeout=STREAM_HEARTBEAT)
+            except queue.Empty:
+                yield ': ping\n\n'
+                continue
+            if evento is None:
+                # Eventos descartados (cliente lento): envia a lista inteira
+                yield _mensagem_sse('snapshot', eventos_viagem.carregar_disponiveis(engine),
+                                    eventos_viagem.ultimo_id())
+            else:
+                yield _mensagem_sse(evento.tipo, evento.dados, evento.id)
+    finally:
+        eventos_viagem.cancelar_assinatura(assinante)
+
+
+@motorista_bp.route('/stream')
+@login_required
+@role_required('motorista')
+def stream_viagens():
+    """
+    Server-Sent Events com as mudanças nas viagens disponíveis.
+
+    Na reconexão o navegador envia Last-Event-ID e recebe os eventos
+    perdidos; na primeira conexão o dashboard informa ?desde= com o id
+    do momento em que a página foi montada. Se não for possível saber o
+    que foi perdido, o primeiro evento é um 'snapshot' com a lista atual.
+
+    Cada conexão aberta ocupa uma thread do servidor: em produção use
+    workers com threads ou gevent (ex: gunicorn -k gthread --threads 50).
+    """
+    engine = db.engine
+    assinante, pendentes = eventos_viagem.assinar(
+        request.headers.get('Last-Event-ID') or request.args.get('desde'), engine)
+
+    # Libera a conexão do banco: o stream fica aberto por muito tempo e
+    # não usa a sessão (snapshot usa conexão própria e curta)
+    db.session.remove()
+
+    resposta = Response(_stream_viagens(engine, assinante, pendentes),
+                        mimetype='text/event-stream')
+    resposta.headers['Cache-Control'] = 'no-cache'
+    resposta.headers['X-Accel-Buffering'] = 'no'  # nginx: não bufferizar
+    return resposta
+
+
+# =============================================================================
+# API JSON DO APP (DELTA-SYNC)
+# =============================================================================
+
+def _json_condicional(corpo, etag=None):
+    """Resposta JSON com ETag; devolve 304 se o app já tem esta versão."""
+    resposta = jsonify(corpo)
+    resposta.set_etag(etag or hashlib.sha1(resposta.get_data()).hexdigest(), weak=True)
+    # O app sempre revalida (If-None-Match); nada fica em caches compartilhados
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta.make_conditional(request)
+
+
+@motorista_bp.route('/api/v1/viagens/<visao>')
+@login_required
+@role_required('motorista')
+def api_viagens(visao):
+    """
+    Lista 'disponiveis' ou 'minhas' (Agendada / Em Andamento).
+
+    ?since=<token> devolve só as alterações desde a chamada que retornou o
+    token: viagens novas/alteradas e os ids das que saíram da lista.
+    """
+    motorista = current_user.motorista
+    if not motorista:
+        return jsonify({'erro': 'Perfil de motorista não encontrado.'}), 404
+    if visao not in sincronizacao.VISOES:
+        return jsonify({'erro': f'Visão inválida. Use: {", ".join(sincronizacao.VISOES)}.'}), 404
+
+    since = request.args.get('since')
+    if since is not None and not since.isdigit():
+        return jsonify({'erro': 'since deve ser o token devolvido pela chamada anterior.'}), 400
+
+    corpo = sincronizacao.sincronizar(visao, motorista.id,
+                                      int(since) if since is not None else None)
+    return _json_condicional(corpo)
+
+
+@motorista_bp.route('/api/v1/viagens/<int:viagem_id>')
+@login_required
+@role_required('motorista')
+def api_detalhes_viagem(viagem_id):
+    """Detalhes da viagem (com colaboradores); ETag pela versão da viagem."""
+    motorista = current_user.motorista
+    viagem = Viagem.query.get(viagem_id)
+    if not viagem or not motorista:
+        return jsonify({'erro': 'Viagem não encontrada.'}), 404
+    if viagem.motorista_id and viagem.motorista_id != motorista.id:
+        return jsonify({'erro': 'Você não tem permissão para visualizar esta viagem.'}), 403
+
+    # Mesma versão: 304 sem consultar os colaboradores
+    etag = f'viagem-{viagem.id}-{viagem.versao}'
+    if request.if_none_match.contains_weak(etag):
+        resposta = current_app.response_class(status=304)
+        resposta.set_etag(etag, weak=True)
+        return resposta
+
+    return _json_condicional(sincronizacao.detalhe_viagem(viagem), etag)
+
+
 # =============================================================================
 # ROTAS DE AÇÃO
 # =============================================================================
 
+def _viagem_no_mesmo_horario(viagem, motorista):
+    """Viagem Agendada/Em Andamento do motorista no horário da viagem (ou None)."""
+    horario_viagem = viagem.horario_entrada or viagem.horario_saida
+    if not horario_viagem:
+        return None
+    return Viagem.query.filter(
+        and_(
+            Viagem.motorista_id == motorista.id,
+            Viagem.status.in_(['Agendada', 'Em Andamento']),
+            or_(
+                Viagem.horario_entrada == horario_viagem,
+                Viagem.horario_saida == horario_viagem
+            )
+        )
+    ).first()
+
+
 @motorista_bp.route('/viagens/<int:viagem_id>/aceitar', methods=['POST'])
 @login_required
 @role_required('motorista')
@@ -225,6 +381,11 @@ def aceitar_viagem(viagem_id):
     viagem = Viagem.query.get_or_404(viagem_id)
 
     # Verifica se a viagem pode ser aceita
+    if viagem.motorista_id and viagem.motorista_id != motorista.id:
+        return jsonify({
+            'sucesso': False,
+            'mensagem': 'Esta viagem já foi aceita por outro motorista.'
+        }), 409
     if not viagem.pode_ser_aceita():
         return jsonify({
             'sucesso': False,
@@ -239,50 +400,35 @@ def aceitar_viagem(viagem_id):
         }), 400
 
     # Verifica se o motorista já tem outra viagem no mesmo horário
-    horario_viagem = viagem.horario_entrada or viagem.horario_saida
-    if horario_viagem:
-        conflito = Viagem.query.filter(
-            and_(
-                Viagem.motorista_id == motorista.id,
-                Viagem.status.in_(['Agendada', 'Em Andamento']),
-                or_(
-                    Viagem.horario_entrada == horario_viagem,
-                    Viagem.horario_saida == horario_viagem
-                )
-            )
-        ).first()
-
-        if conflito:
-            return jsonify({
-                'sucesso': False,
-                'mensagem': f'Você já tem uma viagem agendada para este horário (Viagem #{conflito.id}).'
-            }), 400
+    conflito = _viagem_no_mesmo_horario(viagem, motorista)
+    if conflito:
+        return jsonify({
+            'sucesso': False,
+            'mensagem': f'Você já tem uma viagem agendada para este horário (Viagem #{conflito.id}).'
+        }), 400
 
     try:
-        # Aceita a viagem
-        sucesso = viagem.aceitar_viagem(motorista)
+        # Aceita a viagem (UPDATE condicional: só um motorista consegue, e só
+        # se o horário continuar livre para ele)
+        sucesso = viagem.aceitar_viagem(motorista, exigir_horario_livre=True)
 
         if not sucesso:
+            db.session.rollback()
+            # Outra aba do mesmo motorista aceitou uma viagem no mesmo horário
+            conflito = _viagem_no_mesmo_horario(viagem, motorista)
+            if conflito:
+                return jsonify({
+                    'sucesso': False,
+                    'mensagem': f'Você já tem uma viagem agendada para este horário (Viagem #{conflito.id}).'
+                }), 400
             return jsonify({
                 'sucesso': False,
-                'mensagem': 'Não foi possível aceitar a viagem.'
-            }), 400
-
-        db.session.commit()
-
-        # ✅ LOG no Terminal (APÓS commit)
-        num_passageiros = len(
-            viagem.solicitacoes) if viagem.solicitacoes else 0
-        current_app.logger.info(
-            f"✅ VIAGEM ACEITA: ID={viagem.id}, "
-            f"Motorista={motorista.nome}, "
-            f"Passageiros={num_passageiros}, "
-            f"Bloco={viagem.bloco.codigo_bloco if viagem.bloco else 'N/A'}, "
-            f"Data={viagem.data_inicio}"
-        )
+                'mensagem': 'Esta viagem já foi aceita por outro motorista.'
+            }), 409
 
         # ========== INTEGRAÇÃO WHATSAPP - INÍCIO ==========
-        # Envia notificação WhatsApp para colaboradores (exceto Desligamento)
+        # Enfileira a notificação WhatsApp para colaboradores (exceto Desligamento)
+        # na mesma transação do aceite
         if viagem.tipo_corrida != 'desligamento':
             try:
                 sucesso = notification_service.notificar_viagem_confirmada(
@@ -301,6 +447,19 @@ def aceitar_viagem(viagem_id):
 
         # ========== INTEGRAÇÃO WHATSAPP - FIM ==========
 
+        db.session.commit()
+
+        # ✅ LOG no Terminal (APÓS commit)
+        num_passageiros = len(
+            viagem.solicitacoes) if viagem.solicitacoes else 0
+        current_app.logger.info(
+            f"✅ VIAGEM ACEITA: ID={viagem.id}, "
+            f"Motorista={motorista.nome}, "
+            f"Passageiros={num_passageiros}, "
+            f"Bloco={viagem.bloco.codigo_bloco if viagem.bloco else 'N/A'}, "
+            f"Data={viagem.data_inicio}"
+        )
+
         # Registra no log de auditoria
         log_viagem_audit(
             viagem_id=viagem.id,
@@ -391,9 +550,8 @@ def cancelar_viagem(viagem_id):
                 'mensagem': 'Não foi possível cancelar a viagem.'
             }), 400
 
-        db.session.commit()
-
-        # Notifica colaboradores sobre cancelamento (exceto Desligamento)
+        # Notifica colaboradores sobre cancelamento (exceto Desligamento),
+        # na mesma transação da desassociação
         if viagem.tipo_corrida != 'desligamento':
             try:
                 enviadas = notification_service.notificar_viagem_cancelada_por_motorista(
@@ -406,6 +564,8 @@ def cancelar_viagem(viagem_id):
                     f"Erro ao notificar colaboradores sobre cancelamento da viagem #{viagem.id}: {e}")
                 # Não interrompe o processo se notificação falhar
 
+        db.session.commit()
+
         # Registra no log de auditoria com o motivo
         log_viagem_audit(
             viagem_id=viagem.id,
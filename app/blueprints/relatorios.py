@@ -25,6 +25,7 @@ from reportlab.lib.units import inch
 from app import db
 from app.models import Solicitacao, Viagem, Motorista, Colaborador, Empresa, Planta, Bloco, Supervisor, Gerente
 from app import cache
+from app.decorators import somente_leitura
 from sqlalchemy.orm import joinedload
 import locale
 # locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
@@ -76,6 +77,7 @@ def get_user_motorista_id():
 
 @relatorios_bp.route('/solicitacoes')
 @login_required
+@somente_leitura
 def listagem_solicitacoes():
     """Exibe a tela de filtros para o relatório de solicitações"""
 
@@ -122,6 +124,7 @@ def listagem_solicitacoes():
 @relatorios_bp.route('/solicitacoes/dados', methods=['POST'])
 @login_required
 # @cache.cached(timeout=30, query_string=True)
+@somente_leitura
 def dados_listagem_solicitacoes():
     """Retorna os dados do relatório de solicitações em JSON"""
 
@@ -291,6 +294,7 @@ def dados_listagem_solicitacoes():
 
 @relatorios_bp.route('/conferencia-viagens')
 @login_required
+@somente_leitura
 def conferencia_viagens():
     """Exibe a tela de filtros para o relatório de conferência de viagens"""
 
@@ -331,6 +335,7 @@ def conferencia_viagens():
 @relatorios_bp.route('/conferencia-viagens/dados', methods=['POST'])
 @login_required
 # @cache.cached(timeout=30, query_string=True) - Removido a opção de guardar no cache por 30 segundos.
+@somente_leitura
 def dados_conferencia_viagens():
     """Retorna os dados do relatório de conferência de viagens em JSON"""
 
@@ -575,6 +580,7 @@ def dados_conferencia_viagens():
 
 @relatorios_bp.route('/conferencia-motoristas')
 @login_required
+@somente_leitura
 def conferencia_motoristas():
     """Exibe a tela de filtros para o relatório de conferência de motoristas"""
 
@@ -597,6 +603,7 @@ def conferencia_motoristas():
 @relatorios_bp.route('/conferencia-motoristas/dados', methods=['POST'])
 @login_required
 # @cache.cached(timeout=30, query_string=True)
+@somente_leitura
 def dados_conferencia_motoristas():
     """Retorna os dados do relatório de conferência de motoristas em JSON"""
 
@@ -798,6 +805,7 @@ def dados_conferencia_motoristas():
 @relatorios_bp.route('/plantas-por-empresa/<int:empresa_id>')
 @login_required
 @cache.cached(timeout=3600, query_string=True)
+@somente_leitura
 def plantas_por_empresa(empresa_id):
     """Retorna as plantas de uma empresa específica (para filtro dinâmico)"""
     try:
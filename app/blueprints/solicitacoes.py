@@ -11,6 +11,7 @@ from werkzeug.security import generate_password_hash
 from werkzeug.utils import secure_filename
 from datetime import datetime
 from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 from io import StringIO
 import io
@@ -30,6 +31,9 @@ from .admin import admin_bp
 
 # IMPORTAR SISTEMA DE AUDITORIA
 from ..utils.admin_audit import log_audit, AuditAction
+from ..utils.solicitacoes_lote import (
+    LoteSolicitacoes, COLUNA_HORARIO, gravar_solicitacoes
+)
 
 logger = logging.getLogger(__name__)
 # No início do arquivo
@@ -318,252 +322,90 @@ def nova_solicitacao():
                 flash('Permissão negada.', 'danger')
                 return redirect(url_for('home'))
 
-            # Função auxiliar para buscar ID do turno pelo nome
-            def buscar_turno_id(nome_turno, planta_id):
-                if not nome_turno or nome_turno == 'Não definido':
-                    return None
-                turno = Turno.query.filter_by(
-                    nome=nome_turno, planta_id=planta_id).first()
-                return turno.id if turno else None
-
-            # Função auxiliar para buscar valor baseado em bloco e turno
-            def buscar_valores(bloco_id, turno_id):
-                if not bloco_id or not turno_id:
-                    return None, None
-
-                bloco = Bloco.query.get(bloco_id)
-                turno = Turno.query.get(turno_id)
-
-                if not bloco or not turno:
-                    return None, None
-
-                valor = bloco.get_valor_por_turno(turno)
-                repasse = bloco.get_repasse_por_turno(turno)
+            # Pré-carrega colaboradores, turnos da planta e tarifas dos blocos
+            lote = LoteSolicitacoes(planta_id, colaborador_ids)
+            user_id = current_user.id if current_user.is_authenticated else None
 
-                return float(valor) if valor else None, float(repasse) if repasse else None
-
-            # Cria as solicitações
-            solicitacoes_criadas = 0
-            solicitacoes_ids_criadas = []  # Para auditoria
-            solicitacoes_duplicadas = []
+            horarios_por_tipo = {
+                'entrada': (horarios_entrada, turnos_entrada),
+                'saida': (horarios_saida, turnos_saida),
+                'desligamento': (horarios_desligamento, turnos_desligamento),
+            }
+            # entrada_saida gera 2 solicitações separadas (entrada e saída),
+            # cada uma só se o horário foi informado
+            if tipo_corrida == 'entrada_saida':
+                partes = ['entrada', 'saida']
+            else:
+                partes = [tipo_corrida]
+            rotulos = {'entrada': 'entrada', 'saida': 'saída',
+                       'desligamento': 'desligamento'}
 
+            # Monta as solicitações
+            registros = []
+            nomes = []  # Para a mensagem de duplicadas
             for i, colab_id in enumerate(colaborador_ids):
-                # Verifica se o colaborador existe
-                colaborador = Colaborador.query.get(colab_id)
+                colaborador = lote.colaborador(colab_id)
                 if not colaborador:
                     continue
 
-                # Obtém o ID do usuário logado
-                user_id = current_user.id if current_user.is_authenticated else None
-
-                dados_solicitacao = {
-                    'colaborador_id': colab_id,
-                    'supervisor_id': supervisor_id,
-                    'empresa_id': empresa_id,
-                    'planta_id': planta_id,
-                    'bloco_id': colaborador.bloco_id,
-                    'tipo_linha': 'EXTRA',  # Por enquanto sempre EXTRA
-                    'tipo_corrida': tipo_corrida,
-                    'status': 'Pendente',
-                    'created_by_user_id': user_id  # Quem criou a solicitação
-                }
-
-                # Adiciona horários e turnos baseado no tipo de corrida
-                turno_principal_id = None  # Para calcular o valor
-
-                if tipo_corrida == 'entrada':
-                    if i < len(horarios_entrada) and horarios_entrada[i]:
-                        dados_solicitacao['horario_entrada'] = datetime.strptime(
-                            horarios_entrada[i], '%Y-%m-%dT%H:%M')
-                        if i < len(turnos_entrada):
-                            dados_solicitacao['turno_entrada_id'] = buscar_turno_id(
-                                turnos_entrada[i], planta_id)
-                            turno_principal_id = dados_solicitacao['turno_entrada_id']
-
-                elif tipo_corrida == 'saida':
-                    if i < len(horarios_saida) and horarios_saida[i]:
-                        dados_solicitacao['horario_saida'] = datetime.strptime(
-                            horarios_saida[i], '%Y-%m-%dT%H:%M')
-                        if i < len(turnos_saida):
-                            dados_solicitacao['turno_saida_id'] = buscar_turno_id(
-                                turnos_saida[i], planta_id)
-                            turno_principal_id = dados_solicitacao['turno_saida_id']
-
-                elif tipo_corrida == 'entrada_saida':
-                    # CORRIGIDO: Cria 2 solicitações separadas (uma de entrada e outra de saída)
-
-                    # 1. Cria solicitação de ENTRADA
-                    if i < len(horarios_entrada) and horarios_entrada[i]:
-                        dados_entrada = dados_solicitacao.copy()
-                        dados_entrada['tipo_corrida'] = 'entrada'
-                        dados_entrada['horario_entrada'] = datetime.strptime(
-                            horarios_entrada[i], '%Y-%m-%dT%H:%M')
-
-                        if i < len(turnos_entrada):
-                            turno_entrada_id = buscar_turno_id(
-                                turnos_entrada[i], planta_id)
-                            dados_entrada['turno_entrada_id'] = turno_entrada_id
-
-                            # Calcula valores para entrada
-                            valor, repasse = buscar_valores(
-                                colaborador.bloco_id, turno_entrada_id)
-                            if valor:
-                                dados_entrada['valor'] = valor
-                            if repasse:
-                                dados_entrada['valor_repasse'] = repasse
-
-                        # Validação de duplicação para entrada
-                        data_entrada = dados_entrada['horario_entrada'].date()
-                        entrada_existente = Solicitacao.query.filter(
-                            Solicitacao.colaborador_id == colab_id,
-                            Solicitacao.tipo_corrida == 'entrada',
-                            db.func.date(
-                                Solicitacao.horario_entrada) == data_entrada,
-                            Solicitacao.status != 'Cancelada'
-                        ).first()
-
-                        if not entrada_existente:
-                            solicitacao_entrada = Solicitacao(**dados_entrada)
-                            db.session.add(solicitacao_entrada)
-                            db.session.flush()  # Para obter o ID
-                            solicitacoes_ids_criadas.append(
-                                solicitacao_entrada.id)
-                            solicitacoes_criadas += 1
-                        else:
-                            solicitacoes_duplicadas.append(
-                                f"{colaborador.nome} (entrada)")
-
-                    # 2. Cria solicitação de SAÍDA
-                    if i < len(horarios_saida) and horarios_saida[i]:
-                        dados_saida = dados_solicitacao.copy()
-                        dados_saida['tipo_corrida'] = 'saida'
-                        dados_saida['horario_saida'] = datetime.strptime(
-                            horarios_saida[i], '%Y-%m-%dT%H:%M')
-
-                        if i < len(turnos_saida):
-                            turno_saida_id = buscar_turno_id(
-                                turnos_saida[i], planta_id)
-                            dados_saida['turno_saida_id'] = turno_saida_id
-
-                            # Calcula valores para saída
-                            valor, repasse = buscar_valores(
-                                colaborador.bloco_id, turno_saida_id)
+                for tipo in partes:
+                    horarios, turnos = horarios_por_tipo[tipo]
+                    horario = None
+                    if i < len(horarios) and horarios[i]:
+                        horario = datetime.strptime(horarios[i], '%Y-%m-%dT%H:%M')
+                    elif tipo_corrida == 'entrada_saida':
+                        continue
+
+                    dados = {
+                        'colaborador_id': colaborador.id,
+                        'supervisor_id': supervisor_id,
+                        'empresa_id': empresa_id,
+                        'planta_id': planta_id,
+                        'bloco_id': colaborador.bloco_id,
+                        'tipo_linha': 'EXTRA',  # Por enquanto sempre EXTRA
+                        'tipo_corrida': tipo,
+                        'status': 'Pendente',
+                        'created_by_user_id': user_id  # Quem criou a solicitação
+                    }
+                    if horario:
+                        dados[COLUNA_HORARIO[tipo]] = horario
+                        if i < len(turnos):
+                            turno_id = lote.turno_id(turnos[i])
+                            dados[f'turno_{tipo}_id'] = turno_id
+
+                            # Calcula valores baseado em bloco e turno
+                            valor, repasse = lote.valores(
+                                colaborador.bloco_id, turno_id)
                             if valor:
-                                dados_saida['valor'] = valor
+                                dados['valor'] = valor
                             if repasse:
-                                dados_saida['valor_repasse'] = repasse
-
-                        # Validação de duplicação para saída
-                        data_saida = dados_saida['horario_saida'].date()
-                        saida_existente = Solicitacao.query.filter(
-                            Solicitacao.colaborador_id == colab_id,
-                            Solicitacao.tipo_corrida == 'saida',
-                            db.func.date(
-                                Solicitacao.horario_saida) == data_saida,
-                            Solicitacao.status != 'Cancelada'
-                        ).first()
-
-                        if not saida_existente:
-                            solicitacao_saida = Solicitacao(**dados_saida)
-                            db.session.add(solicitacao_saida)
-                            db.session.flush()  # Para obter o ID
-                            solicitacoes_ids_criadas.append(
-                                solicitacao_saida.id)
-                            solicitacoes_criadas += 1
-                        else:
-                            solicitacoes_duplicadas.append(
-                                f"{colaborador.nome} (saída)")
-
-                    # Pula para o próximo colaborador (não executa a lógica padrão de criação)
-                    continue
+                                dados['valor_repasse'] = repasse
+
+                    registros.append(dados)
+                    nomes.append(f"{colaborador.nome} ({rotulos[tipo]})")
 
-                elif tipo_corrida == 'desligamento':
-                    if i < len(horarios_desligamento) and horarios_desligamento[i]:
-                        dados_solicitacao['horario_desligamento'] = datetime.strptime(
-                            horarios_desligamento[i], '%Y-%m-%dT%H:%M')
-                        if i < len(turnos_desligamento):
-                            dados_solicitacao['turno_desligamento_id'] = buscar_turno_id(
-                                turnos_desligamento[i], planta_id)
-                            turno_principal_id = dados_solicitacao['turno_desligamento_id']
-
-                # Validação de duplicação - CORRIGIDA para permitir entrada E saída no mesmo dia
-                # Se tirar os comentários, nao vai permitir duas ou mais entradas ou saidas no mesmo dia. Comentado deixa criar.
-                # solicitacao_duplicada = False
-
-                # if tipo_corrida == 'entrada' and dados_solicitacao.get('horario_entrada'):
-                #    data_entrada = dados_solicitacao['horario_entrada'].date()
-                #    entrada_existente = Solicitacao.query.filter(
-                #        Solicitacao.colaborador_id == colab_id,
-                #        Solicitacao.tipo_corrida == 'entrada',
-                #        db.func.date(Solicitacao.horario_entrada) == data_entrada,
-                #        Solicitacao.status != 'Cancelada'
-                #    ).first()
-
-                #    if entrada_existente:
-                #        solicitacoes_duplicadas.append(f"{colaborador.nome} (entrada)")
-                #        solicitacao_duplicada = True
-
-               # elif tipo_corrida == 'saida' and dados_solicitacao.get('horario_saida'):
-                #    data_saida = dados_solicitacao['horario_saida'].date()
-                #    saida_existente = Solicitacao.query.filter(
-                #        Solicitacao.colaborador_id == colab_id,
-                #        Solicitacao.tipo_corrida == 'saida',
-                #        db.func.date(Solicitacao.horario_saida) == data_saida,
-                #        Solicitacao.status != 'Cancelada'
-                #    ).first()
-
-                 #   if saida_existente:
-                 #       solicitacoes_duplicadas.append(f"{colaborador.nome} (saída)")
-                 #       solicitacao_duplicada = True
-
-              #  elif tipo_corrida == 'desligamento' and dados_solicitacao.get('horario_desligamento'):
-              #      data_desligamento = dados_solicitacao['horario_desligamento'].date()
-              #      desligamento_existente = Solicitacao.query.filter(
-              #          Solicitacao.colaborador_id == colab_id,
-              #          Solicitacao.tipo_corrida == 'desligamento',
-              #          db.func.date(Solicitacao.horario_desligamento) == data_desligamento,
-              #          Solicitacao.status != 'Cancelada'
-              #      ).first()
-              #
-              #      if desligamento_existente:
-              #          solicitacoes_duplicadas.append(f"{colaborador.nome} (desligamento)")
-              #          solicitacao_duplicada = True
-
-                # Se encontrou duplicação, pula esta solicitação
-              #  if solicitacao_duplicada:
-              #      continue
-
-                # Calcula valores baseado em bloco e turno
-                if turno_principal_id:
-                    valor, valor_repasse = buscar_valores(
-                        colaborador.bloco_id, turno_principal_id)
-                    if valor:
-                        dados_solicitacao['valor'] = valor
-                    if valor_repasse:
-                        dados_solicitacao['valor_repasse'] = valor_repasse
-
-                # Cria a solicitação
-                solicitacao = Solicitacao(**dados_solicitacao)
-                db.session.add(solicitacao)
-                db.session.flush()  # Para obter o ID
-                solicitacoes_ids_criadas.append(solicitacao.id)
-                solicitacoes_criadas += 1
+            # Cria as solicitações em lote; as que já existem para o mesmo
+            # colaborador, tipo e dia são ignoradas pelo índice único do banco
+            solicitacoes_ids_criadas, ignoradas = gravar_solicitacoes(registros)
+            solicitacoes_criadas = len(solicitacoes_ids_criadas)
+            solicitacoes_duplicadas = [nomes[i] for i in ignoradas]
 
             db.session.commit()
 
-            # AUDITORIA: Registra criação de solicitações
-            for sol_id in solicitacoes_ids_criadas:
+            # AUDITORIA: Um registro para todo o lote criado
+            if solicitacoes_ids_criadas:
                 log_audit(
-                    action=AuditAction.CREATE,
+                    action=AuditAction.BULK_CREATE,
                     resource_type='Solicitacao',
-                    resource_id=sol_id,
                     status='SUCCESS',
                     severity='INFO',
                     changes={
                         'tipo_corrida': tipo_corrida,
                         'empresa_id': empresa_id,
                         'planta_id': planta_id,
-                        'quantidade': solicitacoes_criadas
+                        'quantidade': solicitacoes_criadas,
+                        'solicitacoes_ids': solicitacoes_ids_criadas,
+                        'duplicadas': len(solicitacoes_duplicadas)
                     }
                 )
 
@@ -810,6 +652,11 @@ def editar_solicitacao(id):
             flash('Solicitação atualizada com sucesso!', 'success')
             return redirect(url_for('admin.solicitacoes'))
 
+        except IntegrityError:
+            # Índice único: já existe solicitação ativa do colaborador no dia
+            db.session.rollback()
+            flash('Já existe uma solicitação deste colaborador para este tipo de corrida nesta data.', 'danger')
+
         except Exception as e:
             db.session.rollback()
             flash(f'Erro ao atualizar solicitação: {str(e)}', 'danger')
@@ -335,10 +335,9 @@ def associar_motorista(viagem_id):
                 'message': 'Não foi possível associar motorista à viagem'
             }), 400
 
-        db.session.commit()
-
         # ========== INTEGRAÇÃO WHATSAPP - INÍCIO ==========
-        # Envia notificação WhatsApp para colaboradores (exceto Desligamento)
+        # Enfileira a notificação WhatsApp para colaboradores (exceto Desligamento)
+        # na mesma transação da associação
         if viagem.tipo_corrida != 'desligamento':
             try:
                 sucesso = notification_service.notificar_viagem_confirmada(
@@ -348,14 +347,16 @@ def associar_motorista(viagem_id):
                 from flask import current_app
                 if sucesso:
                     current_app.logger.info(
-                        f"WhatsApp enviado para colaboradores da viagem {viagem.id} (associação admin)")
+                        f"WhatsApp enfileirado para colaboradores da viagem {viagem.id} (associação admin)")
             except Exception as e:
                 # Não interrompe o fluxo se o WhatsApp falhar
                 from flask import current_app
-                current_app.logger.error(f"Erro ao enviar WhatsApp: {str(e)}")
+                current_app.logger.error(f"Erro ao enfileirar WhatsApp: {str(e)}")
 
         # ========== INTEGRAÇÃO WHATSAPP - FIM ==========
 
+        db.session.commit()
+
         flash(
             f'Motorista {motorista.nome} associado à viagem #{viagem.id} com sucesso!', 'success')
         return jsonify({'success': True, 'message': 'Motorista associado com sucesso'})
@@ -399,10 +400,9 @@ def cancelar_viagem(viagem_id):
             solicitacao.status = 'Pendente'
             solicitacao.viagem_id = None
 
-        db.session.commit()
-
         # ========== INTEGRAÇÃO WHATSAPP - INÍCIO ==========
-        # Envia notificação WhatsApp para colaboradores sobre cancelamento
+        # Enfileira a notificação WhatsApp para colaboradores sobre cancelamento
+        # na mesma transação do cancelamento
         if viagem.tipo_corrida != 'desligamento':
             try:
                 resultado = notification_service.notificar_viagem_cancelada_colaboradores(
@@ -413,17 +413,19 @@ def cancelar_viagem(viagem_id):
                 from flask import current_app
                 if resultado['success']:
                     current_app.logger.info(
-                        f"[OK] WhatsApp de cancelamento enviado para {resultado['enviadas']} colaborador(es) da viagem {viagem.id}")
+                        f"[OK] WhatsApp de cancelamento enfileirado para {resultado['enviadas']} colaborador(es) da viagem {viagem.id}")
                 else:
                     current_app.logger.warning(
-                        f"[AVISO] Falha ao enviar WhatsApp de cancelamento para viagem {viagem.id}")
+                        f"[AVISO] Falha ao enfileirar WhatsApp de cancelamento para viagem {viagem.id}")
             except Exception as e:
                 # Não interrompe o fluxo se o WhatsApp falhar
                 from flask import current_app
                 current_app.logger.error(
-                    f"[ERRO] Erro ao enviar WhatsApp de cancelamento: {str(e)}")
+                    f"[ERRO] Erro ao enfileirar WhatsApp de cancelamento: {str(e)}")
         # ========== INTEGRAÇÃO WHATSAPP - FIM ==========
 
+        db.session.commit()
+
         flash(
             f'Viagem #{viagem.id} cancelada. {len(solicitacoes)} solicitações retornaram para status Pendente.', 'warning')
         return jsonify({
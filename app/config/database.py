@@ -0,0 +1,49 @@
+"""
+Configuração do Pool de Conexões do Banco
+=========================================
+
+Valores lidos das variáveis de ambiente e aplicados em
+SQLALCHEMY_ENGINE_OPTIONS (ver app/utils/pool_banco.py).
+
+Cada processo (worker do gunicorn) tem o seu pool: o total de conexões
+no PostgreSQL pode chegar a workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW),
+mais as conexões do worker de notificações e dos comandos 'flask'.
+
+Em SQLite (desenvolvimento) o pool não é usado.
+"""
+
+import os
+
+# Conexões mantidas abertas por processo
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+
+# Conexões extras abertas em picos (fechadas ao serem devolvidas)
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+
+# Segundos esperando uma conexão livre antes de dar erro
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+
+# Testa a conexão (SELECT 1) antes de usar: evita erro com conexões
+# derrubadas pelo servidor/proxy depois de um período ocioso
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+# Segundos de vida de uma conexão antes de ser reaberta (-1 = sem limite)
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+
+# statement_timeout do PostgreSQL, em milissegundos (0 = sem limite).
+# Vale para todas as conexões, inclusive dos comandos 'flask' em lote
+DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', '0'))
+
+# ============================================
+# ALERTAS (LOG) DAS MÉTRICAS DO POOL
+# ============================================
+
+# Espera por uma conexão acima deste valor (ms) gera aviso no log
+DB_POOL_ALERTA_ESPERA_MS = int(os.getenv('DB_POOL_ALERTA_ESPERA_MS', '500'))
+
+# Conexões de overflow em uso a partir deste número geram aviso no log
+DB_POOL_ALERTA_OVERFLOW = int(os.getenv(
+    'DB_POOL_ALERTA_OVERFLOW', str(max(1, DB_MAX_OVERFLOW // 2))))
+
+# Intervalo mínimo (segundos) entre dois avisos do mesmo tipo
+DB_POOL_ALERTA_INTERVALO = int(os.getenv('DB_POOL_ALERTA_INTERVALO', '60'))
@@ -61,8 +61,42 @@ WHATSAPP_TIMEOUT = int(os.getenv('WHATSAPP_TIMEOUT', '10'))
 # Prefixo do país (Brasil)
 WHATSAPP_COUNTRY_CODE = os.getenv('WHATSAPP_COUNTRY_CODE', '55')
 
-# Intervalo entre mensagens (em segundos) para evitar bloqueio
-WHATSAPP_MESSAGE_INTERVAL = int(os.getenv('WHATSAPP_MESSAGE_INTERVAL', '3'))
+# Intervalo entre mensagens para o mesmo telefone (em segundos) para evitar
+# bloqueio. Destinos diferentes não esperam uns pelos outros
+WHATSAPP_MESSAGE_INTERVAL = float(os.getenv('WHATSAPP_MESSAGE_INTERVAL', '3'))
+
+# ============================================
+# EVOLUTION API (GATEWAY USADO PELO WORKER DE NOTIFICAÇÕES)
+# ============================================
+
+# Ex: https://go-mobi-whatsapp.onrender.com (vazio = notificações desativadas)
+EVOLUTION_API_URL = os.getenv('EVOLUTION_API_URL', '').rstrip('/')
+EVOLUTION_API_KEY = os.getenv('EVOLUTION_API_KEY', '')
+EVOLUTION_INSTANCE = os.getenv('EVOLUTION_INSTANCE', 'gomobi')
+
+# Envios simultâneos (e conexões mantidas abertas) com o gateway. Com
+# WHATSAPP_MESSAGE_INTERVAL > 0, cada destino recebe no máximo uma mensagem
+# por intervalo; a vazão total cresce com a concorrência
+WHATSAPP_CONCORRENCIA = int(os.getenv('WHATSAPP_CONCORRENCIA', '4'))
+
+# ============================================
+# FILA DE NOTIFICAÇÕES (OUTBOX)
+# ============================================
+
+# Janela de agrupamento (segundos): a mensagem espera esse tempo na fila;
+# as que chegarem para o mesmo telefone nesse intervalo vão juntas em uma
+# única mensagem (0 = envia assim que possível)
+NOTIFICACAO_JANELA = int(os.getenv('NOTIFICACAO_JANELA', '60'))
+
+# Mensagens reservadas por vez pelo worker
+NOTIFICACAO_LOTE = int(os.getenv('NOTIFICACAO_LOTE', '20'))
+
+# Tentativas antes de ir para 'Falha' (dead letter)
+NOTIFICACAO_MAX_TENTATIVAS = int(os.getenv('NOTIFICACAO_MAX_TENTATIVAS', '6'))
+
+# Espera antes da nova tentativa: BASE * 2^(tentativa-1), limitada a MAX (segundos)
+NOTIFICACAO_BACKOFF_BASE = int(os.getenv('NOTIFICACAO_BACKOFF_BASE', '30'))
+NOTIFICACAO_BACKOFF_MAX = int(os.getenv('NOTIFICACAO_BACKOFF_MAX', '3600'))
 
 # ============================================
 # VALIDAÇÃO DE CONFIGURAÇÃO
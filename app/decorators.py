@@ -52,6 +52,30 @@ def role_required(*roles):
     return permission_required(*roles)
 
 
+def somente_leitura(f):
+    """
+    Marca a rota como somente leitura: as consultas vão para a réplica
+    (DATABASE_REPLICA_URL), quando configurada. Escritas continuam no
+    primário, mas podem não aparecer nas leituras da mesma requisição.
+
+    Uso (depois de @login_required, que carrega o usuário no primário):
+        @login_required
+        @somente_leitura
+        def relatorio():
+            ...
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        from app import db, SESSAO_SOMENTE_LEITURA
+        sessao = db.session()
+        sessao.info[SESSAO_SOMENTE_LEITURA] = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            sessao.info.pop(SESSAO_SOMENTE_LEITURA, None)
+    return decorated_function
+
+
 def agrupamento_required(f):
     """
     Decorator que permite acesso ao agrupamento apenas para Admin e Gerente.
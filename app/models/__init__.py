@@ -8,9 +8,10 @@ organizados por categoria para facilitar manutenção.
 Estrutura:
 - models_cad_base.py: Entidades cadastrais base (Empresa, Planta, Turno, Bloco, Bairro, CentroCusto)
 - models_cad_pessoas.py: Perfis de usuários (Gerente, Supervisor, Colaborador, Motorista)
-- models_processos.py: Fluxo operacional (Viagem, Solicitacao, ViagemHoraParada)
-- models_config.py: Autenticação e auditoria (User, Configuracao, AuditLog, ViagemAuditoria)
-- models_financeiro.py: Gestão financeira (FinContasReceber, FinContasPagar e associações)
+- models_processos.py: Fluxo operacional (Viagem, Solicitacao, ViagemHoraParada, LinhaFixa, ViagemExclusao)
+- models_config.py: Autenticação e auditoria (User, Configuracao, AuditLog, ViagemAuditoria, AuditArquivo,
+  AuditResumoDiario, ApiIdempotencia, NotificacaoOutbox)
+- models_financeiro.py: Gestão financeira (FinContasReceber, FinContasPagar, associações e FinNumeracao)
 - models_fretado.py: Módulo de fretados (Fretado)
 """
 
@@ -35,18 +36,19 @@ from .models_cad_pessoas import (
 
 # Importar todos os modelos de processos
 from .models_processos import (
-    Viagem, Solicitacao, ViagemHoraParada
+    Viagem, Solicitacao, ViagemHoraParada, LinhaFixa, ViagemExclusao
 )
 
 # Importar todos os modelos de configuração
 from .models_config import (
-    User, Configuracao, AuditLog, ViagemAuditoria
+    User, Configuracao, AuditLog, ViagemAuditoria, AuditArquivo,
+    AuditResumoDiario, ApiIdempotencia, NotificacaoOutbox
 )
 
 # Importar todos os modelos financeiros
 from .models_financeiro import (
     FinContasReceber, FinReceberViagens,
-    FinContasPagar, FinPagarViagens
+    FinContasPagar, FinPagarViagens, FinNumeracao
 )
 
 # Importar modelo de fretado
@@ -64,14 +66,15 @@ __all__ = [
     'Gerente', 'Supervisor', 'Colaborador', 'Motorista',
     
     # Processos
-    'Viagem', 'Solicitacao', 'ViagemHoraParada',
+    'Viagem', 'Solicitacao', 'ViagemHoraParada', 'LinhaFixa', 'ViagemExclusao',
     
     # Config
-    'User', 'Configuracao', 'AuditLog', 'ViagemAuditoria',
+    'User', 'Configuracao', 'AuditLog', 'ViagemAuditoria', 'AuditArquivo',
+    'AuditResumoDiario', 'ApiIdempotencia', 'NotificacaoOutbox',
     
     # Financeiro
     'FinContasReceber', 'FinReceberViagens',
-    'FinContasPagar', 'FinPagarViagens',
+    'FinContasPagar', 'FinPagarViagens', 'FinNumeracao',
     
     # Fretado
     'Fretado'
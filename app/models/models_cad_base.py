@@ -12,6 +12,8 @@ Classes relacionadas a entidades cadastrais base do sistema:
 """
 
 from app import db
+from app.utils.texto import normalizar_texto
+from sqlalchemy.orm import validates
 
 
 class Empresa(db.Model):
@@ -161,6 +163,14 @@ class Bloco(db.Model):
     __table_args__ = (db.UniqueConstraint(
         'codigo_bloco', 'empresa_id', name='_codigo_bloco_empresa_uc'),)
 
+    # Nome do turno -> (campo de valor, campo de repasse)
+    CAMPOS_TARIFA = {
+        Turno.TURNO_1: ('valor_turno1', 'repasse_turno1'),
+        Turno.TURNO_2: ('valor_turno2', 'repasse_turno2'),
+        Turno.TURNO_3: ('valor_turno3', 'repasse_turno3'),
+        Turno.TURNO_ADMIN: ('valor_admin', 'repasse_admin'),
+    }
+
     def __repr__(self):
         return f'<Bloco {self.codigo_bloco}>'
 
@@ -179,13 +189,8 @@ class Bloco(db.Model):
         else:
             nome_turno = turno_obj
 
-        mapeamento = {
-            Turno.TURNO_1: self.valor_turno1,
-            Turno.TURNO_2: self.valor_turno2,
-            Turno.TURNO_3: self.valor_turno3,
-            Turno.TURNO_ADMIN: self.valor_admin
-        }
-        return mapeamento.get(nome_turno, 0.00)
+        campos = self.CAMPOS_TARIFA.get(nome_turno)
+        return getattr(self, campos[0]) if campos else 0.00
 
     def get_repasse_por_turno(self, turno_obj):
         """
@@ -202,13 +207,8 @@ class Bloco(db.Model):
         else:
             nome_turno = turno_obj
 
-        mapeamento = {
-            Turno.TURNO_1: self.repasse_turno1,
-            Turno.TURNO_2: self.repasse_turno2,
-            Turno.TURNO_3: self.repasse_turno3,
-            Turno.TURNO_ADMIN: self.repasse_admin
-        }
-        return mapeamento.get(nome_turno, 0.00)
+        campos = self.CAMPOS_TARIFA.get(nome_turno)
+        return getattr(self, campos[1]) if campos else 0.00
 
     def set_valor_por_turno(self, turno_obj, valor):
         """
@@ -260,6 +260,8 @@ class Bairro(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
     cidade = db.Column(db.String(100), nullable=False)
+    # Nome sem acentos/pontuação e em minúsculas, mantido por set_nome_normalizado
+    nome_normalizado = db.Column(db.String(100), index=True)
 
     # A relação agora é que um Bairro pertence a um Bloco
     bloco_id = db.Column(db.Integer, db.ForeignKey('bloco.id'), nullable=True)
@@ -271,3 +273,9 @@ class Bairro(db.Model):
 
     def __repr__(self):
         return f'<Bairro {self.nome}>'
+
+    @validates('nome')
+    def set_nome_normalizado(self, key, nome):
+        """Mantém nome_normalizado sincronizado a cada alteração do nome."""
+        self.nome_normalizado = normalizar_texto(nome)
+        return nome
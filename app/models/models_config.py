@@ -7,11 +7,17 @@ Classes relacionadas a autenticação, configuração e auditoria:
 - Configuracao: Configurações globais do sistema
 - AuditLog: Log de auditoria geral do sistema
 - ViagemAuditoria: Log específico de auditoria de viagens
+- AuditArquivo: Catálogo das partições de auditoria arquivadas
+- AuditResumoDiario: Rollup diário de contagens da auditoria
+- ApiIdempotencia: Respostas da API guardadas por Idempotency-Key
+- NotificacaoOutbox: Fila persistente de notificações (WhatsApp)
 """
 
 from app import db
 from flask_login import UserMixin
 from datetime import datetime
+import hashlib
+import secrets
 
 
 class User(UserMixin, db.Model):
@@ -26,6 +32,8 @@ class User(UserMixin, db.Model):
         db.String(100), nullable=False, default='default.jpg')
     # NOVO CAMPO: Status de Ativação
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    # SHA-256 do token de acesso à API (Authorization: Bearer <token>)
+    api_token_hash = db.Column(db.String(64), unique=True, nullable=True)
 
     # --- RELACIONAMENTOS COM OS PERFIS ---
     # Cada usuário pode ser, no máximo, um destes perfis.
@@ -82,6 +90,27 @@ class User(UserMixin, db.Model):
             return getattr(self, self.role).planta
         return None
 
+    @staticmethod
+    def hash_token_api(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def gerar_token_api(self):
+        """
+        Gera um novo token de API (invalida o anterior). Apenas o hash é
+        gravado; o token é devolvido uma única vez.
+        """
+        token = secrets.token_urlsafe(32)
+        self.api_token_hash = self.hash_token_api(token)
+        return token
+
+    @classmethod
+    def buscar_por_token_api(cls, token):
+        """Usuário ativo dono do token, ou None."""
+        if not token:
+            return None
+        return cls.query.filter_by(
+            api_token_hash=cls.hash_token_api(token), is_active=True).first()
+
     def __repr__(self):
         return f'<User {self.email} - {self.role}>'
 
@@ -284,3 +313,145 @@ class ViagemAuditoria(db.Model):
             'valor_repasse_novo': float(self.valor_repasse_novo) if self.valor_repasse_novo else None,
             'ip_address': self.ip_address
         }
+
+
+class AuditArquivo(db.Model):
+    """
+    Catálogo das partições mensais de auditoria já arquivadas.
+
+    Cada registro representa um mês de uma tabela de auditoria
+    (audit_log ou viagem_auditoria) que foi exportado para um arquivo
+    compactado (JSON Lines + gzip) e removido do banco pela política
+    de retenção.
+    """
+    __tablename__ = 'audit_arquivo'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # audit_log, viagem_auditoria
+    tabela = db.Column(db.String(50), nullable=False)
+    # Mês arquivado no formato YYYY-MM
+    periodo = db.Column(db.String(7), nullable=False)
+    # Limites do período [data_inicio, data_fim)
+    data_inicio = db.Column(db.DateTime, nullable=False)
+    data_fim = db.Column(db.DateTime, nullable=False)
+    arquivo = db.Column(db.String(255), nullable=False)
+    total_registros = db.Column(db.Integer, nullable=False, default=0)
+    arquivado_em = db.Column(db.DateTime, nullable=False,
+                             default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('tabela', 'periodo',
+                            name='uq_audit_arquivo_tabela_periodo'),
+    )
+
+    def __repr__(self):
+        return f'<AuditArquivo {self.tabela} {self.periodo} ({self.total_registros})>'
+
+
+class AuditResumoDiario(db.Model):
+    """
+    Rollup diário da auditoria: contagem de logs por dia × ação × usuário ×
+    severidade.
+
+    Mantido incrementalmente por log_audit() (upsert a cada registro) e
+    usado pelos cards de logs_gerais e por /admin/audit/api/estatisticas,
+    que assim não varrem o audit_log bruto.
+    """
+    __tablename__ = 'audit_resumo_diario'
+
+    id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False, index=True)
+    action = db.Column(db.String(50), nullable=False)
+    # '' quando o log não tem usuário (NULL não participa do ON CONFLICT)
+    user_name = db.Column(db.String(100), nullable=False, default='')
+    severity = db.Column(db.String(20), nullable=False)
+    # Total de logs e quantos tiveram status FAILED/ERROR
+    total = db.Column(db.Integer, nullable=False, default=0)
+    erros = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('dia', 'action', 'user_name', 'severity',
+                            name='uq_audit_resumo_diario'),
+    )
+
+    def __repr__(self):
+        return f'<AuditResumoDiario {self.dia} {self.action} {self.user_name}: {self.total}>'
+
+
+class ApiIdempotencia(db.Model):
+    """
+    Resposta de uma chamada da API guardada pela Idempotency-Key.
+
+    A linha é gravada na mesma transação do processamento: uma nova tentativa
+    com a mesma chave (e o mesmo corpo) recebe a resposta original, sem
+    repetir as inserções. A chave é única por usuário.
+    """
+    __tablename__ = 'api_idempotencia'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    chave = db.Column(db.String(100), nullable=False)
+    rota = db.Column(db.String(100), nullable=False)
+    # SHA-256 do corpo da requisição (mesma chave com outro corpo é recusada)
+    hash_requisicao = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    resposta = db.Column(db.Text, nullable=True)
+    criado_em = db.Column(db.DateTime, nullable=False,
+                          default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'chave', name='uq_api_idempotencia_user_chave'),
+    )
+
+    def __repr__(self):
+        return f'<ApiIdempotencia {self.chave} ({self.status_code})>'
+
+
+class NotificacaoOutbox(db.Model):
+    """
+    Mensagem a enviar, gravada na mesma transação da alteração da viagem.
+
+    Enviada pelo worker ('flask worker-notificacoes'): se a transação for
+    desfeita a mensagem não existe; se o worker parar, a mensagem continua
+    na fila.
+
+    Status:
+    - 'Pendente': aguardando envio (ou nova tentativa em disponivel_em)
+    - 'Enviada': entregue ao gateway
+    - 'Falha': esgotou as tentativas ou foi recusada (dead letter)
+    - 'Agrupada': incluída no resumo de outra mensagem do mesmo destino, ou
+      substituída por uma mais nova da mesma viagem (não é enviada)
+    """
+    __tablename__ = 'notificacao_outbox'
+
+    STATUS_PENDENTE = 'Pendente'
+    STATUS_ENVIADA = 'Enviada'
+    STATUS_FALHA = 'Falha'
+    STATUS_AGRUPADA = 'Agrupada'
+
+    id = db.Column(db.Integer, primary_key=True)
+    canal = db.Column(db.String(20), nullable=False, default='whatsapp')
+    destino = db.Column(db.String(30), nullable=False)  # Telefone
+    mensagem = db.Column(db.Text, nullable=False)
+    # Ex: 'viagem_confirmada', 'viagem_cancelada', 'novas_viagens', 'resumo'
+    evento = db.Column(db.String(50), nullable=False)
+    viagem_id = db.Column(db.Integer, nullable=True, index=True)
+
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDENTE)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    # Próxima tentativa; enquanto um worker envia, é o fim da reserva
+    disponivel_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Reserva do worker que pegou a mensagem
+    lote = db.Column(db.String(32), nullable=True, index=True)
+    erro = db.Column(db.Text, nullable=True)
+
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    enviado_em = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Fila: pendentes por canal na ordem de disponibilidade
+        db.Index('idx_notificacao_outbox_fila', 'status', 'canal', 'disponivel_em'),
+    )
+
+    def __repr__(self):
+        return f'<NotificacaoOutbox {self.id} {self.evento} -> {self.destino} ({self.status})>'
@@ -7,6 +7,7 @@ Classes relacionadas à gestão financeira:
 - FinReceberViagens: Associação de viagens a títulos a receber
 - FinContasPagar: Contas a pagar (títulos dos motoristas)
 - FinPagarViagens: Associação de viagens a títulos a pagar
+- FinNumeracao: Contador da numeração dos títulos (SQLite)
 """
 
 from app import db
@@ -41,6 +42,11 @@ class FinContasReceber(db.Model):
     viagens = db.relationship(
         'FinReceberViagens', back_populates='conta_receber', cascade="all, delete-orphan")
 
+    # Paginação da listagem por (data_vencimento, id)
+    __table_args__ = (
+        db.Index('idx_fin_contas_receber_vencimento', 'data_vencimento', 'id'),
+    )
+
     def __repr__(self):
         return f'<FinContasReceber {self.numero_titulo} - {self.empresa.nome if self.empresa else "N/A"}>'
 
@@ -52,8 +58,9 @@ class FinReceberViagens(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     conta_receber_id = db.Column(db.Integer, db.ForeignKey(
         'fin_contas_receber.id', ondelete='CASCADE'), nullable=False)
+    # Indexado: busca das viagens ainda sem título (NOT EXISTS)
     viagem_id = db.Column(db.Integer, db.ForeignKey(
-        'viagem.id'), nullable=False)
+        'viagem.id'), nullable=False, index=True)
     valor_viagem = db.Column(db.Numeric(10, 2), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -100,6 +107,11 @@ class FinContasPagar(db.Model):
     viagens = db.relationship(
         'FinPagarViagens', back_populates='conta_pagar', cascade="all, delete-orphan")
 
+    # Paginação da listagem por (data_vencimento, id)
+    __table_args__ = (
+        db.Index('idx_fin_contas_pagar_vencimento', 'data_vencimento', 'id'),
+    )
+
     def __repr__(self):
         return f'<FinContasPagar {self.numero_titulo} - {self.motorista.nome if self.motorista else "N/A"}>'
 
@@ -111,8 +123,9 @@ class FinPagarViagens(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     conta_pagar_id = db.Column(db.Integer, db.ForeignKey(
         'fin_contas_pagar.id', ondelete='CASCADE'), nullable=False)
+    # Indexado: busca das viagens ainda sem título (NOT EXISTS)
     viagem_id = db.Column(db.Integer, db.ForeignKey(
-        'viagem.id'), nullable=False)
+        'viagem.id'), nullable=False, index=True)
     valor_repasse = db.Column(db.Numeric(10, 2), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -126,3 +139,20 @@ class FinPagarViagens(db.Model):
 
     def __repr__(self):
         return f'<FinPagarViagens Título:{self.conta_pagar_id} Viagem:{self.viagem_id}>'
+
+
+class FinNumeracao(db.Model):
+    """
+    Contador da numeração dos títulos por série e ano (ex: REC, 2026).
+
+    Usado apenas em SQLite; em PostgreSQL cada série/ano é uma sequence
+    (ver app/utils/numeracao.py).
+    """
+    __tablename__ = 'fin_numeracao'
+
+    serie = db.Column(db.String(20), primary_key=True)
+    ano = db.Column(db.Integer, primary_key=True)
+    ultimo = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<FinNumeracao {self.serie}-{self.ano}: {self.ultimo}>'
@@ -6,11 +6,65 @@ Classes relacionadas ao fluxo operacional do sistema:
 - Viagem: Viagens agrupadas executadas por motoristas
 - Solicitacao: Solicitações de transporte criadas por supervisores
 - ViagemHoraParada: Registro de horas paradas em viagens
+- LinhaFixa: Linhas fixas (recorrentes) que geram solicitações 'FIXA'
+- ViagemExclusao: Registro das viagens excluídas (delta-sync do app do motorista)
 """
 
 from app import db
 from app.models import horario_brasil
 from datetime import datetime
+from sqlalchemy import event, exists, inspect, or_, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+# Predicado do índice único parcial de solicitações (canceladas não contam)
+FILTRO_SOLICITACAO_ATIVA = db.text("status <> 'Cancelada'")
+
+
+class versao_sync(FunctionElement):
+    """
+    Versão gravada em cada alteração de viagem (delta-sync do motorista).
+
+    PostgreSQL: id da transação (txid_current()).
+    SQLite: as escritas são serializadas, basta o maior valor + 1
+    (contando as exclusões, para o número nunca voltar).
+    """
+    type = db.BigInteger()
+    name = 'versao_sync'
+    inherit_cache = True
+
+
+class token_sync(FunctionElement):
+    """
+    Token devolvido ao cliente: as alterações que ele ainda não viu têm
+    versao >= token.
+
+    PostgreSQL: xmin do snapshot atual, a menor transação ainda aberta
+    (uma transação iniciada antes e confirmada depois não é perdida).
+    SQLite: o próximo valor de versao_sync.
+    """
+    type = db.BigInteger()
+    name = 'token_sync'
+    inherit_cache = True
+
+
+@compiles(versao_sync)
+@compiles(token_sync)
+def _versao_sync_maximo(element, compiler, **kw):
+    return ('(SELECT MAX(v) + 1 FROM ('
+            'SELECT COALESCE(MAX(versao), 0) AS v FROM viagem '
+            'UNION ALL SELECT COALESCE(MAX(versao), 0) FROM viagem_exclusao) AS versoes)')
+
+
+@compiles(versao_sync, 'postgresql')
+def _versao_sync_postgresql(element, compiler, **kw):
+    return 'txid_current()'
+
+
+@compiles(token_sync, 'postgresql')
+def _token_sync_postgresql(element, compiler, **kw):
+    return 'txid_snapshot_xmin(txid_current_snapshot())'
 
 
 class Viagem(db.Model):
@@ -90,6 +144,11 @@ class Viagem(db.Model):
     data_cancelamento = db.Column(
         db.DateTime, nullable=True)  # Quando foi cancelada
 
+    # === SINCRONIZAÇÃO (APP DO MOTORISTA) ===
+    # Atualizada em todo INSERT/UPDATE, inclusive UPDATEs diretos (Core)
+    versao = db.Column(db.BigInteger, nullable=False, index=True, server_default='0',
+                       default=versao_sync(), onupdate=versao_sync())
+
     # === RELACIONAMENTOS ===
     empresa = db.relationship('Empresa', backref='viagens')
     planta = db.relationship('Planta', backref='viagens')
@@ -124,31 +183,70 @@ class Viagem(db.Model):
         """Verifica se a viagem pode ser cancelada."""
         return self.status in ['Pendente', 'Agendada']
 
-    def aceitar_viagem(self, motorista):
+    def aceitar_viagem(self, motorista, exigir_horario_livre=False):
         """
         Aceita a viagem para um motorista específico.
 
+        O aceite é um único UPDATE condicional (status 'Pendente' e sem
+        motorista): com vários motoristas aceitando ao mesmo tempo, apenas um
+        altera a linha; os demais recebem False. Não faz commit.
+
+        Com exigir_horario_livre, o UPDATE também exige (NOT EXISTS) que o
+        motorista não tenha outra viagem Agendada/Em Andamento no mesmo
+        horário. A linha do motorista é bloqueada antes (FOR UPDATE): o mesmo
+        motorista aceitando duas viagens ao mesmo tempo (duas abas) espera o
+        primeiro aceite terminar e então já vê a viagem dele.
+
         Args:
             motorista: Objeto Motorista que está aceitando a viagem
+            exigir_horario_livre: Recusa se houver conflito de horário
 
         Returns:
             bool: True se aceito com sucesso, False caso contrário
         """
-        if not self.pode_ser_aceita():
-            return False
-
-        self.motorista_id = motorista.id
-        self.nome_motorista = motorista.nome
-        self.placa_veiculo = motorista.veiculo_placa
-        self.status = 'Agendada'
-        self.data_atualizacao = datetime.utcnow()
-
-        # Atualiza status das solicitações
-        if self.solicitacoes:
-            for solicitacao in self.solicitacoes:
-                solicitacao.status = 'Agendada'
-
-        return True
+        condicoes = [
+            Viagem.id == self.id,
+            Viagem.status == 'Pendente',
+            Viagem.motorista_id.is_(None)
+        ]
+        horario = self.horario_entrada or self.horario_saida
+        if exigir_horario_livre and horario:
+            from app.models.models_cad_pessoas import Motorista
+            db.session.query(Motorista.id).filter(
+                Motorista.id == motorista.id).with_for_update().scalar()
+            outra = aliased(Viagem)
+            condicoes.append(~exists().where(
+                outra.motorista_id == motorista.id,
+                outra.status.in_(['Agendada', 'Em Andamento']),
+                or_(outra.horario_entrada == horario, outra.horario_saida == horario)
+            ))
+
+        aceita = db.session.execute(
+            update(Viagem).where(*condicoes).values(
+                motorista_id=motorista.id,
+                nome_motorista=motorista.nome,
+                placa_veiculo=motorista.veiculo_placa,
+                status='Agendada',
+                data_atualizacao=datetime.utcnow()
+            ).execution_options(synchronize_session=False)
+        ).rowcount == 1
+
+        if aceita:
+            # UPDATE direto não passa pelos listeners do Viagem
+            from app.utils.eventos_viagem import registrar
+            registrar('viagem_aceita', self.id)
+            db.session.execute(ViagemExclusao.__table__.insert().values(
+                viagem_id=self.id, motorista_id=None))
+
+            # Atualiza status das solicitações (uma instrução)
+            db.session.execute(
+                update(Solicitacao).where(
+                    Solicitacao.viagem_id == self.id
+                ).values(status='Agendada').execution_options(synchronize_session='evaluate')
+            )
+        # Recarrega os atributos do banco no próximo acesso
+        db.session.expire(self)
+        return aceita
 
     def iniciar_viagem(self, motorista_id):
         """
@@ -324,6 +422,9 @@ class Solicitacao(db.Model):
     turno_desligamento_id = db.Column(
         db.Integer, db.ForeignKey('turno.id'), nullable=True)
 
+    # Data da corrida (pelo horário do tipo), mantida por _atualizar_data_referencia
+    data_referencia = db.Column(db.Date, nullable=True)
+
     # Status e viagem/fretado
     # Pendente, Agrupada, Fretado, Finalizada, Cancelada
     status = db.Column(db.String(20), nullable=False, default='Pendente')
@@ -364,6 +465,27 @@ class Solicitacao(db.Model):
     created_by = db.relationship(
         'User', foreign_keys=[created_by_user_id], backref='solicitacoes_criadas')
 
+    # Impede duas solicitações ativas do mesmo colaborador, tipo e dia
+    __table_args__ = (
+        db.Index('uq_solicitacao_colaborador_tipo_data',
+                 'colaborador_id', 'tipo_corrida', 'data_referencia',
+                 unique=True,
+                 postgresql_where=FILTRO_SOLICITACAO_ATIVA,
+                 sqlite_where=FILTRO_SOLICITACAO_ATIVA),
+    )
+
+    @staticmethod
+    def calcular_data_referencia(tipo_corrida, horario_entrada=None,
+                                 horario_saida=None, horario_desligamento=None):
+        """Data da corrida: a do horário correspondente ao tipo de corrida."""
+        if tipo_corrida == 'saida':
+            horario = horario_saida
+        elif tipo_corrida == 'desligamento':
+            horario = horario_desligamento
+        else:
+            horario = horario_entrada
+        return horario.date() if horario else None
+
     def get_criador_nome(self):
         """Retorna o nome de quem criou a solicitação."""
         if not self.created_by:
@@ -383,6 +505,64 @@ class Solicitacao(db.Model):
         return f'<Solicitacao {self.id} - {self.colaborador.nome} - {self.tipo_corrida}>'
 
 
+@event.listens_for(Solicitacao, 'before_insert')
+@event.listens_for(Solicitacao, 'before_update')
+def _atualizar_data_referencia(mapper, connection, target):
+    """Mantém data_referencia sincronizada com o tipo e os horários."""
+    target.data_referencia = Solicitacao.calcular_data_referencia(
+        target.tipo_corrida, target.horario_entrada,
+        target.horario_saida, target.horario_desligamento)
+
+
+class ViagemExclusao(db.Model):
+    """
+    Viagens excluídas fisicamente, retiradas de um motorista (desassociadas)
+    ou que deixaram de estar disponíveis (aceitas, canceladas), para o
+    delta-sync do app do motorista devolver a remoção (tombstone) a quem já
+    tinha a viagem. motorista_id é o motorista que a tinha; NULL para as que
+    estavam disponíveis.
+    """
+    __tablename__ = 'viagem_exclusao'
+
+    id = db.Column(db.Integer, primary_key=True)
+    viagem_id = db.Column(db.Integer, nullable=False)
+    motorista_id = db.Column(db.Integer, nullable=True)
+    versao = db.Column(db.BigInteger, nullable=False, index=True, default=versao_sync())
+    data_exclusao = db.Column(db.DateTime, nullable=False, default=horario_brasil)
+
+    def __repr__(self):
+        return f'<ViagemExclusao viagem={self.viagem_id} versao={self.versao}>'
+
+
+@event.listens_for(Viagem, 'before_delete')
+def _registrar_exclusao(mapper, connection, target):
+    """Grava o tombstone antes do DELETE (a versão ainda conta a viagem)."""
+    connection.execute(ViagemExclusao.__table__.insert().values(
+        viagem_id=target.id, motorista_id=target.motorista_id))
+
+
+def _valor_anterior(estado, campo):
+    historico = estado.attrs[campo].history
+    return historico.deleted[0] if historico.deleted else estado.attrs[campo].value
+
+
+@event.listens_for(Viagem, 'before_update')
+def _registrar_saida(mapper, connection, target):
+    """
+    Tombstones do UPDATE: motorista removido/trocado (visão 'minhas' dele) e
+    viagem que deixou de estar disponível (visão 'disponiveis').
+    """
+    estado = inspect(target)
+    motorista_anterior = _valor_anterior(estado, 'motorista_id')
+    if motorista_anterior is not None and motorista_anterior != target.motorista_id:
+        connection.execute(ViagemExclusao.__table__.insert().values(
+            viagem_id=target.id, motorista_id=motorista_anterior))
+    elif (motorista_anterior is None and _valor_anterior(estado, 'status') == 'Pendente'
+            and (target.motorista_id is not None or target.status != 'Pendente')):
+        connection.execute(ViagemExclusao.__table__.insert().values(
+            viagem_id=target.id, motorista_id=None))
+
+
 class ViagemHoraParada(db.Model):
     """
     Modelo para registrar cobranças de hora parada em viagens.
@@ -509,3 +689,69 @@ class ViagemHoraParada(db.Model):
                 pass
 
         return (valor_periodo, repasse_periodo)
+
+
+class LinhaFixa(db.Model):
+    """
+    Linha fixa (recorrente) de um colaborador.
+
+    Modelo das solicitações 'FIXA': nos dias da semana marcados e dentro da
+    vigência, o agendador (app/utils/linhas_fixas.py) cria a solicitação do
+    dia com os horários do turno. gerado_ate guarda o último dia já
+    materializado, para que uma solicitação cancelada não seja recriada.
+    """
+    __tablename__ = 'linha_fixa'
+
+    TIPOS_CORRIDA = ['entrada', 'saida', 'entrada_saida']
+    # 0 = segunda-feira ... 6 = domingo (date.weekday())
+    NOMES_DIAS = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+
+    id = db.Column(db.Integer, primary_key=True)
+    colaborador_id = db.Column(db.Integer, db.ForeignKey(
+        'colaborador.id'), nullable=False, index=True)
+    supervisor_id = db.Column(db.Integer, db.ForeignKey(
+        'supervisor.id'), nullable=False)
+    empresa_id = db.Column(db.Integer, db.ForeignKey(
+        'empresa.id'), nullable=False)
+    planta_id = db.Column(db.Integer, db.ForeignKey(
+        'planta.id'), nullable=False)
+    turno_id = db.Column(db.Integer, db.ForeignKey(
+        'turno.id'), nullable=False)
+
+    # 'entrada', 'saida' ou 'entrada_saida'
+    tipo_corrida = db.Column(db.String(20), nullable=False)
+    # Dias da semana separados por vírgula (ex: '0,1,2,3,4' = segunda a sexta)
+    dias_semana = db.Column(db.String(20), nullable=False, default='0,1,2,3,4')
+
+    # Vigência (data_fim NULL = sem término)
+    data_inicio = db.Column(db.Date, nullable=False)
+    data_fim = db.Column(db.Date, nullable=True)
+    ativa = db.Column(db.Boolean, nullable=False, default=True)
+
+    # Último dia já gerado pelo agendador
+    gerado_ate = db.Column(db.Date, nullable=True)
+
+    created_by_user_id = db.Column(db.Integer, db.ForeignKey(
+        'user.id'), nullable=True)
+    data_criacao = db.Column(
+        db.DateTime, nullable=False, default=horario_brasil)
+    data_atualizacao = db.Column(
+        db.DateTime, nullable=False, default=horario_brasil, onupdate=horario_brasil)
+
+    # Relacionamentos
+    colaborador = db.relationship('Colaborador', backref='linhas_fixas')
+    supervisor = db.relationship('Supervisor')
+    planta = db.relationship('Planta')
+    turno = db.relationship('Turno')
+
+    @property
+    def dias(self):
+        """Dias da semana (0 = segunda) como conjunto de inteiros."""
+        return {int(d) for d in (self.dias_semana or '').split(',') if d.strip().isdigit()}
+
+    def get_dias_display(self):
+        """Dias da semana abreviados (ex: 'Seg, Ter, Qua')."""
+        return ', '.join(self.NOMES_DIAS[d] for d in sorted(self.dias) if d < 7)
+
+    def __repr__(self):
+        return f'<LinhaFixa {self.id} - colaborador {self.colaborador_id} - {self.tipo_corrida}>'
@@ -1,74 +1,62 @@
 # Em app/query_filters.py
 
 from .models import Bloco, Bairro, Empresa, Gerente, Supervisor, Colaborador, Motorista
-from sqlalchemy import or_
+from .utils.busca import _escapar_like, filtro_busca
+from .utils.texto import normalizar_texto
 
 def filter_blocos_query(base_query, filters):
     termo_busca = filters.get('busca', '')
     if termo_busca:
-        termo_busca_like = f"%{termo_busca}%"
-        base_query = base_query.filter(
-            or_(
-                Bloco.codigo_bloco.ilike(termo_busca_like),
-                Bloco.nome_bloco.ilike(termo_busca_like)
-            )
-        )
+        base_query = base_query.filter(filtro_busca([
+            Bloco.codigo_bloco,
+            Bloco.nome_bloco
+        ], termo_busca))
     return base_query
 
 def filter_bairros_query(base_query, filters):
     termo_busca = filters.get('busca', '')
     if termo_busca:
-        termo_busca_like = f"%{termo_busca}%"
-        base_query = base_query.filter(Bairro.nome.ilike(termo_busca_like))
+        # Bairros têm o nome normalizado (sem acentos/pontuação) indexado
+        base_query = base_query.filter(
+            Bairro.nome_normalizado.like(
+                f"%{_escapar_like(normalizar_texto(termo_busca))}%", escape='\\'))
     return base_query
 
 def filter_gerentes_query(base_query, filters):
     termo_busca = filters.get('busca', '')
     if termo_busca:
-        termo_busca_like = f"%{termo_busca}%"
-        base_query = base_query.filter(
-            or_(
-                Gerente.nome.ilike(termo_busca_like),
-                Gerente.email.ilike(termo_busca_like)
-            )
-        )
+        base_query = base_query.filter(filtro_busca([
+            Gerente.nome,
+            Gerente.email
+        ], termo_busca))
     return base_query
 
 def filter_supervisores_query(base_query, filters):
     termo_busca = filters.get('busca', '')
     if termo_busca:
-        termo_busca_like = f"%{termo_busca}%"
-        base_query = base_query.filter(
-            or_(
-                Supervisor.nome.ilike(termo_busca_like),
-                Supervisor.matricula.ilike(termo_busca_like),
-                Supervisor.email.ilike(termo_busca_like)
-            )
-        )
+        base_query = base_query.filter(filtro_busca([
+            Supervisor.nome,
+            Supervisor.matricula,
+            Supervisor.email
+        ], termo_busca))
     return base_query
 
 def filter_colaboradores_query(base_query, filters):
     termo_busca = filters.get('busca', '')
     if termo_busca:
-        termo_busca_like = f"%{termo_busca}%"
-        base_query = base_query.filter(
-            or_(
-                Colaborador.nome.ilike(termo_busca_like),
-                Colaborador.matricula.ilike(termo_busca_like)
-            )
-        )
+        base_query = base_query.filter(filtro_busca([
+            Colaborador.nome,
+            Colaborador.matricula
+        ], termo_busca))
     return base_query
 
 def filter_motoristas_query(base_query, filters):
     termo_busca = filters.get('busca', '')
     if termo_busca:
-        termo_busca_like = f"%{termo_busca}%"
-        base_query = base_query.filter(
-            or_(
-                Motorista.nome.ilike(termo_busca_like),
-                Motorista.cpf_cnpj.ilike(termo_busca_like),
-                Motorista.veiculo_placa.ilike(termo_busca_like)
-            )
-        )
+        base_query = base_query.filter(filtro_busca([
+            Motorista.nome,
+            Motorista.cpf_cnpj,
+            Motorista.veiculo_placa
+        ], termo_busca))
     # O 'return' deve estar fora do 'if'
     return base_query
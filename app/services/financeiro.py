@@ -0,0 +1,368 @@
+"""
+Serviço Financeiro
+==================
+
+Consultas do faturamento (contas a receber) e do repasse aos motoristas
+(contas a pagar), usadas pelo blueprint financeiro.
+
+Viagens já faturadas/pagas são as que estão em algum título
+(FinReceberViagens / FinPagarViagens). O filtro é um NOT EXISTS feito
+pelo banco (anti-join pelo índice de viagem_id), em vez de carregar todos
+os ids já vinculados e devolvê-los num NOT IN (...) que cresce a cada
+fatura.
+
+Faturamento em lote (faturar_periodo, 'flask faturar-periodo'): um título a
+receber por empresa com as viagens finalizadas do período ainda sem
+título, numa única transação:
+- uma consulta agrupada por empresa (quantidade e valor, com hora parada)
+- INSERT em lote dos títulos e INSERT ... SELECT dos vínculos
+- pode ser executado de novo: as viagens já faturadas não entram, e uma
+  execução simultânea espera a outra terminar (bloquear_serie)
+
+Repasse em lote (pagar_periodo, 'flask pagar-periodo'): o mesmo, com um
+título a pagar por motorista (valor_repasse + repasse da hora parada).
+
+Listagens (contas a receber / a pagar): totais por status calculados pelo
+banco (totais_por_status) e paginação por chave (pagina_titulos): a
+página seguinte é buscada a partir do último (data_vencimento, id)
+exibido, pelo índice, sem OFFSET.
+
+Autor: Sistema DOUG Moving
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import and_, exists, func, insert, literal, select, tuple_
+
+from app import db
+from app.models import (
+    Empresa, FinContasPagar, FinContasReceber, FinPagarViagens,
+    FinReceberViagens, Motorista, Viagem, ViagemHoraParada
+)
+from app.utils.numeracao import bloquear_serie, proximos_numeros_titulo
+
+
+TITULOS_POR_PAGINA = 50
+
+PaginaTitulos = namedtuple('PaginaTitulos', 'titulos anterior proximo')
+
+
+class ViagensAlteradas(Exception):
+    """As viagens do período mudaram durante a geração em lote (tentar de novo)."""
+
+
+def viagem_nao_faturada():
+    """Condição: a viagem não está em nenhum título a receber."""
+    return ~exists().where(FinReceberViagens.viagem_id == Viagem.id)
+
+
+def viagem_nao_paga():
+    """Condição: a viagem não está em nenhum título a pagar."""
+    return ~exists().where(FinPagarViagens.viagem_id == Viagem.id)
+
+
+def viagens_a_faturar(empresa_id, dt_inicio, dt_fim):
+    """
+    Viagens finalizadas da empresa no período ainda sem título a receber.
+
+    Returns:
+        list[Viagem]: mais recentes primeiro, com hora parada carregada
+    """
+    return Viagem.query.options(db.joinedload(Viagem.hora_parada)).filter(
+        Viagem.empresa_id == empresa_id,
+        Viagem.status == 'Finalizada',
+        Viagem.data_criacao >= dt_inicio,
+        Viagem.data_criacao <= dt_fim,
+        viagem_nao_faturada()
+    ).order_by(Viagem.data_criacao.desc()).all()
+
+
+def viagens_a_pagar(motorista_id, dt_inicio, dt_fim):
+    """
+    Viagens finalizadas do motorista no período ainda sem título a pagar.
+
+    Returns:
+        list[Viagem]: mais recentes primeiro, com hora parada carregada
+    """
+    return Viagem.query.options(db.joinedload(Viagem.hora_parada)).filter(
+        Viagem.motorista_id == motorista_id,
+        Viagem.status == 'Finalizada',
+        Viagem.data_criacao >= dt_inicio,
+        Viagem.data_criacao <= dt_fim,
+        viagem_nao_paga()
+    ).order_by(Viagem.data_criacao.desc()).all()
+
+
+class ResultadoFaturamento:
+    """
+    Resumo de uma geração em lote de títulos.
+
+    titulos: um dict por título com numero, viagens e valor, mais
+    empresa_id/empresa (a receber) ou motorista_id/motorista/cpf_cnpj/
+    chave_pix (a pagar)
+    """
+
+    def __init__(self, inicio, fim, simulacao=False):
+        self.inicio = inicio
+        self.fim = fim
+        self.simulacao = simulacao
+        self.titulos = []
+
+    @property
+    def viagens(self):
+        return sum(t['viagens'] for t in self.titulos)
+
+    @property
+    def valor_total(self):
+        return sum(t['valor'] for t in self.titulos)
+
+    def __repr__(self):
+        return (f'<ResultadoFaturamento {self.inicio}..{self.fim} '
+                f'titulos={len(self.titulos)} viagens={self.viagens}>')
+
+
+def faturar_periodo(inicio, fim, data_vencimento, usuario_id, empresa_ids=None,
+                    simular=False):
+    """
+    Gera um título a receber por empresa com as viagens do período ainda
+    não faturadas. Não faz commit.
+
+    Args:
+        inicio (datetime): Início do período (data_criacao >= inicio)
+        fim (datetime): Fim do período, exclusivo (data_criacao < fim)
+        data_vencimento (date): Vencimento dos títulos
+        usuario_id (int): Usuário registrado como criador dos títulos
+        empresa_ids (list): Restringe às empresas informadas (padrão: todas)
+        simular (bool): Só calcula o resumo, sem gravar
+
+    Returns:
+        ResultadoFaturamento: títulos gerados (ou que seriam gerados)
+
+    Raises:
+        ViagensAlteradas: uma viagem do período foi finalizada/cancelada
+            durante a geração (fazer rollback e executar de novo)
+    """
+    resultado = ResultadoFaturamento(inicio, fim, simulacao=simular)
+    if not simular:
+        bloquear_serie('REC')
+
+    filtros = [
+        Viagem.status == 'Finalizada',
+        Viagem.data_criacao >= inicio,
+        Viagem.data_criacao < fim,
+        viagem_nao_faturada(),
+    ]
+    if empresa_ids:
+        filtros.append(Viagem.empresa_id.in_(empresa_ids))
+
+    grupos = db.session.query(
+        Viagem.empresa_id, Empresa.nome, func.count(Viagem.id),
+        func.sum(func.coalesce(Viagem.valor, 0) +
+                 func.coalesce(ViagemHoraParada.valor_adicional, 0))
+    ).join(Empresa, Empresa.id == Viagem.empresa_id
+    ).outerjoin(ViagemHoraParada, ViagemHoraParada.viagem_id == Viagem.id
+    ).filter(*filtros
+    ).group_by(Viagem.empresa_id, Empresa.nome
+    ).order_by(Empresa.nome).all()
+
+    numeros = ([None] * len(grupos) if simular
+               else proximos_numeros_titulo('REC', len(grupos)))
+    for numero, (empresa_id, nome, quantidade, valor) in zip(numeros, grupos):
+        resultado.titulos.append({
+            'numero': numero, 'empresa_id': empresa_id, 'empresa': nome,
+            'viagens': quantidade, 'valor': round(float(valor or 0), 2),
+        })
+    if simular or not grupos:
+        return resultado
+
+    agora = datetime.utcnow()
+    hoje = agora.date()
+    observacao = (f'Faturamento em lote: viagens de {inicio:%d/%m/%Y} '
+                  f'a {fim:%d/%m/%Y} (exclusivo)')
+    db.session.execute(insert(FinContasReceber), [{
+        'numero_titulo': t['numero'], 'empresa_id': t['empresa_id'],
+        'valor_total': t['valor'], 'data_emissao': hoje,
+        'data_vencimento': data_vencimento, 'status': 'Aberto',
+        'observacoes': observacao, 'created_by_user_id': usuario_id,
+        'created_at': agora, 'updated_at': agora,
+    } for t in resultado.titulos])
+
+    # Vínculos: cada viagem vai para o título da sua empresa gerado acima
+    titulos = db.session.query(FinContasReceber.id, FinContasReceber.empresa_id).filter(
+        FinContasReceber.numero_titulo.in_(numeros)).subquery()
+    viagens = select(
+        titulos.c.id, Viagem.id, func.coalesce(Viagem.valor, 0), literal(agora)
+    ).select_from(Viagem).join(
+        titulos, titulos.c.empresa_id == Viagem.empresa_id
+    ).where(and_(*filtros))
+    vinculadas = db.session.execute(insert(FinReceberViagens).from_select(
+        ['conta_receber_id', 'viagem_id', 'valor_viagem', 'created_at'], viagens)).rowcount
+
+    if vinculadas != resultado.viagens:
+        raise ViagensAlteradas(
+            f'{resultado.viagens} viagens somadas e {vinculadas} vinculadas: '
+            f'viagens do período alteradas durante o faturamento')
+    return resultado
+
+
+def pagar_periodo(inicio, fim, data_vencimento, usuario_id, motorista_ids=None,
+                  simular=False):
+    """
+    Gera um título a pagar por motorista com as viagens do período ainda
+    sem repasse. Não faz commit.
+
+    Args:
+        inicio (datetime): Início do período (data_criacao >= inicio)
+        fim (datetime): Fim do período, exclusivo (data_criacao < fim)
+        data_vencimento (date): Vencimento (data do pagamento) dos títulos
+        usuario_id (int): Usuário registrado como criador dos títulos
+        motorista_ids (list): Restringe aos motoristas informados (padrão: todos)
+        simular (bool): Só calcula o resumo, sem gravar
+
+    Returns:
+        ResultadoFaturamento: títulos gerados (ou que seriam gerados)
+
+    Raises:
+        ViagensAlteradas: uma viagem do período foi finalizada/cancelada
+            durante a geração (fazer rollback e executar de novo)
+    """
+    resultado = ResultadoFaturamento(inicio, fim, simulacao=simular)
+    if not simular:
+        bloquear_serie('PAG')
+
+    filtros = [
+        Viagem.status == 'Finalizada',
+        Viagem.motorista_id.isnot(None),
+        Viagem.data_criacao >= inicio,
+        Viagem.data_criacao < fim,
+        viagem_nao_paga(),
+    ]
+    if motorista_ids:
+        filtros.append(Viagem.motorista_id.in_(motorista_ids))
+
+    grupos = db.session.query(
+        Motorista.id, Motorista.nome, Motorista.cpf_cnpj, Motorista.chave_pix,
+        func.count(Viagem.id),
+        func.sum(func.coalesce(Viagem.valor_repasse, 0) +
+                 func.coalesce(ViagemHoraParada.repasse_adicional, 0))
+    ).join(Motorista, Motorista.id == Viagem.motorista_id
+    ).outerjoin(ViagemHoraParada, ViagemHoraParada.viagem_id == Viagem.id
+    ).filter(*filtros
+    ).group_by(Motorista.id, Motorista.nome, Motorista.cpf_cnpj, Motorista.chave_pix
+    ).order_by(Motorista.nome).all()
+
+    numeros = ([None] * len(grupos) if simular
+               else proximos_numeros_titulo('PAG', len(grupos)))
+    for numero, (motorista_id, nome, cpf_cnpj, chave_pix, quantidade, valor) in zip(
+            numeros, grupos):
+        resultado.titulos.append({
+            'numero': numero, 'motorista_id': motorista_id, 'motorista': nome,
+            'cpf_cnpj': cpf_cnpj, 'chave_pix': chave_pix,
+            'viagens': quantidade, 'valor': round(float(valor or 0), 2),
+        })
+    if simular or not grupos:
+        return resultado
+
+    agora = datetime.utcnow()
+    hoje = agora.date()
+    observacao = (f'Repasse em lote: viagens de {inicio:%d/%m/%Y} '
+                  f'a {fim:%d/%m/%Y} (exclusivo)')
+    db.session.execute(insert(FinContasPagar), [{
+        'numero_titulo': t['numero'], 'motorista_id': t['motorista_id'],
+        'valor_total': t['valor'], 'data_emissao': hoje,
+        'data_vencimento': data_vencimento, 'status': 'Aberto',
+        'observacoes': observacao, 'created_by_user_id': usuario_id,
+        'created_at': agora, 'updated_at': agora,
+    } for t in resultado.titulos])
+
+    # Vínculos: cada viagem vai para o título do seu motorista gerado acima
+    titulos = db.session.query(FinContasPagar.id, FinContasPagar.motorista_id).filter(
+        FinContasPagar.numero_titulo.in_(numeros)).subquery()
+    viagens = select(
+        titulos.c.id, Viagem.id, func.coalesce(Viagem.valor_repasse, 0), literal(agora)
+    ).select_from(Viagem).join(
+        titulos, titulos.c.motorista_id == Viagem.motorista_id
+    ).where(and_(*filtros))
+    vinculadas = db.session.execute(insert(FinPagarViagens).from_select(
+        ['conta_pagar_id', 'viagem_id', 'valor_repasse', 'created_at'], viagens)).rowcount
+
+    if vinculadas != resultado.viagens:
+        raise ViagensAlteradas(
+            f'{resultado.viagens} viagens somadas e {vinculadas} vinculadas: '
+            f'viagens do período alteradas durante o repasse')
+    return resultado
+
+
+def totais_por_status(modelo, filtros):
+    """
+    Quantidade e valor dos títulos filtrados, por status (um GROUP BY).
+
+    Args:
+        modelo: FinContasReceber ou FinContasPagar
+        filtros (list): Condições da listagem
+
+    Returns:
+        dict: {status: (quantidade, valor)}
+    """
+    linhas = db.session.query(
+        modelo.status, func.count(modelo.id),
+        func.coalesce(func.sum(modelo.valor_total), 0)
+    ).filter(*filtros).group_by(modelo.status).all()
+    return {status: (quantidade, float(valor)) for status, quantidade, valor in linhas}
+
+
+def _cursor(titulo):
+    return f'{titulo.data_vencimento:%Y-%m-%d}_{titulo.id}'
+
+
+def _ler_cursor(valor):
+    """(data_vencimento, id) do cursor 'AAAA-MM-DD_id'; None se inválido."""
+    try:
+        data, titulo_id = (valor or '').split('_')
+        return datetime.strptime(data, '%Y-%m-%d').date(), int(titulo_id)
+    except ValueError:
+        return None
+
+
+def pagina_titulos(modelo, filtros, apos=None, antes=None, tamanho=TITULOS_POR_PAGINA,
+                   opcoes=()):
+    """
+    Uma página da listagem de títulos, do vencimento mais recente ao mais
+    antigo (data_vencimento, id decrescentes).
+
+    Args:
+        modelo: FinContasReceber ou FinContasPagar
+        filtros (list): Condições da listagem
+        apos (str): Cursor: página seguinte ao título informado
+        antes (str): Cursor: página anterior ao título informado
+        tamanho (int): Títulos por página
+        opcoes (tuple): Opções da query (ex: joinedload)
+
+    Returns:
+        PaginaTitulos: titulos, e os cursores 'anterior' e 'proximo'
+        (None quando não há página nessa direção)
+    """
+    chave = tuple_(modelo.data_vencimento, modelo.id)
+    query = modelo.query.options(*opcoes).filter(*filtros)
+    cursor_antes, cursor_apos = _ler_cursor(antes), _ler_cursor(apos)
+
+    if cursor_antes:
+        # Os `tamanho` títulos logo antes do cursor, lidos na ordem inversa
+        titulos = query.filter(chave > tuple_(*cursor_antes)).order_by(
+            modelo.data_vencimento, modelo.id).limit(tamanho + 1).all()
+        tem_anterior, tem_proximo = len(titulos) > tamanho, True
+        titulos = titulos[:tamanho][::-1]
+    else:
+        if cursor_apos:
+            query = query.filter(chave < tuple_(*cursor_apos))
+        titulos = query.order_by(
+            modelo.data_vencimento.desc(), modelo.id.desc()).limit(tamanho + 1).all()
+        tem_anterior, tem_proximo = cursor_apos is not None, len(titulos) > tamanho
+        titulos = titulos[:tamanho]
+
+    return PaginaTitulos(
+        titulos,
+        _cursor(titulos[0]) if titulos and tem_anterior else None,
+        _cursor(titulos[-1]) if titulos and tem_proximo else None,
+    )
@@ -0,0 +1,289 @@
+"""
+Fila de Notificações (Outbox)
+=============================
+
+As rotas gravam as mensagens em 'notificacao_outbox' na MESMA transação da
+alteração da viagem (enfileirar, sem commit). Cada mensagem fica
+NOTIFICACAO_JANELA segundos na fila antes de ser enviada. Um worker
+separado ('flask worker-notificacoes') faz o envio:
+
+1. Reserva um lote: UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP
+   LOCKED LIMIT n), marcando o lote e o fim da reserva. Vários workers
+   não pegam a mesma mensagem; em SQLite as escritas já são serializadas
+   e o SKIP LOCKED é omitido.
+   Agrupamento por destino: as mensagens novas dos mesmos telefones que
+   ainda estão na janela entram no lote; para cada telefone, a mensagem
+   mais nova de uma viagem substitui as anteriores da mesma viagem (ex:
+   confirmação seguida de cancelamento) e as restantes viram um único
+   resumo. As demais ficam com status 'Agrupada'. Tudo no mesmo commit
+   da reserva.
+2. Envia fora da transação (whatsapp_gateway.enviar_lote: até
+   WHATSAPP_CONCORRENCIA envios simultâneos, em ordem por destino e
+   respeitando WHATSAPP_MESSAGE_INTERVAL entre mensagens do mesmo destino).
+3. Grava os resultados do lote em um commit:
+   - enviada: status 'Enviada'
+   - falha temporária: nova tentativa em BASE * 2^(tentativa-1) segundos
+     (limitado a NOTIFICACAO_BACKOFF_MAX, com variação aleatória)
+   - falha permanente ou tentativas esgotadas: status 'Falha' (dead letter),
+     reenviável com 'flask worker-notificacoes --reprocessar-falhas'
+
+Se o worker parar no meio de um lote, a reserva expira e as mensagens
+voltam para a fila (entrega pelo menos uma vez).
+
+Autor: Sistema DOUG Moving
+"""
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+import logging
+import random
+import time
+import uuid
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models import NotificacaoOutbox
+from app.config.whatsapp import (
+    WHATSAPP_MESSAGE_INTERVAL, NOTIFICACAO_LOTE, NOTIFICACAO_MAX_TENTATIVAS,
+    NOTIFICACAO_BACKOFF_BASE, NOTIFICACAO_BACKOFF_MAX, NOTIFICACAO_JANELA
+)
+from app.services.whatsapp_gateway import EvolutionGateway, enviar_lote
+
+logger = logging.getLogger(__name__)
+
+CANAL_WHATSAPP = 'whatsapp'
+
+ResultadoLote = namedtuple('ResultadoLote', 'reservadas enviadas reagendadas falhas')
+
+
+def enfileirar(destino, mensagem, evento, viagem_id=None, canal=CANAL_WHATSAPP,
+               janela=NOTIFICACAO_JANELA):
+    """
+    Adiciona uma mensagem à fila na sessão atual (SEM commit: vai junto
+    com a alteração que a originou). Só é enviada depois de `janela`
+    segundos, junto com as que chegarem para o mesmo destino até lá.
+    """
+    registro = NotificacaoOutbox(destino=destino, mensagem=mensagem, evento=evento,
+                                 viagem_id=viagem_id, canal=canal,
+                                 disponivel_em=datetime.utcnow() + timedelta(seconds=janela))
+    db.session.add(registro)
+    return registro
+
+
+def tempo_espera(tentativas):
+    """Segundos até a próxima tentativa (backoff exponencial com jitter)."""
+    espera = min(NOTIFICACAO_BACKOFF_BASE * 2 ** max(tentativas - 1, 0),
+                 NOTIFICACAO_BACKOFF_MAX)
+    return espera * random.uniform(0.9, 1.1)
+
+
+def _agrupar(mensagens):
+    """
+    Agrupa as mensagens reservadas por destino (na sessão, sem commit).
+
+    Returns:
+        int: quantidade de mensagens marcadas como 'Agrupada'
+    """
+    por_destino = {}
+    for mensagem in mensagens:
+        por_destino.setdefault(mensagem.destino, []).append(mensagem)
+
+    agrupadas = 0
+    for lista in por_destino.values():
+        if len(lista) < 2:
+            continue
+        # A mais nova de cada viagem substitui as anteriores
+        ultima_da_viagem = {m.viagem_id: m for m in lista if m.viagem_id}
+        validas = [m for m in lista if not m.viagem_id or ultima_da_viagem[m.viagem_id] is m]
+
+        principal = validas[-1]
+        if len(validas) > 1:
+            principal.mensagem = f'📋 Go Mobi: {len(validas)} atualizações\n\n' + '\n\n'.join(
+                f'{i}. {m.mensagem}' for i, m in enumerate(validas, 1))
+            principal.evento = 'resumo'
+            principal.viagem_id = None
+        for mensagem in lista:
+            if mensagem is not principal:
+                mensagem.status = NotificacaoOutbox.STATUS_AGRUPADA
+                mensagem.lote = None
+                agrupadas += 1
+    return agrupadas
+
+
+def _duracao_reserva(quantidade, intervalo):
+    """Tempo que o lote fica reservado: o envio de todas + folga."""
+    return timedelta(seconds=quantidade * (intervalo + 30) + 60)
+
+
+def reservar_lote(quantidade=NOTIFICACAO_LOTE, canal=CANAL_WHATSAPP,
+                  intervalo=WHATSAPP_MESSAGE_INTERVAL):
+    """
+    Reserva até `quantidade` mensagens disponíveis (mais as novas dos
+    mesmos destinos, agrupadas) e faz o commit.
+
+    Returns:
+        list: NotificacaoOutbox reservadas, na ordem da fila
+    """
+    agora = datetime.utcnow()
+    lote = uuid.uuid4().hex
+    reserva = dict(
+        lote=lote,
+        disponivel_em=agora + _duracao_reserva(quantidade, intervalo),
+        tentativas=NotificacaoOutbox.tentativas + 1
+    )
+    disponiveis = select(NotificacaoOutbox.id).where(
+        NotificacaoOutbox.status == NotificacaoOutbox.STATUS_PENDENTE,
+        NotificacaoOutbox.canal == canal,
+        NotificacaoOutbox.disponivel_em <= agora
+    ).order_by(NotificacaoOutbox.disponivel_em, NotificacaoOutbox.id).limit(
+        quantidade).with_for_update(skip_locked=True)
+
+    db.session.execute(
+        update(NotificacaoOutbox).where(
+            NotificacaoOutbox.id.in_(disponiveis),
+            # Repetido para o caso (SQLite) de outro worker ter reservado antes
+            NotificacaoOutbox.status == NotificacaoOutbox.STATUS_PENDENTE,
+            NotificacaoOutbox.disponivel_em <= agora
+        ).values(**reserva).execution_options(synchronize_session=False)
+    )
+
+    # Mensagens novas (ainda na janela) dos mesmos destinos
+    reservada = aliased(NotificacaoOutbox)
+    na_janela = select(NotificacaoOutbox.id).where(
+        NotificacaoOutbox.status == NotificacaoOutbox.STATUS_PENDENTE,
+        NotificacaoOutbox.canal == canal,
+        NotificacaoOutbox.lote.is_(None),
+        NotificacaoOutbox.tentativas == 0,
+        NotificacaoOutbox.destino.in_(
+            select(reservada.destino).where(reservada.lote == lote))
+    ).with_for_update(skip_locked=True)
+    db.session.execute(
+        update(NotificacaoOutbox).where(
+            NotificacaoOutbox.id.in_(na_janela),
+            NotificacaoOutbox.status == NotificacaoOutbox.STATUS_PENDENTE,
+            NotificacaoOutbox.lote.is_(None)
+        ).values(**reserva).execution_options(synchronize_session=False)
+    )
+
+    # A reserva cobre o lote inteiro: as pedidas e as da janela somadas a elas
+    reservadas = db.session.query(func.count(NotificacaoOutbox.id)).filter(
+        NotificacaoOutbox.lote == lote).scalar()
+    if reservadas > quantidade:
+        db.session.execute(
+            update(NotificacaoOutbox).where(NotificacaoOutbox.lote == lote).values(
+                disponivel_em=agora + _duracao_reserva(reservadas, intervalo)
+            ).execution_options(synchronize_session=False)
+        )
+
+    consulta = NotificacaoOutbox.query.filter_by(lote=lote).order_by(NotificacaoOutbox.id)
+    agrupadas = _agrupar(consulta.all())
+    db.session.commit()
+    if agrupadas:
+        logger.info(f'📋 {agrupadas} notificação(ões) agrupada(s) em resumos')
+    return consulta.all()
+
+
+def _gravar_resultados(enviadas, reagendadas, falhas):
+    agora = datetime.utcnow()
+    id_param = bindparam('b_id')
+    if enviadas:
+        db.session.execute(
+            update(NotificacaoOutbox.__table__).where(NotificacaoOutbox.id == id_param).values(
+                status=NotificacaoOutbox.STATUS_ENVIADA, enviado_em=agora, lote=None, erro=None),
+            [{'b_id': i} for i in enviadas])
+    if reagendadas:
+        db.session.execute(
+            update(NotificacaoOutbox.__table__).where(NotificacaoOutbox.id == id_param).values(
+                disponivel_em=bindparam('b_disponivel_em'), erro=bindparam('b_erro'), lote=None),
+            reagendadas)
+    if falhas:
+        db.session.execute(
+            update(NotificacaoOutbox.__table__).where(NotificacaoOutbox.id == id_param).values(
+                status=NotificacaoOutbox.STATUS_FALHA, erro=bindparam('b_erro'), lote=None),
+            falhas)
+    db.session.commit()
+
+
+def processar_lote(gateway=None, quantidade=NOTIFICACAO_LOTE, canal=CANAL_WHATSAPP,
+                   intervalo=WHATSAPP_MESSAGE_INTERVAL, concorrencia=None):
+    """
+    Reserva, envia e grava o resultado de um lote.
+
+    Returns:
+        ResultadoLote: quantidades reservadas, enviadas, reagendadas e em falha
+    """
+    gateway = gateway or EvolutionGateway()
+    mensagens = reservar_lote(quantidade, canal, intervalo)
+    # Os dados são lidos agora: o envio abaixo não usa a sessão
+    mensagens = [(m.id, m.destino, m.mensagem, m.tentativas) for m in mensagens]
+    db.session.close()
+
+    resultados = enviar_lote(gateway, [(m[0], m[1], m[2]) for m in mensagens],
+                             concorrencia, intervalo)
+
+    enviadas, reagendadas, falhas = [], [], []
+    for id_mensagem, _, _, tentativas in mensagens:
+        e = resultados[id_mensagem]
+        if e is None:
+            enviadas.append(id_mensagem)
+        elif e.permanente or tentativas >= NOTIFICACAO_MAX_TENTATIVAS:
+            falhas.append({'b_id': id_mensagem, 'b_erro': str(e)})
+        else:
+            reagendadas.append({
+                'b_id': id_mensagem, 'b_erro': str(e),
+                'b_disponivel_em': datetime.utcnow() + timedelta(seconds=tempo_espera(tentativas))
+            })
+
+    _gravar_resultados(enviadas, reagendadas, falhas)
+    if falhas:
+        logger.warning(f"📭 {len(falhas)} notificação(ões) movida(s) para 'Falha'")
+    return ResultadoLote(len(mensagens), len(enviadas), len(reagendadas), len(falhas))
+
+
+def executar_worker(gateway=None, quantidade=NOTIFICACAO_LOTE, canal=CANAL_WHATSAPP,
+                    intervalo=WHATSAPP_MESSAGE_INTERVAL, espera_ociosa=5, parar=None,
+                    concorrencia=None):
+    """
+    Processa lotes até a fila esvaziar (espera_ociosa=None) ou até `parar()`.
+
+    Returns:
+        ResultadoLote: totais acumulados
+    """
+    # Um gateway para todos os lotes: as conexões do pool são reaproveitadas
+    gateway = gateway or EvolutionGateway()
+    totais = ResultadoLote(0, 0, 0, 0)
+    while not (parar and parar()):
+        resultado = processar_lote(gateway, quantidade, canal, intervalo, concorrencia)
+        totais = ResultadoLote(*(a + b for a, b in zip(totais, resultado)))
+        if resultado.reservadas:
+            logger.info(f'📨 Lote: {resultado.enviadas} enviada(s), {resultado.reagendadas} '
+                        f'reagendada(s), {resultado.falhas} falha(s)')
+            continue
+        if espera_ociosa is None:
+            break
+        time.sleep(espera_ociosa)
+    return totais
+
+
+def reprocessar_falhas(canal=CANAL_WHATSAPP):
+    """Devolve as mensagens em 'Falha' para a fila, com as tentativas zeradas."""
+    quantidade = db.session.execute(
+        update(NotificacaoOutbox).where(
+            NotificacaoOutbox.status == NotificacaoOutbox.STATUS_FALHA,
+            NotificacaoOutbox.canal == canal
+        ).values(
+            status=NotificacaoOutbox.STATUS_PENDENTE, tentativas=0,
+            disponivel_em=datetime.utcnow()
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return quantidade
+
+
+def resumo_fila(canal=CANAL_WHATSAPP):
+    """{status: quantidade} da fila do canal."""
+    return dict(db.session.query(
+        NotificacaoOutbox.status, db.func.count(NotificacaoOutbox.id)
+    ).filter(NotificacaoOutbox.canal == canal).group_by(NotificacaoOutbox.status).all())
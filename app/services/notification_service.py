@@ -1,112 +1,188 @@
 """
-Serviço de Notificações - DESATIVADO
+Serviço de Notificações (WhatsApp)
 
-Este serviço foi desativado. Todas as funções retornam sucesso silenciosamente
-sem enviar notificações reais.
+As mensagens NÃO são enviadas aqui: cada método grava as mensagens na fila
+'notificacao_outbox' na sessão atual, sem commit. Devem ser chamados ANTES
+do db.session.commit() da alteração da viagem, para que a mensagem só
+exista se a alteração for confirmada. O envio é feito pelo worker
+('flask worker-notificacoes', ver app/services/notificacao_outbox.py).
+
+Ativo quando WHATSAPP_ENABLED, WHATSAPP_SEND_NOTIFICATIONS e
+EVOLUTION_API_URL estão configurados; caso contrário os métodos não
+gravam nada e retornam sucesso (como na versão desativada).
 
 Autor: Manus AI
 Data: 24 de Dezembro de 2025
-Versão: 4.0 (DESATIVADO)
+Versão: 5.0 (fila persistente)
 """
 
 import logging
 
+from app import db
+from app.config.whatsapp import (
+    WHATSAPP_ENABLED, WHATSAPP_SEND_NOTIFICATIONS, EVOLUTION_API_URL
+)
+from app.models import Colaborador, Motorista, Viagem
+from app.services.notificacao_outbox import enfileirar
+from app.services.whatsapp_gateway import normalizar_telefone
+
 logger = logging.getLogger(__name__)
 
 
+def _horario(viagem):
+    horario = viagem.horario_entrada or viagem.horario_saida or viagem.horario_desligamento
+    return horario.strftime('%d/%m/%Y às %H:%M') if horario else 'horário a confirmar'
+
+
 class NotificationService:
-    """Serviço de notificações DESATIVADO - Modo silencioso"""
+    """Grava as notificações de viagens na fila de envio."""
 
     def __init__(self):
-        """Inicializa o serviço em modo desativado"""
-        self.enabled = False
-        logger.info("ℹ️  Sistema de notificações DESATIVADO")
+        """Ativo somente com o gateway configurado"""
+        self.enabled = bool(WHATSAPP_ENABLED and WHATSAPP_SEND_NOTIFICATIONS and EVOLUTION_API_URL)
+        if self.enabled:
+            logger.info("✅ Notificações WhatsApp ativas (fila notificacao_outbox)")
+        else:
+            logger.info("ℹ️  Sistema de notificações DESATIVADO")
 
-    def _enviar_template_whatsapp(self, telefone: str, template_name: str, parametros: list) -> bool:
+    def _enfileirar(self, telefone, mensagem, evento, viagem_id=None):
         """
-        Método desativado - retorna True sem enviar nada
-        
-        Args:
-            telefone: Número do destinatário (ignorado)
-            template_name: Nome do template (ignorado)
-            parametros: Lista de parâmetros (ignorado)
-            
+        Grava uma mensagem na fila (sem commit).
+
         Returns:
-            bool: Sempre True
+            bool: False se o telefone for inválido
         """
+        destino = normalizar_telefone(telefone)
+        if not destino:
+            return False
+        enfileirar(destino, mensagem, evento, viagem_id)
         return True
 
+    def _colaboradores(self, viagem):
+        ids = viagem.get_colaboradores_lista()
+        if not ids:
+            return []
+        return db.session.query(Colaborador.nome, Colaborador.telefone).filter(
+            Colaborador.id.in_(ids)).all()
+
+    def _notificar_colaboradores(self, viagem, evento, montar_mensagem):
+        """Enfileira uma mensagem por colaborador da viagem; retorna o resultado."""
+        enviadas = falhas = 0
+        for colaborador in self._colaboradores(viagem):
+            if self._enfileirar(colaborador.telefone, montar_mensagem(colaborador),
+                                evento, viagem.id):
+                enviadas += 1
+            else:
+                falhas += 1
+        return {'success': True, 'enviadas': enviadas, 'falhas': falhas}
+
     def notificar_novas_viagens_em_lote(self, quantidade_viagens: int = 0) -> int:
         """
-        Notificação desativada - retorna quantidade de viagens sem enviar nada
-        
+        Avisa os motoristas ativos e online que há viagens novas disponíveis
+
         Args:
             quantidade_viagens: Quantidade de viagens criadas
-            
+
         Returns:
-            int: Retorna a quantidade recebida (simula sucesso)
-        """
-        logger.debug(f"📭 Notificação desativada: {quantidade_viagens} viagem(ns) criada(s)")
-        return quantidade_viagens
+            int: Quantidade de motoristas notificados
+        """
+        if not self.enabled or not quantidade_viagens:
+            logger.debug(f"📭 Notificação desativada: {quantidade_viagens} viagem(ns) criada(s)")
+            return quantidade_viagens
+
+        plural = 'viagens novas disponíveis' if quantidade_viagens > 1 else 'viagem nova disponível'
+        mensagem = (f"🚗 Go Mobi: {quantidade_viagens} {plural}. "
+                    f"Acesse o app para aceitar.")
+        motoristas = db.session.query(Motorista.telefone).filter(
+            Motorista.status == 'Ativo',
+            Motorista.status_disponibilidade == 'online',
+            Motorista.telefone.isnot(None)
+        ).all()
+        return sum(self._enfileirar(m.telefone, mensagem, 'novas_viagens') for m in motoristas)
 
     def notificar_viagem_confirmada(self, viagem_id: int, motorista_id: int) -> dict:
         """
-        Notificação desativada - retorna sucesso sem enviar nada
-        
+        Avisa os colaboradores que a viagem tem motorista
+
         Args:
             viagem_id: ID da viagem confirmada
             motorista_id: ID do motorista atribuído
-            
+
         Returns:
-            dict: {'success': True, 'enviadas': 1, 'falhas': 0}
+            dict: {'success', 'enviadas', 'falhas'}
         """
-        logger.debug(f"📭 Notificação desativada: viagem {viagem_id} confirmada")
-        return {
-            'success': True,
-            'enviadas': 1,
-            'falhas': 0
-        }
+        if not self.enabled:
+            logger.debug(f"📭 Notificação desativada: viagem {viagem_id} confirmada")
+            return {'success': True, 'enviadas': 1, 'falhas': 0}
+
+        viagem = db.session.get(Viagem, viagem_id)
+        motorista = db.session.get(Motorista, motorista_id)
+        if not viagem or not motorista:
+            return {'success': False, 'enviadas': 0, 'falhas': 0}
+
+        veiculo = ' '.join(filter(None, [motorista.veiculo_nome, motorista.veiculo_cor]))
+        horario = _horario(viagem)
+        return self._notificar_colaboradores(
+            viagem, 'viagem_confirmada',
+            lambda c: (f"Olá, {c.nome}! Sua viagem de {horario} foi confirmada.\n"
+                       f"Motorista: {motorista.nome}\n"
+                       f"Veículo: {veiculo or '-'} - Placa {motorista.veiculo_placa or '-'}"))
 
     def notificar_viagem_cancelada_colaboradores(self, viagem_id: int, motivo_cancelamento: str = '') -> dict:
         """
-        Notificação desativada - retorna sucesso sem enviar nada
-        
+        Avisa os colaboradores que a viagem foi cancelada
+
         Args:
             viagem_id: ID da viagem cancelada
             motivo_cancelamento: Motivo do cancelamento
-            
+
         Returns:
-            dict: {'success': True, 'enviadas': 1, 'falhas': 0}
+            dict: {'success', 'enviadas', 'falhas'}
         """
-        logger.debug(f"📭 Notificação desativada: viagem {viagem_id} cancelada")
-        return {
-            'success': True,
-            'enviadas': 1,
-            'falhas': 0
-        }
+        if not self.enabled:
+            logger.debug(f"📭 Notificação desativada: viagem {viagem_id} cancelada")
+            return {'success': True, 'enviadas': 1, 'falhas': 0}
+
+        viagem = db.session.get(Viagem, viagem_id)
+        if not viagem:
+            return {'success': False, 'enviadas': 0, 'falhas': 0}
+
+        horario = _horario(viagem)
+        motivo = f"\nMotivo: {motivo_cancelamento}" if motivo_cancelamento else ''
+        return self._notificar_colaboradores(
+            viagem, 'viagem_cancelada',
+            lambda c: f"Olá, {c.nome}. Sua viagem de {horario} foi cancelada.{motivo}")
 
     def notificar_viagem_cancelada_por_motorista(self, viagem, motivo: str = '') -> int:
         """
-        Notificação desativada - retorna 1 (sucesso) sem enviar nada
-        
+        Avisa os colaboradores que o motorista desistiu da viagem
+
         Args:
             viagem: Objeto Viagem
             motivo: Motivo do cancelamento
-            
+
         Returns:
-            int: 1 (simula 1 notificação enviada)
+            int: Quantidade de colaboradores notificados
         """
-        logger.debug(f"📭 Notificação desativada: viagem {viagem.id} cancelada por motorista")
-        return 1
+        if not self.enabled:
+            logger.debug(f"📭 Notificação desativada: viagem {viagem.id} cancelada por motorista")
+            return 1
+
+        horario = _horario(viagem)
+        resultado = self._notificar_colaboradores(
+            viagem, 'viagem_cancelada',
+            lambda c: (f"Olá, {c.nome}. O motorista da sua viagem de {horario} cancelou. "
+                       f"Estamos buscando outro motorista."))
+        return resultado['enviadas']
 
     def notificar_viagem_iniciada(self, viagem_id: int, motorista_id: int) -> dict:
         """
-        Notificação desativada - retorna sucesso sem enviar nada
-        
+        Notificação não utilizada - retorna sucesso sem enviar nada
+
         Args:
             viagem_id: ID da viagem iniciada
             motorista_id: ID do motorista
-            
+
         Returns:
             dict: {'success': True, 'enviadas': 1, 'falhas': 0}
         """
@@ -119,12 +195,12 @@ class NotificationService:
 
     def notificar_viagem_finalizada(self, viagem_id: int, motorista_id: int) -> dict:
         """
-        Notificação desativada - retorna sucesso sem enviar nada
-        
+        Notificação não utilizada - retorna sucesso sem enviar nada
+
         Args:
             viagem_id: ID da viagem finalizada
             motorista_id: ID do motorista
-            
+
         Returns:
             dict: {'success': True, 'enviadas': 1, 'falhas': 0}
         """
@@ -137,12 +213,12 @@ class NotificationService:
 
     def notificar_colaborador_viagem_confirmada(self, colaborador_id: int, viagem_id: int) -> bool:
         """
-        Notificação desativada - retorna True sem enviar nada
-        
+        Notificação não utilizada - retorna True sem enviar nada
+
         Args:
             colaborador_id: ID do colaborador
             viagem_id: ID da viagem
-            
+
         Returns:
             bool: True
         """
@@ -151,12 +227,12 @@ class NotificationService:
 
     def notificar_motorista_nova_viagem(self, motorista_id: int, viagem_id: int) -> bool:
         """
-        Notificação desativada - retorna True sem enviar nada
-        
+        Notificação não utilizada - retorna True sem enviar nada
+
         Args:
             motorista_id: ID do motorista
             viagem_id: ID da viagem
-            
+
         Returns:
             bool: True
         """
@@ -164,5 +240,5 @@ class NotificationService:
         return True
 
 
-# Instância global do serviço (em modo desativado)
+# Instância global do serviço
 notification_service = NotificationService()
@@ -0,0 +1,186 @@
+"""
+Gateway WhatsApp (Evolution API)
+================================
+
+Envio de mensagens de texto pela Evolution API, usado pelo worker da
+fila de notificações (app/services/notificacao_outbox.py).
+
+- EvolutionGateway usa uma requests.Session com pool de conexões
+  (keep-alive): o handshake TCP/TLS é feito uma vez por conexão, e não
+  por mensagem
+- enviar_lote() envia um lote com até WHATSAPP_CONCORRENCIA mensagens
+  simultâneas. As mensagens de um mesmo destino saem em ordem, uma de
+  cada vez, com WHATSAPP_MESSAGE_INTERVAL entre duas mensagens para o
+  mesmo telefone (também entre lotes); destinos diferentes não esperam
+  uns pelos outros
+
+Erros são devolvidos como ErroEnvio:
+- permanente=True: o gateway recusou a mensagem (ex: número inválido) e
+  uma nova tentativa não vai mudar o resultado
+- permanente=False: timeout, erro de conexão, 429, 5xx ou gateway mal
+  configurado (tentar de novo)
+
+Autor: Sistema DOUG Moving
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config.whatsapp import (
+    EVOLUTION_API_URL, EVOLUTION_API_KEY, EVOLUTION_INSTANCE,
+    WHATSAPP_CONCORRENCIA, WHATSAPP_COUNTRY_CODE, WHATSAPP_TIMEOUT
+)
+
+
+class ErroEnvio(Exception):
+    """Falha no envio de uma mensagem."""
+
+    def __init__(self, mensagem, permanente=False):
+        super().__init__(mensagem)
+        self.permanente = permanente
+
+
+def normalizar_telefone(telefone):
+    """Somente dígitos, com o código do país. None se não parecer um celular."""
+    digitos = ''.join(c for c in str(telefone or '') if c.isdigit())
+    if len(digitos) < 10:
+        return None
+    if not digitos.startswith(WHATSAPP_COUNTRY_CODE) or len(digitos) <= 11:
+        digitos = WHATSAPP_COUNTRY_CODE + digitos
+    return digitos
+
+
+class EvolutionGateway:
+    """Cliente do endpoint /message/sendText da Evolution API (thread-safe)."""
+
+    def __init__(self, url=None, api_key=None, instancia=None, timeout=None,
+                 concorrencia=None):
+        self.url = (url or EVOLUTION_API_URL).rstrip('/')
+        self.instancia = instancia or EVOLUTION_INSTANCE
+        self.timeout = timeout or WHATSAPP_TIMEOUT
+        self.concorrencia = concorrencia or WHATSAPP_CONCORRENCIA
+
+        # Uma conexão mantida por envio simultâneo; sem retry automático
+        # (as novas tentativas são feitas pela fila, com backoff)
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=self.concorrencia,
+                                max_retries=0)
+        self.sessao.mount('http://', adaptador)
+        self.sessao.mount('https://', adaptador)
+        self.sessao.headers.update({
+            'apikey': api_key if api_key is not None else EVOLUTION_API_KEY,
+            'Content-Type': 'application/json'
+        })
+
+    @property
+    def configurado(self):
+        return bool(self.url)
+
+    def fechar(self):
+        self.sessao.close()
+
+    def enviar(self, destino, texto):
+        """
+        Envia uma mensagem de texto.
+
+        Raises:
+            ErroEnvio: se o gateway não confirmar o envio
+        """
+        try:
+            resposta = self.sessao.post(
+                f'{self.url}/message/sendText/{self.instancia}',
+                json={'number': f'{destino}@s.whatsapp.net', 'text': texto},
+                timeout=self.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            raise ErroEnvio(f'{type(e).__name__}: {e}')
+
+        if resposta.status_code in (200, 201):
+            return
+        # 400/422: mensagem recusada (ex: número sem WhatsApp). 401/403/404
+        # indicam configuração errada do gateway: tenta de novo mais tarde
+        permanente = resposta.status_code in (400, 422)
+        raise ErroEnvio(f'HTTP {resposta.status_code}: {resposta.text[:200]}', permanente)
+
+
+class _Cadencia:
+    """
+    Garante `intervalo` segundos entre o início de dois envios para o mesmo
+    destino (entre threads e entre os lotes do processo).
+    """
+
+    # Acima disso, os destinos que já podem receber são esquecidos
+    LIMITE_DESTINOS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._proximo = {}
+
+    def aguardar(self, destino, intervalo):
+        if intervalo <= 0:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            if len(self._proximo) > self.LIMITE_DESTINOS:
+                self._proximo = {d: h for d, h in self._proximo.items() if h > agora}
+            horario = max(agora, self._proximo.get(destino, 0))
+            self._proximo[destino] = horario + intervalo
+        if horario > agora:
+            time.sleep(horario - agora)
+
+
+_cadencia = _Cadencia()
+
+
+def enviar_lote(gateway, mensagens, concorrencia=None, intervalo=0):
+    """
+    Envia um lote de mensagens.
+
+    Args:
+        gateway: Objeto com enviar(destino, texto) (ex: EvolutionGateway)
+        mensagens (list): (chave, destino, texto) na ordem da fila
+        concorrencia (int): Destinos atendidos ao mesmo tempo
+            (padrão: gateway.concorrencia ou 1)
+        intervalo (float): Segundos entre o início de dois envios para o
+            mesmo destino
+
+    Returns:
+        dict: {chave: None se enviada, ou ErroEnvio}. Depois de uma falha,
+        as mensagens seguintes do mesmo destino não são enviadas (para não
+        chegarem fora de ordem) e voltam como falha temporária.
+    """
+    if concorrencia is None:
+        concorrencia = getattr(gateway, 'concorrencia', 1)
+    por_destino = {}
+    for chave, destino, texto in mensagens:
+        por_destino.setdefault(destino, []).append((chave, texto))
+
+    resultados = {}
+
+    def enviar_destino(item):
+        destino, fila = item
+        for posicao, (chave, texto) in enumerate(fila):
+            _cadencia.aguardar(destino, intervalo)
+            try:
+                gateway.enviar(destino, texto)
+                resultados[chave] = None
+            except ErroEnvio as e:
+                resultados[chave] = e
+                adiada = ErroEnvio('Adiada: mensagem anterior do mesmo destino falhou')
+                for chave_seguinte, _ in fila[posicao + 1:]:
+                    resultados[chave_seguinte] = adiada
+                return
+
+    threads = max(1, min(concorrencia, len(por_destino)))
+    if threads == 1:
+        for item in por_destino.items():
+            enviar_destino(item)
+    else:
+        with ThreadPoolExecutor(max_workers=threads,
+                                thread_name_prefix='whatsapp-envio') as executor:
+            list(executor.map(enviar_destino, por_destino.items()))
+    return resultados
@@ -2,11 +2,12 @@
 // Versão 1.0.0
 
 const CACHE_NAME = 'go-mobi-v1.0.0';
+const API_CACHE_NAME = 'go-mobi-api-v1';
 const OFFLINE_URL = '/offline';
 
 // Arquivos essenciais para cachear na instalação
+// ('/' fica de fora: é um redirecionamento que depende do usuário logado)
 const STATIC_CACHE_URLS = [
-  '/',
   '/static/css/bootstrap.min.css',
   '/static/css/custom.css',
   '/static/js/bootstrap.bundle.min.js',
@@ -43,7 +44,7 @@ self.addEventListener('activate', (event) => {
       .then((cacheNames) => {
         return Promise.all(
           cacheNames.map((cacheName) => {
-            if (cacheName !== CACHE_NAME) {
+            if (cacheName !== CACHE_NAME && cacheName !== API_CACHE_NAME) {
               console.log('[Service Worker] Removendo cache antigo:', cacheName);
               return caches.delete(cacheName);
             }
@@ -57,6 +58,43 @@ self.addEventListener('activate', (event) => {
   );
 });
 
+// Chave do cache da API sem o ?since=: guarda a última resposta de cada lista.
+// Aplicar uma resposta antiga é seguro: o app adota o token dela e a próxima
+// sincronização traz de novo tudo o que mudou depois.
+function chaveCacheApi(request) {
+  const url = new URL(request.url);
+  url.searchParams.delete('since');
+  return url.toString();
+}
+
+// Stale-while-revalidate: responde com o cache na hora e atualiza em segundo plano
+function staleWhileRevalidate(event) {
+  const chave = chaveCacheApi(event.request);
+
+  return caches.open(API_CACHE_NAME).then((cache) =>
+    cache.match(chave).then((cachedResponse) => {
+      const rede = fetch(event.request).then((response) => {
+        if (response.ok && !response.redirected) {
+          cache.put(chave, response.clone());
+        } else if (response.status !== 304) {
+          // Sessão expirada ou sem permissão: não serve mais a cópia
+          cache.delete(chave);
+        }
+        return response;
+      });
+
+      if (cachedResponse) {
+        event.waitUntil(rede.catch(() => {}));
+        return cachedResponse;
+      }
+      return rede.catch(() => new Response(JSON.stringify({ erro: 'Sem conexão.' }), {
+        status: 503,
+        headers: new Headers({ 'Content-Type': 'application/json' })
+      }));
+    })
+  );
+}
+
 // Intercepta requisições e serve do cache quando possível
 self.addEventListener('fetch', (event) => {
   // Ignora requisições que não são GET
@@ -64,11 +102,30 @@ self.addEventListener('fetch', (event) => {
     return;
   }
 
+  const url = new URL(event.request.url);
+
+  // Logout: descarta os dados do motorista guardados para uso offline
+  if (url.pathname === '/logout') {
+    event.waitUntil(caches.delete(API_CACHE_NAME));
+    return;
+  }
+
+  // API JSON do app do motorista (delta-sync): stale-while-revalidate
+  if (url.pathname.startsWith('/motorista/api/')) {
+    event.respondWith(staleWhileRevalidate(event));
+    return;
+  }
+
   // Ignora requisições de API (deixa passar para o servidor)
   if (event.request.url.includes('/api/')) {
     return;
   }
 
+  // Ignora o stream de eventos (SSE): conexão longa, nunca vai para o cache
+  if (event.request.headers.get('Accept') === 'text/event-stream') {
+    return;
+  }
+
   event.respondWith(
     caches.match(event.request)
       .then((cachedResponse) => {
@@ -27,8 +27,11 @@ from functools import wraps
 import json
 import time
 
+from sqlalchemy import case, desc
+
 from .. import db
-from ..models import AuditLog, ViagemAuditoria
+from ..models import AuditLog, ViagemAuditoria, AuditResumoDiario
+from .sql_utils import insert_com_conflito
 
 
 # ===========================================================================================
@@ -50,6 +53,7 @@ class AuditAction:
     READ = 'READ'
     UPDATE = 'UPDATE'
     DELETE = 'DELETE'
+    BULK_CREATE = 'BULK_CREATE'
     BULK_DELETE = 'BULK_DELETE'
 
     # Viagens
@@ -171,6 +175,7 @@ def log_audit(
         )
 
         db.session.add(audit_log)
+        incrementar_resumo_diario(audit_log)
         db.session.commit()
 
         return audit_log
@@ -288,6 +293,109 @@ def log_viagem_audit(
         return None
 
 
+# ===========================================================================================
+# ROLLUP DIÁRIO (AuditResumoDiario)
+# ===========================================================================================
+
+STATUS_ERRO = ('FAILED', 'ERROR')
+
+
+def incrementar_resumo_diario(audit_log):
+    """
+    Incrementa o contador do rollup diário correspondente ao log.
+
+    Executa um único INSERT ... ON CONFLICT DO UPDATE na mesma transação do
+    log, de modo que o rollup nunca diverge do audit_log.
+
+    Args:
+        audit_log (AuditLog): Log recém-criado (ainda não commitado)
+    """
+    tabela = AuditResumoDiario.__table__
+    erro = 1 if audit_log.status in STATUS_ERRO else 0
+    chave = {
+        'dia': audit_log.timestamp.date(),
+        'action': audit_log.action,
+        'user_name': audit_log.user_name or '',
+        'severity': audit_log.severity or AuditSeverity.INFO,
+    }
+
+    insert = insert_com_conflito()
+    if insert is not None:
+        stmt = insert(tabela).values(total=1, erros=erro, **chave)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(chave.keys()),
+            set_={
+                'total': tabela.c.total + 1,
+                'erros': tabela.c.erros + erro,
+            }
+        )
+        db.session.execute(stmt)
+        return
+
+    # Fallback portável: UPDATE e, se não havia linha, INSERT
+    resultado = db.session.execute(
+        tabela.update()
+        .where(*[tabela.c[coluna] == valor for coluna, valor in chave.items()])
+        .values(total=tabela.c.total + 1, erros=tabela.c.erros + erro)
+    )
+    if resultado.rowcount == 0:
+        db.session.execute(tabela.insert().values(
+            total=1, erros=erro, **chave))
+
+
+def reconstruir_resumo_diario(data_inicio=None):
+    """
+    Recalcula o rollup a partir do audit_log bruto (carga inicial ou
+    correção). Os dias a partir de data_inicio são apagados e regravados
+    com um único INSERT ... SELECT ... GROUP BY. Os dias já arquivados
+    (fora do audit_log) são mantidos.
+
+    Args:
+        data_inicio (date, optional): Primeiro dia recalculado (padrão: o
+            primeiro dia ainda no audit_log)
+
+    Returns:
+        int: Quantidade de linhas do rollup gravadas
+    """
+    tabela = AuditResumoDiario.__table__
+    dia = db.func.date(AuditLog.timestamp)
+
+    if data_inicio is None:
+        primeiro = db.session.query(db.func.min(AuditLog.timestamp)).scalar()
+        if primeiro is None:
+            return 0
+        data_inicio = primeiro.date()
+
+    delete = tabela.delete()
+    if data_inicio:
+        delete = delete.where(tabela.c.dia >= data_inicio)
+    db.session.execute(delete)
+
+    consulta = db.session.query(
+        dia,
+        AuditLog.action,
+        db.func.coalesce(AuditLog.user_name, ''),
+        db.func.coalesce(AuditLog.severity, AuditSeverity.INFO),
+        db.func.count(AuditLog.id),
+        db.func.sum(case((AuditLog.status.in_(STATUS_ERRO), 1), else_=0)),
+    )
+    if data_inicio:
+        consulta = consulta.filter(AuditLog.timestamp >= data_inicio)
+    consulta = consulta.group_by(
+        dia,
+        AuditLog.action,
+        db.func.coalesce(AuditLog.user_name, ''),
+        db.func.coalesce(AuditLog.severity, AuditSeverity.INFO),
+    )
+
+    resultado = db.session.execute(tabela.insert().from_select(
+        ['dia', 'action', 'user_name', 'severity', 'total', 'erros'],
+        consulta.statement
+    ))
+    db.session.commit()
+    return resultado.rowcount
+
+
 # ===========================================================================================
 # DECORATORS PARA AUDITORIA AUTOMÁTICA
 # ===========================================================================================
@@ -521,6 +629,76 @@ def get_failed_operations(limit=50):
     ).order_by(AuditLog.timestamp.desc()).limit(limit).all()
 
 
+def get_contadores_resumo():
+    """
+    Contadores dos cards de logs_gerais (total, hoje e erros) lidos do
+    rollup diário.
+
+    Returns:
+        dict: total_logs, logs_hoje, logs_erro
+    """
+    hoje = datetime.utcnow().date()
+    total, hoje_total, erros = db.session.query(
+        db.func.coalesce(db.func.sum(AuditResumoDiario.total), 0),
+        db.func.coalesce(db.func.sum(case(
+            (AuditResumoDiario.dia == hoje, AuditResumoDiario.total),
+            else_=0
+        )), 0),
+        db.func.coalesce(db.func.sum(AuditResumoDiario.erros), 0),
+    ).one()
+
+    return {
+        'total_logs': int(total),
+        'logs_hoje': int(hoje_total),
+        'logs_erro': int(erros),
+    }
+
+
+def get_estatisticas_periodo(data_inicio, limite=10):
+    """
+    Estatísticas de auditoria a partir de uma data, lidas do rollup diário.
+
+    Args:
+        data_inicio (date): Primeiro dia considerado
+        limite (int): Tamanho dos rankings de ações e usuários
+
+    Returns:
+        dict: total_logs, total_erros, logs_por_dia, acoes_comuns,
+              usuarios_ativos
+    """
+    periodo = AuditResumoDiario.dia >= data_inicio
+    total_col = db.func.sum(AuditResumoDiario.total).label('total')
+
+    total_logs, total_erros = db.session.query(
+        db.func.coalesce(db.func.sum(AuditResumoDiario.total), 0),
+        db.func.coalesce(db.func.sum(AuditResumoDiario.erros), 0),
+    ).filter(periodo).one()
+
+    logs_por_dia = db.session.query(
+        AuditResumoDiario.dia, total_col
+    ).filter(periodo).group_by(AuditResumoDiario.dia)\
+        .order_by(AuditResumoDiario.dia).all()
+
+    acoes_comuns = db.session.query(
+        AuditResumoDiario.action, total_col
+    ).filter(periodo).group_by(AuditResumoDiario.action)\
+        .order_by(desc('total')).limit(limite).all()
+
+    usuarios_ativos = db.session.query(
+        AuditResumoDiario.user_name, total_col
+    ).filter(periodo, AuditResumoDiario.user_name != '')\
+        .group_by(AuditResumoDiario.user_name)\
+        .order_by(desc('total')).limit(limite).all()
+
+    return {
+        'total_logs': int(total_logs),
+        'total_erros': int(total_erros),
+        'logs_por_dia': logs_por_dia,
+        'acoes_comuns': acoes_comuns,
+        'usuarios_ativos': usuarios_ativos,
+    }
+
+
 # ===========================================================================================
 # FIM DO MÓDULO DE AUDITORIA
 # ===========================================================================================
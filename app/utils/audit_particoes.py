@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+"""
+Particionamento Mensal e Retenção da Auditoria - Sistema Go Mobi
+================================================================
+
+As tabelas audit_log e viagem_auditoria crescem sem limite. Este módulo
+organiza os registros em partições mensais (pelo campo timestamp) e
+aplica uma política de retenção que move os meses antigos para arquivos
+compactados.
+
+- PostgreSQL: as tabelas são particionadas nativamente por RANGE(timestamp)
+  (ver migrations/versions/apply_migration_audit_particoes.py). As partições
+  futuras são criadas por garantir_particoes() e as antigas são
+  desanexadas e removidas após o arquivamento.
+- SQLite: cada mês é uma "partição lógica" delimitada pelo índice de
+  timestamp. O arquivamento exporta o intervalo e o remove com DELETE.
+
+Também oferece os contadores em cache dos cards de logs_viagens, as listas
+de filtros e o filtro de período usado pelas rotas de auditoria (permite o
+partition pruning). Os cards de logs_gerais vêm do rollup diário
+(AuditResumoDiario), que não é arquivado: as estatísticas continuam
+cobrindo os meses já removidos do audit_log.
+
+Autor: Sistema DOUG Moving
+"""
+
+from datetime import datetime, timedelta
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from flask import current_app
+from sqlalchemy import text
+
+from .. import db, cache
+from ..models import (
+    AuditLog, ViagemAuditoria, AuditArquivo, Motorista
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Tabelas de auditoria sujeitas a particionamento/retenção
+TABELAS_AUDITORIA = {
+    'audit_log': AuditLog,
+    'viagem_auditoria': ViagemAuditoria,
+}
+
+# Chaves e tempo de vida do cache dos cards de resumo
+CACHE_FILTROS_AUDIT = 'audit:filtros'
+CACHE_CONTADORES_VIAGENS = 'audit:contadores_viagens'
+CACHE_TIMEOUT_CONTADORES = 60
+CACHE_TIMEOUT_FILTROS = 600
+
+
+# =============================================================================
+# HELPERS DE PERÍODO
+# =============================================================================
+
+def inicio_mes(dt):
+    """Retorna o primeiro instante do mês de dt."""
+    return datetime(dt.year, dt.month, 1)
+
+
+def somar_meses(dt, meses):
+    """Retorna o início do mês deslocado em `meses` (positivo ou negativo)."""
+    total = dt.year * 12 + (dt.month - 1) + meses
+    return datetime(total // 12, total % 12 + 1, 1)
+
+
+def nome_particao(tabela, inicio):
+    """Nome físico da partição mensal. Ex: audit_log_p2025_01."""
+    return f'{tabela}_p{inicio.year:04d}_{inicio.month:02d}'
+
+
+def is_postgres():
+    """Indica se o banco em uso é PostgreSQL."""
+    return db.engine.dialect.name == 'postgresql'
+
+
+def tabela_particionada(tabela):
+    """Verifica se a tabela é particionada nativamente (PostgreSQL)."""
+    if not is_postgres():
+        return False
+    resultado = db.session.execute(text("""
+        SELECT 1 FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = :tabela
+    """), {'tabela': tabela}).first()
+    return resultado is not None
+
+
+def parse_periodo(data_inicio, data_fim):
+    """
+    Converte as datas do filtro (YYYY-MM-DD) em um intervalo semiaberto
+    [inicio, fim). Datas inválidas são ignoradas (retornam None).
+    """
+    inicio = fim = None
+    if data_inicio:
+        try:
+            inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
+        except ValueError:
+            pass
+    if data_fim:
+        try:
+            fim = datetime.strptime(data_fim, '%Y-%m-%d') + timedelta(days=1)
+        except ValueError:
+            pass
+    return inicio, fim
+
+
+def filtrar_periodo(query, coluna, data_inicio, data_fim):
+    """
+    Aplica o filtro de datas sobre a coluna de timestamp.
+
+    Usa comparações diretas (>= inicio AND < fim) sobre a chave de
+    particionamento para que o PostgreSQL descarte as partições fora do
+    intervalo e o SQLite use o índice de timestamp.
+    """
+    inicio, fim = parse_periodo(data_inicio, data_fim)
+    if inicio:
+        query = query.filter(coluna >= inicio)
+    if fim:
+        query = query.filter(coluna < fim)
+    return query
+
+
+# =============================================================================
+# MANUTENÇÃO DE PARTIÇÕES (POSTGRESQL)
+# =============================================================================
+
+def criar_particao(tabela, inicio):
+    """Cria (se não existir) a partição mensal iniciada em `inicio`."""
+    fim = somar_meses(inicio, 1)
+    db.session.execute(text(
+        f'CREATE TABLE IF NOT EXISTS {nome_particao(tabela, inicio)} '
+        f'PARTITION OF {tabela} '
+        f"FOR VALUES FROM ('{inicio:%Y-%m-%d}') TO ('{fim:%Y-%m-%d}')"
+    ))
+
+
+def garantir_particoes(meses_a_frente=2):
+    """
+    Garante as partições do mês atual e dos próximos meses.
+
+    No SQLite (ou em tabelas não particionadas) não faz nada: o intervalo
+    de timestamp já funciona como partição lógica.
+
+    Returns:
+        list: Nomes das partições verificadas/criadas
+    """
+    criadas = []
+    atual = inicio_mes(datetime.utcnow())
+    for tabela in TABELAS_AUDITORIA:
+        if not tabela_particionada(tabela):
+            continue
+        for i in range(meses_a_frente + 1):
+            inicio = somar_meses(atual, i)
+            criar_particao(tabela, inicio)
+            criadas.append(nome_particao(tabela, inicio))
+    db.session.commit()
+    return criadas
+
+
+def _particao_existe(nome):
+    resultado = db.session.execute(
+        text('SELECT 1 FROM pg_class WHERE relname = :nome'), {'nome': nome}
+    ).first()
+    return resultado is not None
+
+
+# =============================================================================
+# RETENÇÃO E ARQUIVAMENTO
+# =============================================================================
+
+def listar_periodos(model, antes_de):
+    """
+    Lista os meses (início de cada mês) com registros anteriores a `antes_de`.
+    """
+    mais_antigo = db.session.query(db.func.min(model.timestamp)).filter(
+        model.timestamp < antes_de
+    ).scalar()
+    if not mais_antigo:
+        return []
+
+    periodos = []
+    inicio = inicio_mes(mais_antigo)
+    while inicio < antes_de:
+        periodos.append(inicio)
+        inicio = somar_meses(inicio, 1)
+    return periodos
+
+
+def arquivar_periodo(tabela, inicio, pasta):
+    """
+    Exporta um mês de uma tabela de auditoria para um arquivo .jsonl.gz e
+    remove os registros do banco.
+
+    No PostgreSQL particionado a partição é desanexada e removida (operação
+    instantânea); caso contrário os registros são apagados por intervalo.
+
+    Os registros são gravados primeiro em um arquivo temporário, que só vira
+    o arquivo do mês depois do commit da remoção: se algo falhar antes, os
+    registros continuam no banco e o arquivo do mês fica como estava (uma
+    nova execução não duplica linhas).
+
+    Returns:
+        AuditArquivo: Registro do arquivamento (ou None se o mês estava vazio)
+    """
+    periodo = f'{inicio:%Y-%m}'
+
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f'{tabela}_{inicio:%Y_%m}.jsonl.gz')
+    descritor, temporario = tempfile.mkstemp(
+        dir=pasta, prefix=f'{tabela}_{inicio:%Y_%m}.', suffix='.parcial')
+    os.close(descritor)
+    try:
+        registro, total = _exportar_e_remover(tabela, inicio, temporario, caminho)
+    except BaseException:
+        os.remove(temporario)
+        raise
+
+    if total == 0:
+        os.remove(temporario)
+        return None
+
+    _publicar_arquivo(temporario, caminho)
+    logger.info(f"Auditoria arquivada: {tabela} {periodo} "
+                f"({total} registros) -> {caminho}")
+    return registro
+
+
+def _publicar_arquivo(temporario, caminho):
+    """
+    Move o arquivo temporário para o arquivo do mês. Se o mês já tinha
+    arquivo (reexecução com registros tardios), o temporário é acrescentado
+    a ele como um novo membro gzip completo.
+    """
+    if os.path.exists(caminho):
+        with open(temporario, 'rb') as origem, open(caminho, 'ab') as destino:
+            shutil.copyfileobj(origem, destino)
+        os.remove(temporario)
+    else:
+        os.replace(temporario, caminho)
+
+
+def _exportar_e_remover(tabela, inicio, temporario, caminho):
+    """Grava o mês em `temporario`, remove do banco e faz o commit."""
+    model = TABELAS_AUDITORIA[tabela]
+    fim = somar_meses(inicio, 1)
+    periodo = f'{inicio:%Y-%m}'
+
+    # Leitura em streaming pela tabela (sem carregar objetos ORM na sessão)
+    tabela_sql = model.__table__
+    consulta = tabela_sql.select().where(
+        tabela_sql.c.timestamp >= inicio,
+        tabela_sql.c.timestamp < fim
+    ).order_by(tabela_sql.c.timestamp, tabela_sql.c.id)
+
+    total = 0
+    resultado = db.session.execute(
+        consulta.execution_options(stream_results=True, yield_per=1000))
+    with gzip.open(temporario, 'wt', encoding='utf-8') as arquivo:
+        for linha in resultado:
+            arquivo.write(json.dumps(dict(linha._mapping),
+                          ensure_ascii=False, default=str))
+            arquivo.write('\n')
+            total += 1
+
+    particao = nome_particao(tabela, inicio)
+    if tabela_particionada(tabela) and _particao_existe(particao):
+        db.session.execute(
+            text(f'ALTER TABLE {tabela} DETACH PARTITION {particao}'))
+        db.session.execute(text(f'DROP TABLE {particao}'))
+
+    # Remove o restante do intervalo (SQLite ou registros que caíram na
+    # partição DEFAULT do PostgreSQL)
+    model.query.filter(
+        model.timestamp >= inicio,
+        model.timestamp < fim
+    ).delete(synchronize_session=False)
+
+    if total == 0:
+        db.session.commit()
+        return None, 0
+
+    registro = AuditArquivo.query.filter_by(
+        tabela=tabela, periodo=periodo).first()
+    if registro:
+        # Reexecução sobre um mês já arquivado (registros tardios)
+        registro.total_registros += total
+        registro.arquivado_em = datetime.utcnow()
+    else:
+        registro = AuditArquivo(
+            tabela=tabela,
+            periodo=periodo,
+            data_inicio=inicio,
+            data_fim=fim,
+            arquivo=caminho,
+            total_registros=total
+        )
+        db.session.add(registro)
+
+    db.session.commit()
+    return registro, total
+
+
+def aplicar_retencao(meses_retencao=None, pasta=None):
+    """
+    Aplica a política de retenção: arquiva e remove do banco todos os meses
+    anteriores à janela de retenção, em ambas as tabelas de auditoria.
+
+    Args:
+        meses_retencao (int, optional): Meses mantidos no banco, incluindo o
+            atual (padrão: AUDIT_RETENCAO_MESES)
+        pasta (str, optional): Diretório dos arquivos (padrão: AUDIT_ARQUIVO_DIR)
+
+    Returns:
+        list: Registros AuditArquivo gerados
+    """
+    if meses_retencao is None:
+        meses_retencao = current_app.config['AUDIT_RETENCAO_MESES']
+    if pasta is None:
+        pasta = current_app.config['AUDIT_ARQUIVO_DIR']
+
+    limite = somar_meses(inicio_mes(datetime.utcnow()), -(meses_retencao - 1))
+
+    arquivados = []
+    for tabela, model in TABELAS_AUDITORIA.items():
+        for inicio in listar_periodos(model, limite):
+            try:
+                registro = arquivar_periodo(tabela, inicio, pasta)
+                if registro:
+                    arquivados.append(registro)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(
+                    f"Erro ao arquivar {tabela} {inicio:%Y-%m}: {e}")
+                raise
+
+    invalidar_cache_auditoria()
+    return arquivados
+
+
+# =============================================================================
+# CONTADORES EM CACHE
+# =============================================================================
+
+def get_contadores_viagens():
+    """Contadores dos cards de resumo de logs_viagens (em cache)."""
+    contadores = cache.get(CACHE_CONTADORES_VIAGENS)
+    if contadores is None:
+        hoje = datetime.utcnow().replace(hour=0, minute=0, second=0,
+                                         microsecond=0)
+        contadores = {
+            'total_logs': ViagemAuditoria.query.count(),
+            'viagens_aceitas_hoje': ViagemAuditoria.query.filter(
+                ViagemAuditoria.action == 'VIAGEM_ACEITA',
+                ViagemAuditoria.timestamp >= hoje
+            ).count(),
+            'cancelamentos_hoje': ViagemAuditoria.query.filter(
+                ViagemAuditoria.action.in_(
+                    ['VIAGEM_CANCELADA', 'MOTORISTA_DESASSOCIADO']),
+                ViagemAuditoria.timestamp >= hoje
+            ).count(),
+        }
+        cache.set(CACHE_CONTADORES_VIAGENS, contadores,
+                  timeout=CACHE_TIMEOUT_CONTADORES)
+    return contadores
+
+
+def get_filtros_auditoria():
+    """
+    Listas para os filtros das telas de auditoria, em cache por
+    CACHE_TIMEOUT_FILTROS segundos: ações e tipos de recurso (logs_gerais),
+    ações de viagem e motoristas (logs_viagens).
+    """
+    filtros = cache.get(CACHE_FILTROS_AUDIT)
+    if filtros is None:
+        acoes = db.session.query(AuditLog.action).distinct().all()
+        recursos = db.session.query(AuditLog.resource_type).distinct().all()
+        acoes_viagem = db.session.query(ViagemAuditoria.action).distinct().all()
+        motoristas = db.session.query(Motorista.id, Motorista.nome).order_by(
+            Motorista.nome).all()
+        filtros = {
+            'acoes': sorted(a[0] for a in acoes if a[0]),
+            'recursos': sorted(r[0] for r in recursos if r[0]),
+            'acoes_viagem': sorted(a[0] for a in acoes_viagem if a[0]),
+            'motoristas': [{'id': id_, 'nome': nome} for id_, nome in motoristas],
+        }
+        cache.set(CACHE_FILTROS_AUDIT, filtros, timeout=CACHE_TIMEOUT_FILTROS)
+    return filtros
+
+
+def invalidar_cache_auditoria():
+    """Remove do cache os contadores e filtros de auditoria."""
+    cache.delete_many(CACHE_FILTROS_AUDIT, CACHE_CONTADORES_VIAGENS)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Busca de Bloco por Bairro - Sistema Go Mobi
+===========================================
+
+Resolve o bloco de um bairro digitado pelo usuário usando a coluna
+indexada `bairro.nome_normalizado`, com um cache em memória por processo.
+
+O cache é invalidado automaticamente quando um Bairro ou Bloco é inserido,
+alterado ou excluído pelo ORM. Atualizações em massa (Query.update) não
+disparam eventos de mapper e devem chamar invalidar_cache_bairros().
+O TTL limita a defasagem entre processos (workers) diferentes.
+
+Autor: Sistema DOUG Moving
+"""
+
+import threading
+import time
+
+from sqlalchemy import event
+
+from .. import db
+from ..models import Bairro, Bloco
+from .texto import normalizar_texto
+
+CACHE_TTL = 300  # segundos
+CACHE_MAX_ITENS = 5000
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def invalidar_cache_bairros(*args):
+    """Limpa o cache de bairro -> bloco (aceita os argumentos dos eventos)."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def buscar_bloco_por_nome(nome_bairro):
+    """
+    Retorna (bloco_id, bloco_codigo) do bairro com o nome informado,
+    ignorando acentos, maiúsculas e pontuação.
+
+    Returns:
+        tuple | None: None se o bairro não existir ou não tiver bloco
+    """
+    chave = normalizar_texto(nome_bairro)
+    if not chave:
+        return None
+
+    agora = time.monotonic()
+    item = _cache.get(chave)
+    if item is not None and item[0] > agora:
+        return item[1]
+
+    # Busca pelo índice de nome_normalizado (um único seek)
+    linha = db.session.query(Bloco.id, Bloco.codigo_bloco).join(
+        Bairro, Bairro.bloco_id == Bloco.id
+    ).filter(
+        Bairro.nome_normalizado == chave
+    ).order_by(Bairro.id).first()
+    resultado = (linha.id, linha.codigo_bloco) if linha else None
+
+    with _cache_lock:
+        if len(_cache) >= CACHE_MAX_ITENS:
+            _cache.clear()
+        _cache[chave] = (agora + CACHE_TTL, resultado)
+    return resultado
+
+
+for _modelo in (Bairro, Bloco):
+    for _evento in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_modelo, _evento, invalidar_cache_bairros)
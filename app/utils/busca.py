@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Busca Textual - Sistema Go Mobi
+===============================
+
+Busca por trecho de texto sem diferenciar maiúsculas e acentos
+('jose' encontra 'José'), usada pelos filtros das listagens e pelo
+autocomplete de colaboradores.
+
+Funcionamento:
+- Os filtros comparam lower(f_unaccent(coluna)) LIKE '%termo%'
+- PostgreSQL: f_unaccent é um wrapper IMMUTABLE da extensão unaccent e as
+  colunas de busca têm índices GIN pg_trgm sobre essa mesma expressão
+  (ver migrations/versions/apply_migration_busca_trigramas.py)
+- SQLite: f_unaccent é registrada como função Python em cada conexão; o
+  autocomplete de colaboradores usa um índice de trigramas em memória por
+  planta, invalidado a cada alteração de colaborador
+- O autocomplete classifica os resultados: prefixo da matrícula, prefixo
+  do nome, início de palavra do nome e, por fim, qualquer trecho
+
+Uso:
+    query = query.filter(filtro_busca([Colaborador.nome, Colaborador.matricula], termo))
+    colaboradores = buscar_colaboradores('jose', plantas_ids=[1])
+
+Autor: Sistema DOUG Moving
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+import heapq
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import case, event, func, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import joinedload, selectinload
+
+from .. import db
+from ..models import Colaborador
+from .texto import normalizar_busca, remover_acentos
+
+INDICE_TTL = 300  # segundos
+RESULTADOS_AUTOCOMPLETE = 10
+
+
+# =============================================================================
+# FILTROS SQL
+# =============================================================================
+
+def _unaccent_sqlite(valor):
+    return remover_acentos(valor) if isinstance(valor, str) else valor
+
+
+@event.listens_for(Engine, 'connect')
+def _registrar_funcoes_sqlite(dbapi_connection, connection_record):
+    """Disponibiliza f_unaccent() nas conexões SQLite."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function(
+            'f_unaccent', 1, _unaccent_sqlite, deterministic=True)
+
+
+def _escapar_like(termo):
+    return termo.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def expressao_busca(coluna):
+    """Expressão normalizada da coluna (a mesma dos índices de trigramas)."""
+    return func.lower(func.f_unaccent(coluna))
+
+
+def filtro_texto(coluna, termo):
+    """Filtro 'coluna contém termo', sem diferenciar maiúsculas e acentos."""
+    padrao = f'%{_escapar_like(normalizar_busca(termo))}%'
+    return expressao_busca(coluna).like(padrao, escape='\\')
+
+
+def filtro_busca(colunas, termo):
+    """Filtro 'alguma das colunas contém termo' (OR)."""
+    return or_(*[filtro_texto(coluna, termo) for coluna in colunas])
+
+
+# =============================================================================
+# ÍNDICE DE TRIGRAMAS EM MEMÓRIA (SQLite)
+# =============================================================================
+
+def trigramas(texto):
+    """Conjunto de trigramas (trechos de 3 caracteres) do texto."""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def classificar(termo, nome, matricula):
+    """
+    Posição do resultado no ranking (menor = melhor):
+    0 prefixo da matrícula, 1 prefixo do nome, 2 início de palavra do nome,
+    3 qualquer trecho.
+    """
+    if matricula.startswith(termo):
+        return 0
+    if nome.startswith(termo):
+        return 1
+    if f' {termo}' in nome:
+        return 2
+    return 3
+
+
+class IndiceTrigramas:
+    """
+    Índice de trigramas dos colaboradores ativos (nome e matrícula).
+
+    Os registros ficam ordenados por nome e as listas de trigramas guardam
+    posições nessa ordem, o que permite percorrer os candidatos já na ordem
+    do resultado e parar assim que o limite é atingido. Os prefixos de
+    matrícula e de nome são resolvidos por busca binária.
+    """
+
+    def __init__(self, registros):
+        """
+        Args:
+            registros: Iterável de (id, nome, matricula)
+        """
+        linhas = sorted(
+            (normalizar_busca(nome), normalizar_busca(matricula), colaborador_id)
+            for colaborador_id, nome, matricula in registros
+        )
+        self.nomes = [linha[0] for linha in linhas]
+        self.matriculas = [linha[1] for linha in linhas]
+        self.ids = [linha[2] for linha in linhas]
+        self.por_matricula = sorted(
+            (matricula, posicao) for posicao, matricula in enumerate(self.matriculas))
+
+        indice = defaultdict(list)
+        for posicao, (nome, matricula, _) in enumerate(linhas):
+            # O separador impede trigramas que cruzem nome e matrícula
+            for trigrama in trigramas(f'{nome}\n{matricula}'):
+                indice[trigrama].append(posicao)
+        self.indice = dict(indice)
+
+    def _candidatos(self, termo):
+        """Posições (em ordem de nome) que podem conter o termo."""
+        chaves = trigramas(termo)
+        if not chaves:
+            # Termos com menos de 3 caracteres não têm trigramas
+            return range(len(self.ids))
+        # A menor lista basta: o termo é conferido em cada candidato
+        return min((self.indice.get(t, ()) for t in chaves), key=len)
+
+    def buscar(self, termo, limite):
+        """
+        Retorna até `limite` tuplas (rank, chave de ordenação, id) dos
+        colaboradores cujo nome ou matrícula contém o termo já normalizado.
+        """
+        # 0: prefixo da matrícula
+        resultado = []
+        inicio = bisect_left(self.por_matricula, (termo,))
+        for matricula, posicao in self.por_matricula[inicio:inicio + limite]:
+            if not matricula.startswith(termo):
+                break
+            resultado.append((0, matricula, self.ids[posicao]))
+        vistos = {colaborador_id for _, _, colaborador_id in resultado}
+
+        # 1: prefixo do nome
+        inicio = bisect_left(self.nomes, termo)
+        for posicao in range(inicio, len(self.nomes)):
+            nome = self.nomes[posicao]
+            if not nome.startswith(termo) or len(resultado) >= limite:
+                break
+            if self.ids[posicao] not in vistos:
+                resultado.append((1, nome, self.ids[posicao]))
+
+        # 2 e 3: início de palavra e qualquer trecho, percorridos em ordem de
+        # nome; para quando já há palavras suficientes para completar o limite
+        faltam = limite - len(resultado)
+        palavras, trechos = [], []
+        if faltam > 0:
+            for posicao in self._candidatos(termo):
+                nome = self.nomes[posicao]
+                matricula = self.matriculas[posicao]
+                if termo not in nome and termo not in matricula:
+                    continue
+                rank = classificar(termo, nome, matricula)
+                if rank == 2:
+                    palavras.append((2, nome, self.ids[posicao]))
+                    if len(palavras) >= faltam:
+                        break
+                elif rank == 3 and len(trechos) < faltam:
+                    trechos.append((3, nome, self.ids[posicao]))
+
+        return (resultado + palavras + trechos)[:limite]
+
+
+_indices = {}
+_indices_lock = threading.Lock()
+
+
+def invalidar_indice_colaboradores(*args):
+    """Descarta os índices em memória (aceita os argumentos dos eventos)."""
+    with _indices_lock:
+        _indices.clear()
+
+
+def _obter_indice(planta_id):
+    """Índice da planta (None = todas), construído sob demanda."""
+    agora = time.monotonic()
+    item = _indices.get(planta_id)
+    if item is not None and item[0] > agora:
+        return item[1]
+
+    query = db.session.query(
+        Colaborador.id, Colaborador.nome, Colaborador.matricula
+    ).filter(Colaborador.status == Colaborador.STATUS_ATIVO)
+    if planta_id is not None:
+        query = query.filter(Colaborador.planta_id == planta_id)
+    indice = IndiceTrigramas(query.all())
+
+    with _indices_lock:
+        _indices[planta_id] = (agora + INDICE_TTL, indice)
+    return indice
+
+
+for _evento in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Colaborador, _evento, invalidar_indice_colaboradores)
+
+
+# =============================================================================
+# AUTOCOMPLETE DE COLABORADORES
+# =============================================================================
+
+def _ids_por_trigramas(termo, plantas_ids, limite):
+    chaves = plantas_ids or [None]
+    encontrados = []
+    for planta_id in chaves:
+        encontrados.extend(_obter_indice(planta_id).buscar(termo, limite))
+    return [colaborador_id for _, _, colaborador_id
+            in heapq.nsmallest(limite, encontrados)]
+
+
+def _ids_por_sql(termo, plantas_ids, limite):
+    nome = expressao_busca(Colaborador.nome)
+    matricula = expressao_busca(Colaborador.matricula)
+    escapado = _escapar_like(termo)
+    contem = f'%{escapado}%'
+    prefixo = f'{escapado}%'
+
+    prefixo_matricula = matricula.like(prefixo, escape='\\')
+    ranking = case(
+        (prefixo_matricula, 0),
+        (nome.like(prefixo, escape='\\'), 1),
+        (nome.like(f'% {prefixo}', escape='\\'), 2),
+        else_=3
+    )
+    desempate = case((prefixo_matricula, matricula), else_=nome)
+    query = db.session.query(Colaborador.id).filter(
+        Colaborador.status == Colaborador.STATUS_ATIVO,
+        or_(nome.like(contem, escape='\\'),
+            matricula.like(contem, escape='\\'))
+    )
+    if plantas_ids:
+        query = query.filter(Colaborador.planta_id.in_(plantas_ids))
+    query = query.order_by(ranking, desempate).limit(limite)
+    return [linha.id for linha in query]
+
+
+def buscar_colaboradores(termo, plantas_ids=None, limite=RESULTADOS_AUTOCOMPLETE):
+    """
+    Busca colaboradores ativos por trecho do nome ou da matrícula,
+    sem diferenciar maiúsculas e acentos, já ordenados pelo ranking.
+
+    Args:
+        termo (str): Texto digitado
+        plantas_ids (list): Restringe às plantas (None/vazio = todas)
+        limite (int): Quantidade máxima de resultados
+
+    Returns:
+        list[Colaborador]: Com bloco e turnos já carregados
+    """
+    termo = normalizar_busca(termo)
+    if not termo:
+        return []
+
+    if db.engine.dialect.name == 'postgresql':
+        ids = _ids_por_sql(termo, plantas_ids, limite)
+    else:
+        ids = _ids_por_trigramas(termo, plantas_ids, limite)
+    if not ids:
+        return []
+
+    colaboradores = Colaborador.query.options(
+        joinedload(Colaborador.bloco),
+        selectinload(Colaborador.turnos)
+    ).filter(Colaborador.id.in_(ids)).all()
+    posicao = {colaborador_id: i for i, colaborador_id in enumerate(ids)}
+    return sorted(colaboradores, key=lambda c: posicao[c.id])
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""
+Eventos de Viagens Disponíveis - Sistema Go Mobi
+================================================
+
+Publica as mudanças na lista de viagens disponíveis (status 'Pendente' e
+sem motorista) para os motoristas conectados em /motorista/stream (SSE),
+no lugar de cada motorista recarregar o dashboard.
+
+Eventos:
+- viagem_criada     viagem nova disponível (dados para montar o card)
+- viagem_liberada   motorista desistiu, a viagem voltou a ficar disponível
+- viagem_aceita     saiu da lista (aceita por um motorista)
+- viagem_cancelada  saiu da lista (cancelada ou excluída)
+
+Funcionamento:
+- Os listeners do Viagem (after_insert/after_update/after_delete) anotam o
+  evento na sessão; o aceite, que é um UPDATE direto, chama registrar()
+- Os eventos só são publicados depois do commit (after_commit) e são
+  descartados no rollback
+- Os dados das viagens criadas/liberadas são lidos em uma única consulta
+  por commit, e não por motorista conectado
+- Em SQLite os eventos são distribuídos em memória, no próprio processo.
+  Em PostgreSQL são enviados por NOTIFY e cada processo (worker do
+  gunicorn) recebe por LISTEN, em uma thread própria
+- Cada conexão tem uma fila limitada; quem não consome a tempo recebe um
+  'snapshot' (lista completa) em vez dos eventos perdidos
+- Os últimos eventos ficam guardados para a reconexão (Last-Event-ID)
+
+Uso:
+    assinante, pendentes = assinar(ultimo_id)
+    ...
+    cancelar_assinatura(assinante)
+
+Autor: Sistema DOUG Moving
+"""
+
+from collections import deque, namedtuple
+import json
+import logging
+import queue
+import select as selectmodule
+import threading
+import time
+import uuid
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from .. import db
+from ..models import Viagem
+from .sincronizacao import (
+    LIMITE_DISPONIVEIS, consulta_viagens, dados_viagem, filtro_visao
+)
+
+logger = logging.getLogger(__name__)
+
+CANAL_NOTIFY = 'viagens_disponiveis'
+TAMANHO_FILA = 200         # eventos por conexão antes do snapshot
+TAMANHO_HISTORICO = 500    # eventos guardados para reconexão
+LIMITE_SNAPSHOT = LIMITE_DISPONIVEIS
+
+EVENTOS_ENTRADA = ('viagem_criada', 'viagem_liberada')
+EVENTOS_SAIDA = ('viagem_aceita', 'viagem_cancelada')
+
+Evento = namedtuple('Evento', 'id numero tipo dados')
+
+_PROCESSO = uuid.uuid4().hex[:8]
+_lock = threading.Lock()
+_assinantes = set()
+_historico = deque(maxlen=TAMANHO_HISTORICO)
+_estado = {'sequencia': 0, 'ouvinte': None}
+
+
+class Assinante:
+    """Conexão SSE: fila de eventos (None = precisa de snapshot)."""
+
+    def __init__(self):
+        self.fila = queue.Queue(maxsize=TAMANHO_FILA)
+
+    def entregar(self, evento):
+        try:
+            self.fila.put_nowait(evento)
+        except queue.Full:
+            # Cliente lento: descarta a fila e pede um snapshot
+            while True:
+                try:
+                    self.fila.get_nowait()
+                except queue.Empty:
+                    break
+            self.fila.put_nowait(None)
+
+
+# =============================================================================
+# DISTRIBUIÇÃO (NO PROCESSO)
+# =============================================================================
+
+def ultimo_id():
+    """Id do último evento deste processo (usado como ?desde= pelo dashboard)."""
+    with _lock:
+        return f"{_PROCESSO}-{_estado['sequencia']}"
+
+
+def _distribuir(tipo, dados):
+    with _lock:
+        _estado['sequencia'] += 1
+        numero = _estado['sequencia']
+        evento = Evento(f'{_PROCESSO}-{numero}', numero, tipo, dados)
+        _historico.append(evento)
+        for assinante in _assinantes:
+            assinante.entregar(evento)
+
+
+def assinar(desde=None, engine=None):
+    """
+    Registra uma conexão.
+
+    Args:
+        desde (str): Last-Event-ID (ou ?desde=) informado pelo cliente
+        engine: Engine do banco (inicia o LISTEN em PostgreSQL)
+
+    Returns:
+        tuple: (Assinante, lista de eventos perdidos desde `desde`, ou None
+        quando não é possível saber o que foi perdido e o cliente precisa
+        de um snapshot)
+    """
+    if engine is not None and engine.dialect.name == 'postgresql':
+        _iniciar_ouvinte(engine)
+
+    assinante = Assinante()
+    with _lock:
+        _assinantes.add(assinante)
+        pendentes = None
+        processo, _, numero = (desde or '').partition('-')
+        if processo == _PROCESSO and numero.isdigit():
+            numero = int(numero)
+            antigos = [e for e in _historico if e.numero > numero]
+            # Só é confiável se nada se perdeu entre `desde` e o histórico
+            if numero == _estado['sequencia'] or (
+                    antigos and antigos[0].numero == numero + 1):
+                pendentes = antigos
+    return assinante, pendentes
+
+
+def cancelar_assinatura(assinante):
+    with _lock:
+        _assinantes.discard(assinante)
+
+
+def total_assinantes():
+    with _lock:
+        return len(_assinantes)
+
+
+# =============================================================================
+# DADOS DAS VIAGENS
+# =============================================================================
+
+def carregar_disponiveis(engine, ids=None):
+    """
+    Dados das viagens disponíveis, em uma consulta.
+
+    Args:
+        engine: Engine do banco (usa conexão própria, fora da sessão)
+        ids (list): Viagens desejadas; None = as LIMITE_SNAPSHOT mais recentes
+
+    Returns:
+        list: Dicionários no formato de sincronizacao.dados_viagem
+    """
+    consulta = consulta_viagens().where(filtro_visao('disponiveis', None))
+    if ids is None:
+        consulta = consulta.order_by(Viagem.data_criacao.desc()).limit(LIMITE_SNAPSHOT)
+    else:
+        consulta = consulta.where(Viagem.id.in_(ids))
+    with engine.connect() as conexao:
+        return [dados_viagem(linha) for linha in conexao.execute(consulta)]
+
+
+# =============================================================================
+# REGISTRO NA SESSÃO E PUBLICAÇÃO APÓS O COMMIT
+# =============================================================================
+
+def registrar(tipo, viagem_id, session=None):
+    """Anota um evento para ser publicado no commit da sessão."""
+    session = session or db.session()
+    session.info.setdefault('eventos_viagem', []).append((tipo, viagem_id))
+
+
+def _disponivel(status, motorista_id):
+    return status == 'Pendente' and motorista_id is None
+
+
+def _valor_anterior(estado, atributo):
+    historico = estado.attrs[atributo].history
+    if historico.deleted:
+        return historico.deleted[0]
+    return getattr(estado.object, atributo)
+
+
+def _viagem_inserida(mapper, connection, target):
+    if _disponivel(target.status, target.motorista_id):
+        registrar('viagem_criada', target.id, inspect(target).session)
+
+
+def _viagem_alterada(mapper, connection, target):
+    estado = inspect(target)
+    antes = _disponivel(_valor_anterior(estado, 'status'),
+                        _valor_anterior(estado, 'motorista_id'))
+    agora = _disponivel(target.status, target.motorista_id)
+    if antes == agora:
+        return
+    if agora:
+        tipo = 'viagem_liberada'
+    elif target.status == 'Cancelada':
+        tipo = 'viagem_cancelada'
+    else:
+        tipo = 'viagem_aceita'
+    registrar(tipo, target.id, estado.session)
+
+
+def _viagem_excluida(mapper, connection, target):
+    estado = inspect(target)
+    if _disponivel(_valor_anterior(estado, 'status'),
+                   _valor_anterior(estado, 'motorista_id')):
+        registrar('viagem_cancelada', target.id, estado.session)
+
+
+def _publicar_apos_commit(session):
+    eventos = session.info.pop('eventos_viagem', None)
+    if not eventos:
+        return
+    try:
+        engine = session.get_bind()
+        entradas = {e[1] for e in eventos if e[0] in EVENTOS_ENTRADA}
+        dados = {}
+        if entradas:
+            dados = {d['id']: d for d in carregar_disponiveis(engine, list(entradas))}
+
+        mensagens = []
+        for tipo, viagem_id in eventos:
+            if tipo in EVENTOS_ENTRADA:
+                if viagem_id in dados:
+                    mensagens.append((tipo, dados[viagem_id]))
+            else:
+                mensagens.append((tipo, {'id': viagem_id}))
+
+        if engine.dialect.name == 'postgresql':
+            _notificar(engine, mensagens)
+        else:
+            for tipo, dados_evento in mensagens:
+                _distribuir(tipo, dados_evento)
+    except Exception as e:
+        # O commit já foi feito: falha na publicação não desfaz a operação
+        logger.error(f'Erro ao publicar eventos de viagem: {e}')
+
+
+def _descartar_eventos(session):
+    session.info.pop('eventos_viagem', None)
+
+
+def _carregar_valor_anterior(target, value, oldvalue, initiator):
+    pass
+
+
+# active_history: o valor anterior é carregado antes da alteração, para
+# saber se a viagem estava disponível
+event.listen(Viagem.status, 'set', _carregar_valor_anterior, active_history=True)
+event.listen(Viagem.motorista_id, 'set', _carregar_valor_anterior, active_history=True)
+event.listen(Viagem, 'after_insert', _viagem_inserida)
+event.listen(Viagem, 'after_update', _viagem_alterada)
+event.listen(Viagem, 'after_delete', _viagem_excluida)
+event.listen(Session, 'after_commit', _publicar_apos_commit)
+event.listen(Session, 'after_rollback', _descartar_eventos)
+
+
+# =============================================================================
+# POSTGRESQL: NOTIFY / LISTEN ENTRE PROCESSOS
+# =============================================================================
+
+def _notificar(engine, mensagens):
+    with engine.begin() as conexao:
+        for tipo, dados in mensagens:
+            conexao.execute(
+                select(db.func.pg_notify(CANAL_NOTIFY, json.dumps(
+                    {'tipo': tipo, 'dados': dados}, ensure_ascii=False))))
+
+
+def _ouvir(engine):
+    """Thread do LISTEN: repassa as notificações para as conexões locais."""
+    while True:
+        conexao = None
+        try:
+            conexao = engine.raw_connection()
+            conexao.detach()  # conexão exclusiva, fora do pool
+            conexao.connection.set_session(autocommit=True)
+            cursor = conexao.cursor()
+            cursor.execute(f'LISTEN {CANAL_NOTIFY}')
+            while True:
+                if selectmodule.select([conexao.connection], [], [], 60) == ([], [], []):
+                    continue
+                conexao.connection.poll()
+                while conexao.connection.notifies:
+                    notificacao = conexao.connection.notifies.pop(0)
+                    mensagem = json.loads(notificacao.payload)
+                    _distribuir(mensagem['tipo'], mensagem['dados'])
+        except Exception as e:
+            logger.error(f'LISTEN {CANAL_NOTIFY} interrompido: {e}')
+            # Eventos perdidos enquanto desconectado: todos recebem snapshot
+            with _lock:
+                for assinante in _assinantes:
+                    assinante.entregar(None)
+                _historico.clear()
+            time.sleep(5)
+        finally:
+            if conexao is not None:
+                try:
+                    conexao.close()
+                except Exception:
+                    pass
+
+
+def _iniciar_ouvinte(engine):
+    with _lock:
+        if _estado['ouvinte'] is not None and _estado['ouvinte'].is_alive():
+            return
+        _estado['ouvinte'] = threading.Thread(
+            target=_ouvir, args=(engine,), name='eventos-viagem-listen', daemon=True)
+        _estado['ouvinte'].start()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Idempotência da API - Sistema Go Mobi
+=====================================
+
+Suporte ao cabeçalho Idempotency-Key: uma nova tentativa da mesma chamada
+(ex: o cliente não recebeu a resposta por queda de rede) devolve a resposta
+original em vez de processar de novo.
+
+Funcionamento:
+- A chave é única por usuário (ApiIdempotencia, uq_api_idempotencia_user_chave)
+- O registro da chave é inserido antes do processamento e gravado no mesmo
+  commit das alterações: ou ficam as duas coisas, ou nenhuma
+- Duas chamadas simultâneas com a mesma chave: a segunda espera o índice
+  único, recebe IntegrityError e devolve a resposta da primeira
+- A mesma chave com outro corpo é recusada (422)
+- Chaves mais antigas que IDEMPOTENCIA_TTL podem ser reutilizadas
+
+Uso:
+    corpo, status, repetida = executar_idempotente(
+        chave, 'solicitacoes_lote', request.get_data(), processar)
+
+Autor: Sistema DOUG Moving
+"""
+
+from datetime import datetime, timedelta
+import hashlib
+import json
+
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+
+from .. import db
+from ..models import ApiIdempotencia
+
+IDEMPOTENCIA_TTL = timedelta(hours=24)
+TAMANHO_MAXIMO_CHAVE = 100
+
+
+class ChaveIdempotenciaInvalida(ValueError):
+    """Chave reutilizada com outro corpo, ou fora do formato aceito."""
+
+
+def _buscar(chave):
+    return ApiIdempotencia.query.filter_by(
+        user_id=current_user.id, chave=chave).first()
+
+
+def _repetir(registro, hash_requisicao):
+    if registro.hash_requisicao != hash_requisicao:
+        raise ChaveIdempotenciaInvalida(
+            'Idempotency-Key já utilizada com outro conteúdo.')
+    return json.loads(registro.resposta), registro.status_code, True
+
+
+def executar_idempotente(chave, rota, corpo, processar):
+    """
+    Executa `processar` uma única vez por chave e faz o commit.
+
+    Args:
+        chave (str): Valor do cabeçalho Idempotency-Key (None = sem idempotência)
+        rota (str): Identificação da operação (gravada junto com a chave)
+        corpo (bytes): Corpo da requisição (conferido nas repetições)
+        processar (callable): Função sem argumentos que faz as alterações
+            SEM commit e retorna (dict da resposta, status HTTP)
+
+    Returns:
+        tuple: (dict da resposta, status HTTP, True se for uma repetição)
+
+    Raises:
+        ChaveIdempotenciaInvalida: chave longa demais ou reutilizada com
+            outro corpo
+    """
+    if not chave:
+        resposta, status = processar()
+        db.session.commit()
+        return resposta, status, False
+
+    if len(chave) > TAMANHO_MAXIMO_CHAVE:
+        raise ChaveIdempotenciaInvalida(
+            f'Idempotency-Key deve ter no máximo {TAMANHO_MAXIMO_CHAVE} caracteres.')
+    hash_requisicao = hashlib.sha256(corpo or b'').hexdigest()
+
+    existente = _buscar(chave)
+    if existente and existente.criado_em < datetime.utcnow() - IDEMPOTENCIA_TTL:
+        db.session.delete(existente)
+        db.session.commit()
+        existente = None
+    if existente:
+        return _repetir(existente, hash_requisicao)
+
+    registro = ApiIdempotencia(user_id=current_user.id, chave=chave, rota=rota,
+                               hash_requisicao=hash_requisicao)
+    db.session.add(registro)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # Outra chamada com a mesma chave terminou primeiro
+        db.session.rollback()
+        return _repetir(_buscar(chave), hash_requisicao)
+
+    try:
+        resposta, status = processar()
+        registro.status_code = status
+        registro.resposta = json.dumps(resposta, ensure_ascii=False, default=str)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return resposta, status, False
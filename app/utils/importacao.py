@@ -0,0 +1,719 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de Importação em Lote - Sistema Go Mobi
+=============================================
+
+Importação de colaboradores, supervisores e motoristas a partir de
+arquivos CSV (separados por ponto e vírgula) ou planilhas Excel (.xlsx).
+
+Funcionamento:
+- O arquivo é lido em streaming (linha a linha, sem carregar tudo na memória);
+  planilhas .xlsx usam o modo read_only do openpyxl
+- Empresas, plantas e blocos são pré-carregados uma única vez em dicionários
+- As linhas são processadas em lotes de TAMANHO_LOTE
+- Duplicidades (matrícula, e-mail, CPF/CNPJ, placa) são detectadas com uma
+  única consulta IN por lote, além de um conjunto das chaves já vistas no
+  próprio arquivo
+- As inserções são feitas em lote (bulk insert)
+- Cada linha rejeitada gera um erro com o número da linha
+- Colaboradores também podem ser sincronizados (upsert por matrícula),
+  atualizando apenas os registros cujo conteúdo mudou
+
+Uso:
+    linhas = ler_linhas_arquivo(file.stream, file.filename)
+    resultado = importar_colaboradores(linhas)
+    resultado.adicionados, resultado.ignorados, resultado.erros
+
+Autor: Sistema DOUG Moving
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from itertools import islice
+import codecs
+import csv
+import hashlib
+import os
+
+import openpyxl
+from werkzeug.security import generate_password_hash
+
+from .. import db
+from ..models import (
+    User, Empresa, Planta, Bloco, Supervisor, Colaborador, Motorista
+)
+from .busca import invalidar_indice_colaboradores
+from .sql_utils import insert_com_conflito
+
+
+# Quantidade de linhas processadas/inseridas por vez
+TAMANHO_LOTE = 2000
+
+STATUS_VALIDOS = ['Ativo', 'Inativo', 'Desligado', 'Ausente']
+
+
+class ResultadoImportacao:
+    """Acumula os contadores e os erros por linha de uma importação."""
+
+    def __init__(self):
+        self.adicionados = 0
+        self.ignorados = 0
+        # Usados apenas no modo de sincronização (upsert)
+        self.atualizados = 0
+        self.inalterados = 0
+        self.erros = []
+
+    def ignorar(self, linha, mensagem):
+        """Registra uma linha rejeitada."""
+        self.ignorados += 1
+        self.erros.append(f"Linha {linha}: {mensagem}")
+
+    def avisar(self, linha, mensagem):
+        """Registra um aviso (a linha é importada mesmo assim)."""
+        self.erros.append(f"Linha {linha}: {mensagem}")
+
+    def __repr__(self):
+        return (f'<ResultadoImportacao adicionados={self.adicionados} '
+                f'atualizados={self.atualizados} inalterados={self.inalterados} '
+                f'ignorados={self.ignorados} erros={len(self.erros)}>')
+
+
+# =============================================================================
+# LEITURA DO ARQUIVO
+# =============================================================================
+
+def ler_linhas_csv(stream, delimitador=';'):
+    """
+    Lê um CSV em streaming, ignorando o cabeçalho e as linhas vazias.
+
+    Args:
+        stream: Arquivo binário (ex: FileStorage.stream)
+        delimitador (str): Separador de campos
+
+    Yields:
+        tuple: (número da linha no arquivo, lista de campos sem espaços)
+    """
+    # utf-8-sig trata o BOM gerado pelo Excel no Windows
+    texto = codecs.getreader('utf-8-sig')(stream)
+    reader = csv.reader(texto, delimiter=delimitador)
+
+    # Pula o cabeçalho
+    next(reader, None)
+
+    # Começa em 2 por causa do cabeçalho
+    for i, row in enumerate(reader, 2):
+        if not any(field.strip() for field in row):
+            continue
+        yield i, [field.strip() for field in row]
+
+
+def _valor_celula(valor):
+    """Converte o valor de uma célula do Excel para o texto usado no CSV."""
+    if valor is None:
+        return ''
+    # Números digitados no Excel (matrícula, telefone) chegam como float
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(valor, date):
+        return valor.strftime('%Y-%m-%d')
+    return str(valor).strip()
+
+
+def ler_linhas_xlsx(stream):
+    """
+    Lê a primeira planilha de um .xlsx em streaming, com as mesmas colunas
+    do CSV, ignorando o cabeçalho e as linhas vazias.
+
+    Usa read_only/values_only do openpyxl: as linhas são lidas do XML sob
+    demanda e a memória permanece constante mesmo com 100 mil linhas.
+
+    Yields:
+        tuple: (número da linha na planilha, lista de campos em texto)
+    """
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        planilha = workbook.worksheets[0]
+        linhas = planilha.iter_rows(values_only=True)
+
+        # Pula o cabeçalho
+        next(linhas, None)
+
+        for i, valores in enumerate(linhas, 2):
+            row = [_valor_celula(valor) for valor in valores]
+            if not any(row):
+                continue
+            # Remove as colunas vazias à direita (dimensão da planilha)
+            while row and not row[-1]:
+                row.pop()
+            yield i, row
+    finally:
+        workbook.close()
+
+
+def ler_linhas_arquivo(stream, nome_arquivo):
+    """Escolhe o leitor pela extensão do arquivo (.xlsx ou CSV)."""
+    if nome_arquivo and nome_arquivo.lower().endswith('.xlsx'):
+        return ler_linhas_xlsx(stream)
+    return ler_linhas_csv(stream)
+
+
+def em_lotes(iteravel, tamanho=TAMANHO_LOTE):
+    """Agrupa um iterável em listas de até `tamanho` itens."""
+    iterador = iter(iteravel)
+    while True:
+        lote = list(islice(iterador, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+# =============================================================================
+# LOOKUPS PRÉ-CARREGADOS
+# =============================================================================
+
+def carregar_empresas():
+    """Retorna {nome: id} de todas as empresas."""
+    return dict(db.session.query(Empresa.nome, Empresa.id).all())
+
+
+def carregar_plantas():
+    """Retorna {(empresa_id, nome): id} de todas as plantas."""
+    return {
+        (empresa_id, nome): planta_id
+        for planta_id, empresa_id, nome in
+        db.session.query(Planta.id, Planta.empresa_id, Planta.nome).all()
+    }
+
+
+def carregar_blocos():
+    """
+    Retorna ({(empresa_id, codigo): id}, {codigo: id}).
+
+    O segundo dicionário mantém a busca apenas pelo código (primeiro bloco
+    encontrado), usada quando o bloco não pertence à empresa da linha.
+    """
+    por_empresa = {}
+    por_codigo = {}
+    blocos = db.session.query(
+        Bloco.id, Bloco.empresa_id, Bloco.codigo_bloco
+    ).order_by(Bloco.id).all()
+    for bloco_id, empresa_id, codigo in blocos:
+        por_empresa[(empresa_id, codigo)] = bloco_id
+        por_codigo.setdefault(codigo, bloco_id)
+    return por_empresa, por_codigo
+
+
+def valores_existentes(coluna, valores):
+    """Retorna o subconjunto de `valores` que já existe em `coluna` (1 consulta)."""
+    valores = {v for v in valores if v}
+    if not valores:
+        return set()
+    return {
+        valor for (valor,) in
+        db.session.query(coluna).filter(coluna.in_(valores)).all()
+    }
+
+
+def gerar_hashes(senhas):
+    """
+    Gera os hashes de senha em paralelo.
+
+    O PBKDF2 libera o GIL, então um pool de threads reduz o tempo de
+    importação de arquivos de usuários de forma proporcional aos núcleos.
+    """
+    if not senhas:
+        return []
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as executor:
+        return list(executor.map(
+            lambda senha: generate_password_hash(senha, method='pbkdf2:sha256'),
+            senhas
+        ))
+
+
+def _limpar_telefone(telefone):
+    """Remove a formatação do telefone; retorna (telefone, valido)."""
+    if not telefone:
+        return None, True
+    telefone_limpo = telefone.replace(' ', '').replace(
+        '-', '').replace('(', '').replace(')', '').replace('.', '')
+    if telefone_limpo and (not telefone_limpo.isdigit() or len(telefone_limpo) != 11):
+        return None, False
+    return telefone_limpo or None, True
+
+
+def _campo(row, indice, padrao=''):
+    return row[indice] if len(row) > indice else padrao
+
+
+# =============================================================================
+# COLABORADORES
+# =============================================================================
+
+class LookupsColaborador:
+    """Dicionários de empresas, plantas e blocos carregados uma única vez."""
+
+    def __init__(self):
+        self.empresas = carregar_empresas()
+        self.plantas = carregar_plantas()
+        self.blocos, self.blocos_por_codigo = carregar_blocos()
+
+
+def parse_colaborador(i, row, lookups, resultado):
+    """
+    Valida uma linha do CSV de colaboradores e resolve as chaves estrangeiras.
+
+    Formato: matricula;nome;empresa;planta;email;telefone;endereco;nro;
+             bairro;cidade;uf;bloco;status
+
+    Returns:
+        tuple: (dados do colaborador, lista de avisos) ou (None, None) se a
+               linha foi rejeitada
+    """
+    if len(row) < 7:
+        resultado.ignorar(
+            i, f"Número insuficiente de campos (esperado pelo menos 7, encontrado {len(row)})")
+        return None, None
+
+    matricula = _campo(row, 0)
+    nome = _campo(row, 1)
+    empresa_nome = _campo(row, 2)
+    planta_nome = _campo(row, 3)
+    bloco_codigo = _campo(row, 11)
+    status = _campo(row, 12, 'Ativo')
+
+    if not matricula or not nome:
+        resultado.ignorar(i, "Matrícula e nome são obrigatórios")
+        return None, None
+
+    empresa_id = lookups.empresas.get(empresa_nome)
+    if not empresa_id:
+        resultado.ignorar(i, f"Empresa '{empresa_nome}' não encontrada")
+        return None, None
+
+    planta_id = lookups.plantas.get((empresa_id, planta_nome))
+    if not planta_id:
+        resultado.ignorar(
+            i, f"Planta '{planta_nome}' não encontrada para a empresa '{empresa_nome}'")
+        return None, None
+
+    avisos = []
+
+    bloco_id = None
+    if bloco_codigo:
+        bloco_id = (lookups.blocos.get((empresa_id, bloco_codigo))
+                    or lookups.blocos_por_codigo.get(bloco_codigo))
+        if not bloco_id:
+            avisos.append(
+                f"Bloco '{bloco_codigo}' não encontrado (colaborador será criado sem bloco)")
+
+    telefone = _campo(row, 5)
+    telefone_limpo, telefone_valido = _limpar_telefone(telefone)
+    if not telefone_valido:
+        avisos.append(
+            f"Telefone '{telefone}' inválido (deve ter 11 dígitos). Colaborador será criado sem telefone.")
+
+    if status and status not in STATUS_VALIDOS:
+        status = 'Ativo'  # Valor padrão
+
+    dados = {
+        'matricula': matricula,
+        'nome': nome,
+        'empresa_id': empresa_id,
+        'planta_id': planta_id,
+        'email': _campo(row, 4) or None,
+        'telefone': telefone_limpo,
+        'endereco': _campo(row, 6) or None,
+        'nro': _campo(row, 7) or None,
+        'bairro': _campo(row, 8) or None,
+        'cidade': _campo(row, 9) or None,
+        'uf': _campo(row, 10) or None,
+        'bloco_id': bloco_id,
+        'status': status or 'Ativo',
+    }
+    return dados, avisos
+
+
+def importar_colaboradores(linhas, tamanho_lote=TAMANHO_LOTE):
+    """
+    Importa colaboradores novos; matrículas já existentes são rejeitadas.
+
+    Args:
+        linhas: Iterável de (número da linha, campos), ex: ler_linhas_csv()
+        tamanho_lote (int): Linhas por lote de validação/inserção
+
+    Returns:
+        ResultadoImportacao
+    """
+    resultado = ResultadoImportacao()
+    lookups = LookupsColaborador()
+    vistas = set()
+
+    for lote in em_lotes(linhas, tamanho_lote):
+        validos = []
+        for i, row in lote:
+            dados, avisos = parse_colaborador(i, row, lookups, resultado)
+            if dados:
+                validos.append((i, dados, avisos))
+
+        existentes = valores_existentes(
+            Colaborador.matricula, [d['matricula'] for _, d, _ in validos])
+
+        novos = []
+        for i, dados, avisos in validos:
+            matricula = dados['matricula']
+            if matricula in existentes or matricula in vistas:
+                resultado.ignorar(
+                    i, f"Matrícula '{matricula}' já existe no sistema")
+                continue
+            vistas.add(matricula)
+            for aviso in avisos:
+                resultado.avisar(i, aviso)
+            novos.append(dados)
+
+        if novos:
+            db.session.bulk_insert_mappings(Colaborador, novos)
+            resultado.adicionados += len(novos)
+
+    db.session.commit()
+    # Os inserts em lote não disparam os eventos do ORM
+    invalidar_indice_colaboradores()
+    return resultado
+
+
+# Campos do colaborador sincronizados pelo modo upsert
+CAMPOS_SINCRONIZADOS_COLABORADOR = [
+    'nome', 'empresa_id', 'planta_id', 'email', 'telefone', 'endereco',
+    'nro', 'bairro', 'cidade', 'uf', 'bloco_id', 'status'
+]
+
+
+def hash_conteudo(dados, campos=CAMPOS_SINCRONIZADOS_COLABORADOR):
+    """Hash do conteúdo sincronizado de um registro (None e '' são iguais)."""
+    conteudo = '\x1f'.join(
+        '' if dados.get(campo) is None else str(dados.get(campo))
+        for campo in campos
+    )
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+
+
+def _hashes_existentes(matriculas):
+    """
+    Retorna {matricula: (id, hash do conteúdo atual)} dos colaboradores
+    existentes, com uma única consulta.
+    """
+    if not matriculas:
+        return {}
+    colunas = [getattr(Colaborador, campo)
+               for campo in CAMPOS_SINCRONIZADOS_COLABORADOR]
+    linhas = db.session.query(
+        Colaborador.id, Colaborador.matricula, *colunas
+    ).filter(Colaborador.matricula.in_(matriculas)).all()
+    return {
+        linha.matricula: (linha.id, hash_conteudo(linha._asdict()))
+        for linha in linhas
+    }
+
+
+def _gravar_upsert_colaboradores(novos, alterados):
+    """
+    Grava os colaboradores novos e alterados.
+
+    PostgreSQL/SQLite: um único INSERT ... ON CONFLICT (matricula) DO UPDATE
+    por lote. Outros bancos: bulk insert + bulk update.
+
+    Args:
+        novos (list): Dicts de colaboradores inexistentes
+        alterados (list): Dicts (com 'id') de colaboradores existentes
+    """
+    insert = insert_com_conflito()
+    if insert is not None:
+        registros = novos + [
+            {k: v for k, v in dados.items() if k != 'id'} for dados in alterados
+        ]
+        # Sub-lotes de 1000 linhas mantêm o total de parâmetros do VALUES
+        # abaixo do limite do SQLite/PostgreSQL
+        for sublote in em_lotes(registros, 1000):
+            stmt = insert(Colaborador.__table__).values(sublote)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['matricula'],
+                set_={campo: stmt.excluded[campo]
+                      for campo in CAMPOS_SINCRONIZADOS_COLABORADOR}
+            )
+            db.session.execute(stmt)
+        return
+
+    # Fallback portável
+    if novos:
+        db.session.bulk_insert_mappings(Colaborador, novos)
+    if alterados:
+        db.session.bulk_update_mappings(Colaborador, alterados)
+
+
+def sincronizar_colaboradores(linhas, tamanho_lote=TAMANHO_LOTE):
+    """
+    Sincroniza colaboradores com um export de RH (upsert por matrícula).
+
+    Matrículas novas são inseridas; as existentes só são atualizadas quando
+    o hash do conteúdo mudou. Linhas repetidas no arquivo valem pela última
+    ocorrência do lote e são rejeitadas entre lotes.
+
+    Returns:
+        ResultadoImportacao: adicionados, atualizados, inalterados e ignorados
+    """
+    resultado = ResultadoImportacao()
+    lookups = LookupsColaborador()
+    vistas = set()
+
+    for lote in em_lotes(linhas, tamanho_lote):
+        validos = {}
+        for i, row in lote:
+            dados, avisos = parse_colaborador(i, row, lookups, resultado)
+            if not dados:
+                continue
+            matricula = dados['matricula']
+            if matricula in vistas:
+                resultado.ignorar(
+                    i, f"Matrícula '{matricula}' repetida no arquivo")
+                continue
+            if matricula in validos:
+                resultado.ignorar(
+                    validos[matricula][0],
+                    f"Matrícula '{matricula}' repetida no arquivo (vale a linha {i})")
+            validos[matricula] = (i, dados, avisos)
+
+        existentes = _hashes_existentes(list(validos))
+
+        novos = []
+        alterados = []
+        for matricula, (i, dados, avisos) in validos.items():
+            vistas.add(matricula)
+            atual = existentes.get(matricula)
+            if atual and atual[1] == hash_conteudo(dados):
+                resultado.inalterados += 1
+                continue
+            for aviso in avisos:
+                resultado.avisar(i, aviso)
+            if atual:
+                alterados.append(dict(dados, id=atual[0]))
+            else:
+                novos.append(dados)
+
+        _gravar_upsert_colaboradores(novos, alterados)
+        resultado.adicionados += len(novos)
+        resultado.atualizados += len(alterados)
+
+    db.session.commit()
+    # Os inserts em lote não disparam os eventos do ORM
+    invalidar_indice_colaboradores()
+    return resultado
+
+
+# =============================================================================
+# SUPERVISORES
+# =============================================================================
+
+def _criar_usuarios(registros, role):
+    """
+    Insere em lote os usuários dos registros e retorna {email: user_id}.
+
+    Cada registro deve ter as chaves 'email' e 'senha'.
+    """
+    hashes = gerar_hashes([r['senha'] for r in registros])
+    db.session.bulk_insert_mappings(User, [
+        {'email': r['email'], 'password': senha_hash, 'role': role}
+        for r, senha_hash in zip(registros, hashes)
+    ])
+    emails = [r['email'] for r in registros]
+    return dict(
+        db.session.query(User.email, User.id).filter(User.email.in_(emails)).all()
+    )
+
+
+def importar_supervisores(linhas, tamanho_lote=TAMANHO_LOTE):
+    """
+    Importa supervisores (e seus usuários de acesso).
+
+    Formato: matricula;nome;empresa;planta;email;senha;status
+
+    Returns:
+        ResultadoImportacao
+    """
+    resultado = ResultadoImportacao()
+    empresas = carregar_empresas()
+    plantas = carregar_plantas()
+    matriculas_vistas = set()
+    emails_vistos = set()
+
+    for lote in em_lotes(linhas, tamanho_lote):
+        validos = []
+        for i, row in lote:
+            if len(row) < 7:
+                resultado.ignorar(
+                    i, f"Número insuficiente de campos (esperado 7, encontrado {len(row)})")
+                continue
+
+            matricula, nome, empresa_nome, planta_nome, email, senha, status = row[:7]
+
+            if not matricula or not nome or not email or not senha:
+                resultado.ignorar(
+                    i, "Matrícula, nome, email e senha são obrigatórios")
+                continue
+
+            empresa_id = empresas.get(empresa_nome)
+            if not empresa_id:
+                resultado.ignorar(i, f"Empresa '{empresa_nome}' não encontrada")
+                continue
+
+            planta_id = plantas.get((empresa_id, planta_nome))
+            if not planta_id:
+                resultado.ignorar(
+                    i, f"Planta '{planta_nome}' não encontrada para a empresa '{empresa_nome}'")
+                continue
+
+            if status and status not in STATUS_VALIDOS:
+                status = 'Ativo'  # Valor padrão
+
+            validos.append((i, {
+                'matricula': matricula,
+                'nome': nome,
+                'empresa_id': empresa_id,
+                'planta_id': planta_id,
+                'email': email,
+                'senha': senha,
+                'status': status or 'Ativo',
+            }))
+
+        matriculas_existentes = valores_existentes(
+            Supervisor.matricula, [d['matricula'] for _, d in validos])
+        emails_existentes = valores_existentes(
+            User.email, [d['email'] for _, d in validos])
+
+        novos = []
+        for i, dados in validos:
+            if dados['matricula'] in matriculas_existentes or dados['matricula'] in matriculas_vistas:
+                resultado.ignorar(
+                    i, f"Matrícula '{dados['matricula']}' já existe no sistema")
+                continue
+            if dados['email'] in emails_existentes or dados['email'] in emails_vistos:
+                resultado.ignorar(i, f"E-mail '{dados['email']}' já está em uso")
+                continue
+            matriculas_vistas.add(dados['matricula'])
+            emails_vistos.add(dados['email'])
+            novos.append(dados)
+
+        if not novos:
+            continue
+
+        user_ids = _criar_usuarios(novos, 'supervisor')
+        db.session.bulk_insert_mappings(Supervisor, [
+            {
+                'user_id': user_ids[d['email']],
+                'matricula': d['matricula'],
+                'nome': d['nome'],
+                'empresa_id': d['empresa_id'],
+                'planta_id': d['planta_id'],
+                'email': d['email'],
+                'status': d['status'],
+            }
+            for d in novos
+        ])
+        resultado.adicionados += len(novos)
+
+    db.session.commit()
+    return resultado
+
+
+# =============================================================================
+# MOTORISTAS
+# =============================================================================
+
+def importar_motoristas(linhas, tamanho_lote=TAMANHO_LOTE):
+    """
+    Importa motoristas (e seus usuários de acesso).
+
+    Formato: nome;cpf_cnpj;email;senha;telefone;chave_pix;veiculo_nome;veiculo_placa
+
+    Returns:
+        ResultadoImportacao
+    """
+    resultado = ResultadoImportacao()
+    emails_vistos = set()
+    cpfs_vistos = set()
+    placas_vistas = set()
+
+    for lote in em_lotes(linhas, tamanho_lote):
+        validos = []
+        for i, row in lote:
+            if len(row) < 8:
+                resultado.ignorar(
+                    i, f"Número insuficiente de campos (esperado 8, encontrado {len(row)})")
+                continue
+
+            nome, cpf_cnpj, email, senha, telefone, chave_pix, veiculo_nome, veiculo_placa = row[:8]
+
+            if not nome or not cpf_cnpj or not email or not senha:
+                resultado.ignorar(
+                    i, "Nome, CPF/CNPJ, email e senha são obrigatórios")
+                continue
+
+            validos.append((i, {
+                'nome': nome,
+                'cpf_cnpj': cpf_cnpj,
+                'email': email,
+                'senha': senha,
+                'telefone': telefone or None,
+                'chave_pix': chave_pix or None,
+                'veiculo_nome': veiculo_nome or None,
+                'veiculo_placa': veiculo_placa or None,
+            }))
+
+        emails_existentes = valores_existentes(
+            User.email, [d['email'] for _, d in validos])
+        cpfs_existentes = valores_existentes(
+            Motorista.cpf_cnpj, [d['cpf_cnpj'] for _, d in validos])
+        placas_existentes = valores_existentes(
+            Motorista.veiculo_placa, [d['veiculo_placa'] for _, d in validos])
+
+        novos = []
+        for i, dados in validos:
+            placa = dados['veiculo_placa']
+            if dados['email'] in emails_existentes or dados['email'] in emails_vistos:
+                resultado.ignorar(i, f"E-mail '{dados['email']}' já está em uso")
+                continue
+            if dados['cpf_cnpj'] in cpfs_existentes or dados['cpf_cnpj'] in cpfs_vistos:
+                resultado.ignorar(
+                    i, f"CPF/CNPJ '{dados['cpf_cnpj']}' já está cadastrado")
+                continue
+            if placa and (placa in placas_existentes or placa in placas_vistas):
+                resultado.ignorar(i, f"Placa '{placa}' já está em uso")
+                continue
+            emails_vistos.add(dados['email'])
+            cpfs_vistos.add(dados['cpf_cnpj'])
+            if placa:
+                placas_vistas.add(placa)
+            novos.append(dados)
+
+        if not novos:
+            continue
+
+        user_ids = _criar_usuarios(novos, 'motorista')
+        db.session.bulk_insert_mappings(Motorista, [
+            {
+                'user_id': user_ids[d['email']],
+                'nome': d['nome'],
+                'cpf_cnpj': d['cpf_cnpj'],
+                'email': d['email'],
+                'telefone': d['telefone'],
+                'chave_pix': d['chave_pix'],
+                'veiculo_nome': d['veiculo_nome'],
+                'veiculo_placa': d['veiculo_placa'],
+                'status': 'Ativo',
+            }
+            for d in novos
+        ])
+        resultado.adicionados += len(novos)
+
+    db.session.commit()
+    return resultado
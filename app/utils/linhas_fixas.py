@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Agendador de Linhas Fixas - Sistema Go Mobi
+===========================================
+
+Gera as solicitações 'FIXA' dos próximos dias a partir das linhas fixas
+(LinhaFixa: colaborador, turno, tipo de corrida, dias da semana e
+vigência), para que as corridas recorrentes não precisem ser digitadas
+todos os dias.
+
+Funcionamento:
+- As linhas ativas e vigentes na janela são lidas de uma vez, já com o
+  bloco do colaborador e os horários do turno (colaboradores inativos ou
+  sem bloco ficam de fora)
+- Cada linha gera, por dia marcado, as solicitações do tipo de corrida com
+  os horários de início/fim do turno (turnos que viram o dia têm a saída
+  no dia seguinte); horários já passados são pulados
+- Valores e repasses vêm da matriz de tarifas em memória (utils/tarifas)
+- As solicitações são gravadas em lotes de LINHAS_POR_LOTE linhas com
+  gravar_solicitacoes (INSERT ... ON CONFLICT DO NOTHING): o que já existe
+  para o colaborador/tipo/dia é ignorado, então rodar de novo não duplica
+- No mesmo commit do lote, gerado_ate das linhas avança até o fim da
+  janela; execuções seguintes começam do dia seguinte, e uma solicitação
+  cancelada não é recriada
+
+Uso:
+    resultado = gerar_solicitacoes_fixas(dias=7)
+    resultado.criadas, resultado.ignoradas
+
+    flask gerar-linhas-fixas --dias 7
+
+Autor: Sistema DOUG Moving
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+
+from .. import db
+from ..models import Colaborador, LinhaFixa, Turno, horario_brasil
+from .solicitacoes_lote import gravar_solicitacoes
+from .tarifas import tarifa
+
+DIAS_PADRAO = 7
+LINHAS_POR_LOTE = 500
+
+
+class ResultadoGeracao:
+    """Contadores de uma execução do agendador."""
+
+    def __init__(self, inicio, fim):
+        self.inicio = inicio
+        self.fim = fim
+        self.linhas = 0
+        self.criadas = 0
+        self.ignoradas = 0  # Já existiam para o colaborador/tipo/dia
+        self.ids = []
+
+    def __repr__(self):
+        return (f'<ResultadoGeracao {self.inicio}..{self.fim} linhas={self.linhas} '
+                f'criadas={self.criadas} ignoradas={self.ignoradas}>')
+
+
+def _horarios(dia, turno_inicio, turno_fim):
+    """Horários de entrada e saída do turno que começa no dia."""
+    entrada = datetime.combine(dia, turno_inicio)
+    saida = datetime.combine(dia, turno_fim)
+    if saida <= entrada:
+        saida += timedelta(days=1)  # Turno da madrugada
+    return {'entrada': entrada, 'saida': saida}
+
+
+def _registros_da_linha(linha, inicio, fim, agora):
+    """Dicts de Solicitacao de uma linha fixa para os dias da janela."""
+    dias_semana = {int(d) for d in linha.dias_semana.split(',') if d.strip().isdigit()}
+    primeiro = max(inicio, linha.data_inicio)
+    if linha.gerado_ate:
+        primeiro = max(primeiro, linha.gerado_ate + timedelta(days=1))
+    ultimo = min(fim, linha.data_fim) if linha.data_fim else fim
+
+    if linha.tipo_corrida == 'entrada_saida':
+        partes = ['entrada', 'saida']
+    else:
+        partes = [linha.tipo_corrida]
+    valor, repasse = tarifa(linha.bloco_id, linha.turno_nome)
+
+    registros = []
+    dia = primeiro
+    while dia <= ultimo:
+        if dia.weekday() in dias_semana:
+            horarios = _horarios(dia, linha.horario_inicio, linha.horario_fim)
+            for tipo in partes:
+                if horarios[tipo] < agora:
+                    continue
+                registros.append({
+                    'colaborador_id': linha.colaborador_id,
+                    'supervisor_id': linha.supervisor_id,
+                    'empresa_id': linha.empresa_id,
+                    'planta_id': linha.planta_id,
+                    'bloco_id': linha.bloco_id,
+                    'tipo_linha': 'FIXA',
+                    'tipo_corrida': tipo,
+                    f'horario_{tipo}': horarios[tipo],
+                    f'turno_{tipo}_id': linha.turno_id,
+                    'valor': float(valor) if valor else None,
+                    'valor_repasse': float(repasse) if repasse else None,
+                    'status': 'Pendente',
+                    'created_by_user_id': linha.created_by_user_id,
+                })
+        dia += timedelta(days=1)
+    return registros
+
+
+def gerar_solicitacoes_fixas(dias=DIAS_PADRAO, inicio=None,
+                             linhas_por_lote=LINHAS_POR_LOTE):
+    """
+    Materializa as solicitações das linhas fixas de `inicio` até
+    `inicio + dias - 1` (inclusive). Faz commit a cada lote.
+
+    Args:
+        dias (int): Tamanho da janela em dias
+        inicio (date): Primeiro dia (padrão: hoje, horário de Brasília)
+        linhas_por_lote (int): Linhas fixas processadas por lote
+
+    Returns:
+        ResultadoGeracao
+    """
+    agora = horario_brasil()
+    inicio = inicio or agora.date()
+    fim = inicio + timedelta(days=dias - 1)
+    resultado = ResultadoGeracao(inicio, fim)
+
+    linhas = db.session.query(
+        LinhaFixa.id, LinhaFixa.colaborador_id, LinhaFixa.supervisor_id,
+        LinhaFixa.empresa_id, LinhaFixa.planta_id, LinhaFixa.turno_id,
+        LinhaFixa.tipo_corrida, LinhaFixa.dias_semana, LinhaFixa.data_inicio,
+        LinhaFixa.data_fim, LinhaFixa.gerado_ate, LinhaFixa.created_by_user_id,
+        Colaborador.bloco_id, Turno.nome.label('turno_nome'),
+        Turno.horario_inicio, Turno.horario_fim
+    ).join(
+        Colaborador, Colaborador.id == LinhaFixa.colaborador_id
+    ).join(
+        Turno, Turno.id == LinhaFixa.turno_id
+    ).filter(
+        LinhaFixa.ativa.is_(True),
+        LinhaFixa.data_inicio <= fim,
+        or_(LinhaFixa.data_fim.is_(None), LinhaFixa.data_fim >= inicio),
+        or_(LinhaFixa.gerado_ate.is_(None), LinhaFixa.gerado_ate < fim),
+        Colaborador.status == Colaborador.STATUS_ATIVO,
+        Colaborador.bloco_id.isnot(None)
+    ).order_by(LinhaFixa.id).all()
+
+    for posicao in range(0, len(linhas), linhas_por_lote):
+        lote = linhas[posicao:posicao + linhas_por_lote]
+        registros = []
+        for linha in lote:
+            registros.extend(_registros_da_linha(linha, inicio, fim, agora))
+
+        ids, ignorados = gravar_solicitacoes(registros)
+        db.session.execute(
+            update(LinhaFixa).where(
+                LinhaFixa.id.in_([linha.id for linha in lote])
+            ).values(gerado_ate=fim).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        resultado.linhas += len(lote)
+        resultado.criadas += len(ids)
+        resultado.ignoradas += len(ignorados)
+        resultado.ids.extend(ids)
+
+    return resultado
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Numeração dos Títulos Financeiros - Sistema Go Mobi
+===================================================
+
+Gera o próximo número de título (ex: REC-2026-0154, PAG-2026-0031) sem
+repetir números quando dois usuários geram títulos ao mesmo tempo.
+
+Antes, o número era o do último título + 1: duas gerações simultâneas
+liam o mesmo último título e a segunda falhava no índice único de
+numero_titulo. Agora o contador fica no banco:
+
+- PostgreSQL: uma sequence por série e ano (fin_titulo_rec_2026_seq,
+  fin_titulo_pag_2026_seq). nextval() nunca devolve o mesmo valor duas
+  vezes e não bloqueia outras transações; um título que falha (rollback)
+  deixa um número sem uso
+- SQLite: uma linha por série e ano em fin_numeracao (FinNumeracao). O
+  UPDATE do contador pega o lock de escrita do banco até o commit, então
+  as gerações simultâneas são feitas uma de cada vez
+
+A numeração recomeça a cada ano (REC-2026-0154, depois REC-2027-0001): o
+contador do ano é criado na primeira geração do ano, a partir do maior
+número já usado com o mesmo prefixo SERIE-ANO.
+
+Uso:
+    numero = proximo_numero_titulo('REC')  # na transação do título
+    numeros = proximos_numeros_titulo('REC', 30)  # geração em lote
+
+Autor: Sistema DOUG Moving
+"""
+
+from datetime import date
+import hashlib
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, ProgrammingError
+
+from .. import db
+from ..models import FinContasReceber, FinContasPagar, FinNumeracao
+
+SERIES = {
+    'REC': FinContasReceber,
+    'PAG': FinContasPagar,
+}
+
+_lock = threading.Lock()
+_sequences_criadas = set()
+
+
+def nome_sequence(serie, ano):
+    """Nome da sequence da série no ano, no PostgreSQL."""
+    return f'fin_titulo_{serie.lower()}_{int(ano)}_seq'
+
+
+def maior_numero_usado(serie, ano):
+    """Maior número já usado nos títulos da série no ano (0 se não houver)."""
+    modelo = SERIES[serie]
+    numeros = db.session.query(modelo.numero_titulo).filter(
+        modelo.numero_titulo.like(f'{serie}-{int(ano)}-%')).all()
+    maior = 0
+    for (numero,) in numeros:
+        final = numero.rsplit('-', 1)[-1]
+        if final.isdigit():
+            maior = max(maior, int(final))
+    return maior
+
+
+def _garantir_sequence(serie, ano):
+    """Cria a sequence da série no ano, se ainda não existir (PostgreSQL)."""
+    nome = nome_sequence(serie, ano)
+    if nome in _sequences_criadas:
+        return nome
+
+    existe = db.session.execute(
+        text('SELECT to_regclass(:nome)'), {'nome': nome}).scalar()
+    if existe is None:
+        inicio = maior_numero_usado(serie, ano) + 1
+        # Conexão própria: um erro aqui não invalida a transação do título
+        try:
+            with db.engine.begin() as conexao:
+                conexao.execute(text(
+                    f'CREATE SEQUENCE IF NOT EXISTS {nome} START WITH {inicio}'))
+        except (IntegrityError, ProgrammingError):
+            # Outro processo criou a mesma sequence ao mesmo tempo
+            pass
+
+    with _lock:
+        _sequences_criadas.add(nome)
+    return nome
+
+
+def _proximos_postgresql(serie, ano, quantidade):
+    nome = _garantir_sequence(serie, ano)
+    return sorted(n for (n,) in db.session.execute(
+        text(f"SELECT nextval('{nome}') FROM generate_series(1, :quantidade)"),
+        {'quantidade': quantidade}))
+
+
+def _proximos_contador(serie, ano, quantidade):
+    atualizado = db.session.query(FinNumeracao).filter(
+        FinNumeracao.serie == serie, FinNumeracao.ano == ano
+    ).update({FinNumeracao.ultimo: FinNumeracao.ultimo + quantidade},
+             synchronize_session=False)
+
+    if not atualizado:
+        # Primeiro título da série no ano: começa do maior já usado
+        try:
+            with db.session.begin_nested():
+                db.session.add(FinNumeracao(
+                    serie=serie, ano=ano,
+                    ultimo=maior_numero_usado(serie, ano) + quantidade))
+        except IntegrityError:
+            # Outra transação criou o contador antes: usa o UPDATE
+            return _proximos_contador(serie, ano, quantidade)
+
+    ultimo = db.session.query(FinNumeracao.ultimo).filter(
+        FinNumeracao.serie == serie, FinNumeracao.ano == ano).scalar()
+    return list(range(ultimo - quantidade + 1, ultimo + 1))
+
+
+def proximos_numeros_titulo(serie, quantidade, data=None):
+    """
+    Reserva `quantidade` números de título da série (ex: faturamento em lote).
+
+    Deve ser chamado na mesma transação que grava os títulos: em SQLite o
+    contador fica bloqueado até o commit/rollback.
+
+    Args:
+        serie (str): 'REC' (contas a receber) ou 'PAG' (contas a pagar)
+        quantidade (int): Números a reservar
+        data (date): Data da geração, para o ano (padrão: hoje)
+
+    Returns:
+        list[str]: em ordem crescente, ex: ['REC-2026-0154', 'REC-2026-0155']
+    """
+    if serie not in SERIES:
+        raise ValueError(f'Série de numeração desconhecida: {serie}')
+    if quantidade <= 0:
+        return []
+
+    ano = (data or date.today()).year
+    if db.engine.dialect.name == 'postgresql':
+        numeros = _proximos_postgresql(serie, ano, quantidade)
+    else:
+        numeros = _proximos_contador(serie, ano, quantidade)
+
+    return [f'{serie}-{ano}-{str(numero).zfill(4)}' for numero in numeros]
+
+
+def proximo_numero_titulo(serie, data=None):
+    """
+    Próximo número de título da série, no formato SERIE-ANO-NNNN.
+
+    Deve ser chamado na mesma transação que grava o título: em SQLite o
+    contador fica bloqueado até o commit/rollback.
+
+    Args:
+        serie (str): 'REC' (contas a receber) ou 'PAG' (contas a pagar)
+        data (date): Data da geração, para o ano (padrão: hoje)
+
+    Returns:
+        str: ex: 'REC-2026-0154'
+    """
+    return proximos_numeros_titulo(serie, 1, data)[0]
+
+
+def bloquear_serie(serie):
+    """
+    Bloqueia a geração de títulos da série até o fim da transação.
+
+    Usado pelas gerações em lote: uma segunda execução simultânea espera a
+    primeira terminar e então já vê as viagens vinculadas por ela.
+    PostgreSQL: advisory lock da transação; SQLite: lock de escrita do
+    banco (UPDATE dos contadores da série).
+    """
+    if db.engine.dialect.name == 'postgresql':
+        chave = int(hashlib.sha1(f'fin_titulo_{serie}'.encode()).hexdigest()[:8], 16)
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:chave)'), {'chave': chave})
+    else:
+        db.session.query(FinNumeracao).filter(FinNumeracao.serie == serie).update(
+            {FinNumeracao.ultimo: FinNumeracao.ultimo}, synchronize_session=False)
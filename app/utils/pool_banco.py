@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Pool de Conexões do Banco - Sistema Go Mobi
+===========================================
+
+Opções do engine (SQLALCHEMY_ENGINE_OPTIONS) a partir de
+app/config/database.py e métricas do pool, por processo:
+
+- Espera por conexão: tempo para obter uma conexão do pool (inclui abrir
+  uma nova, quando não há livre); média, máxima, quantas passaram de
+  DB_POOL_ALERTA_ESPERA_MS e quantas deram timeout
+- Overflow: conexões além de DB_POOL_SIZE em uso agora e o máximo visto
+- Idade das conexões: idade da conexão mais velha entregue, conexões
+  abertas e invalidadas (ex: derrubadas pelo servidor e detectadas pelo
+  pre_ping)
+
+Espera lenta, timeout e overflow acima de DB_POOL_ALERTA_OVERFLOW geram
+aviso no log (no máximo um por DB_POOL_ALERTA_INTERVALO, por tipo).
+
+A espera é medida em PoolMedido, um QueuePool que cronometra a obtenção
+da conexão; os demais números vêm dos eventos do pool.
+
+Uso:
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_engine(uri)
+    metricas_pool(db.engine)
+
+Autor: Sistema DOUG Moving
+"""
+
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from ..config.database import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE, DB_STATEMENT_TIMEOUT, DB_POOL_ALERTA_ESPERA_MS,
+    DB_POOL_ALERTA_OVERFLOW, DB_POOL_ALERTA_INTERVALO
+)
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_metricas = {}
+_ultimo_alerta = {}
+
+
+def _zerar():
+    _metricas.update(
+        checkouts=0, espera_total_ms=0.0, espera_max_ms=0.0, esperas_lentas=0,
+        timeouts=0, overflow_max=0, conexoes_abertas=0, conexoes_invalidadas=0,
+        idade_max_s=0.0
+    )
+
+
+_zerar()
+
+
+def _alertar(tipo, mensagem):
+    agora = time.monotonic()
+    with _lock:
+        if agora - _ultimo_alerta.get(tipo, -DB_POOL_ALERTA_INTERVALO) < DB_POOL_ALERTA_INTERVALO:
+            return
+        _ultimo_alerta[tipo] = agora
+    logger.warning(f'⚠️ Pool do banco: {mensagem}')
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mede a espera para obter uma conexão."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except exc.TimeoutError:
+            with _lock:
+                _metricas['timeouts'] += 1
+            _alertar('timeout', f'timeout de {self._timeout}s esperando conexão '
+                                f'(size {self.size()}, overflow {self.overflow()})')
+            raise
+
+        espera_ms = (time.perf_counter() - inicio) * 1000
+        overflow = max(self.overflow(), 0)
+        with _lock:
+            _metricas['checkouts'] += 1
+            _metricas['espera_total_ms'] += espera_ms
+            _metricas['espera_max_ms'] = max(_metricas['espera_max_ms'], espera_ms)
+            _metricas['overflow_max'] = max(_metricas['overflow_max'], overflow)
+            if espera_ms > DB_POOL_ALERTA_ESPERA_MS:
+                _metricas['esperas_lentas'] += 1
+
+        if espera_ms > DB_POOL_ALERTA_ESPERA_MS:
+            _alertar('espera', f'{espera_ms:.0f} ms esperando conexão '
+                               f'({self.checkedout()} em uso, overflow {overflow})')
+        if overflow >= DB_POOL_ALERTA_OVERFLOW:
+            _alertar('overflow', f'{overflow} conexões de overflow em uso '
+                                 f'(size {self.size()}, max_overflow {self._max_overflow})')
+        return conexao
+
+
+def _conexao_aberta(dbapi_connection, connection_record):
+    connection_record.info['aberta_em'] = time.monotonic()
+    with _lock:
+        _metricas['conexoes_abertas'] += 1
+
+
+def _conexao_entregue(dbapi_connection, connection_record, connection_proxy):
+    aberta_em = connection_record.info.get('aberta_em')
+    if aberta_em is not None:
+        idade = time.monotonic() - aberta_em
+        with _lock:
+            _metricas['idade_max_s'] = max(_metricas['idade_max_s'], idade)
+
+
+def _conexao_invalidada(dbapi_connection, connection_record, exception):
+    with _lock:
+        _metricas['conexoes_invalidadas'] += 1
+
+
+event.listen(PoolMedido, 'connect', _conexao_aberta)
+event.listen(PoolMedido, 'checkout', _conexao_entregue)
+event.listen(PoolMedido, 'invalidate', _conexao_invalidada)
+
+
+def opcoes_engine(uri):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS para a URI do banco.
+
+    Em SQLite devolve {}: o Flask-SQLAlchemy usa NullPool (sem pool).
+    """
+    if make_url(uri).get_backend_name() == 'sqlite':
+        return {}
+
+    opcoes = {
+        'poolclass': PoolMedido,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+        'pool_recycle': DB_POOL_RECYCLE,
+    }
+    if DB_STATEMENT_TIMEOUT and make_url(uri).get_backend_name() == 'postgresql':
+        opcoes['connect_args'] = {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT}'}
+    return opcoes
+
+
+def metricas_pool(engine):
+    """
+    Métricas do pool deste processo.
+
+    Returns:
+        dict: configuração, estado atual e contadores desde o início do
+        processo (ou desde zerar_metricas())
+    """
+    pool = engine.pool
+    with _lock:
+        dados = dict(_metricas)
+    dados['espera_media_ms'] = round(
+        dados['espera_total_ms'] / dados['checkouts'], 2) if dados['checkouts'] else 0.0
+    dados['espera_total_ms'] = round(dados['espera_total_ms'], 2)
+    dados['espera_max_ms'] = round(dados['espera_max_ms'], 2)
+    dados['idade_max_s'] = round(dados['idade_max_s'], 1)
+    dados['pid'] = os.getpid()
+    dados['pool'] = type(pool).__name__
+
+    if isinstance(pool, QueuePool):
+        dados.update(
+            pool_size=pool.size(),
+            max_overflow=pool._max_overflow,
+            em_uso=pool.checkedout(),
+            livres=pool.checkedin(),
+            overflow_atual=max(pool.overflow(), 0),
+        )
+    return dados
+
+
+def zerar_metricas():
+    """Zera os contadores (ex: antes de medir um período)."""
+    with _lock:
+        _zerar()
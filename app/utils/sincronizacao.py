@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Delta-sync das Viagens do Motorista - Sistema Go Mobi
+=====================================================
+
+Dados da API JSON do app do motorista (/motorista/api/v1): em vez da lista
+inteira a cada atualização, o app envia o token recebido na chamada
+anterior (?since=) e recebe só o que mudou.
+
+Funcionamento:
+- Toda alteração de viagem grava Viagem.versao (versao_sync); exclusões
+  ficam em ViagemExclusao com a mesma numeração
+- O token é lido ANTES das viagens: uma alteração confirmada no meio da
+  leitura volta na próxima chamada (repetida, nunca perdida)
+- Viagens alteradas que continuam na visão vêm em 'viagens'; as que
+  saíram da visão (aceitas por outro, canceladas, excluídas) vêm só com
+  o id em 'removidas' (tombstones)
+- Na visão 'minhas' o delta considera só as viagens do motorista e as
+  que ele perdeu (desassociadas ou excluídas, ViagemExclusao); na visão
+  'disponiveis', só as disponíveis e as que deixaram de estar (aceitas,
+  canceladas, excluídas: ViagemExclusao com motorista_id NULL). Alterações
+  fora da visão não contam para LIMITE_DELTA nem aparecem na resposta
+- A visão 'disponiveis' tem as LIMITE_DISPONIVEIS mais recentes também no
+  delta: as que saem desse limite (empurradas por novas) vêm em 'removidas'
+- Sem alterações, o token devolvido é o mesmo recebido: a resposta é
+  idêntica e o ETag permite responder 304
+- Mais de LIMITE_DELTA alterações, ou sem ?since=, devolve a lista
+  completa ('completo': true) e o app substitui a sua cópia
+
+Uso:
+    corpo = sincronizar('disponiveis', motorista.id, since=token)
+
+Autor: Sistema DOUG Moving
+"""
+
+from sqlalchemy import and_, case, or_, select
+
+from .. import db
+from ..models import Bloco, Colaborador, Empresa, Planta, Viagem, ViagemExclusao
+from ..models.models_processos import token_sync
+
+VERSAO_API = 1
+LIMITE_DELTA = 500
+LIMITE_DISPONIVEIS = 30   # mesmo limite do dashboard do motorista
+STATUS_MINHAS = ('Agendada', 'Em Andamento')
+VISOES = ('disponiveis', 'minhas')
+
+
+def consulta_viagens():
+    """SELECT dos dados de lista das viagens (sem filtros)."""
+    return select(
+        Viagem.id, Viagem.status, Viagem.tipo_linha, Viagem.tipo_corrida,
+        Viagem.horario_entrada, Viagem.horario_saida, Viagem.horario_desligamento,
+        Viagem.quantidade_passageiros, Viagem.valor_repasse, Viagem.motorista_id,
+        Viagem.versao,
+        Empresa.nome.label('empresa'), Planta.nome.label('planta'),
+        Bloco.codigo_bloco.label('bloco')
+    ).select_from(Viagem).outerjoin(
+        Empresa, Empresa.id == Viagem.empresa_id
+    ).outerjoin(
+        Planta, Planta.id == Viagem.planta_id
+    ).outerjoin(
+        Bloco, Bloco.id == Viagem.bloco_id
+    )
+
+
+def _iso(valor):
+    return valor.isoformat() if valor else None
+
+
+def dados_viagem(linha):
+    """Dicionário JSON de uma linha de consulta_viagens()."""
+    horario = linha.horario_entrada or linha.horario_saida or linha.horario_desligamento
+    return {
+        'id': linha.id,
+        'status': linha.status,
+        'tipo_linha': linha.tipo_linha,
+        'tipo_corrida': linha.tipo_corrida,
+        'horario': _iso(horario),
+        'horario_entrada': _iso(linha.horario_entrada),
+        'horario_saida': _iso(linha.horario_saida),
+        'horario_desligamento': _iso(linha.horario_desligamento),
+        'quantidade_passageiros': linha.quantidade_passageiros or 0,
+        'valor_repasse': f'{linha.valor_repasse or 0:.2f}',
+        'empresa': linha.empresa,
+        'planta': linha.planta,
+        'bloco': linha.bloco,
+        'versao': str(linha.versao),
+    }
+
+
+def filtro_visao(visao, motorista_id):
+    if visao == 'disponiveis':
+        return and_(Viagem.status == 'Pendente', Viagem.motorista_id.is_(None))
+    return and_(Viagem.motorista_id == motorista_id, Viagem.status.in_(STATUS_MINHAS))
+
+
+def _ordem_disponiveis():
+    """Disponíveis das mais recentes para as mais antigas."""
+    return Viagem.data_criacao.desc(), Viagem.id.desc()
+
+
+def _lista_completa(visao, motorista_id):
+    consulta = consulta_viagens().where(filtro_visao(visao, motorista_id))
+    if visao == 'disponiveis':
+        consulta = consulta.order_by(*_ordem_disponiveis()).limit(LIMITE_DISPONIVEIS)
+    else:
+        consulta = consulta.order_by(Viagem.horario_entrada)
+    return [dados_viagem(linha) for linha in db.session.execute(consulta)]
+
+
+def sincronizar(visao, motorista_id, since=None):
+    """
+    Alterações de uma visão desde o token informado.
+
+    Args:
+        visao (str): 'disponiveis' ou 'minhas'
+        motorista_id (int): Motorista logado (visão 'minhas')
+        since (int): Token da chamada anterior (None = lista completa)
+
+    Returns:
+        dict: {'versao_api', 'visao', 'token', 'completo', 'viagens', 'removidas'}
+    """
+    token = db.session.execute(select(token_sync())).scalar()
+    corpo = {'versao_api': VERSAO_API, 'visao': visao}
+
+    if since is not None:
+        excluidas = select(ViagemExclusao.viagem_id).where(ViagemExclusao.versao >= since)
+        disponiveis = select(Viagem.id).where(filtro_visao('disponiveis', None))
+        if visao == 'minhas':
+            # Só as viagens do motorista e as que ele perdeu
+            excluidas = excluidas.where(ViagemExclusao.motorista_id == motorista_id)
+            escopo = or_(Viagem.motorista_id == motorista_id, Viagem.id.in_(excluidas))
+            na_visao = filtro_visao(visao, motorista_id)
+        else:
+            # Só as disponíveis e as que deixaram de estar
+            excluidas = excluidas.where(ViagemExclusao.motorista_id.is_(None))
+            escopo = or_(filtro_visao(visao, motorista_id), Viagem.id.in_(excluidas))
+            na_visao = Viagem.id.in_(disponiveis.order_by(*_ordem_disponiveis())
+                                     .limit(LIMITE_DISPONIVEIS))
+        alteradas = db.session.execute(
+            consulta_viagens().add_columns(case((na_visao, True), else_=False).label('na_visao'))
+            .where(Viagem.versao >= since, escopo)
+            .order_by(Viagem.versao)
+            .limit(LIMITE_DELTA + 1)
+        ).all()
+
+        if len(alteradas) <= LIMITE_DELTA:
+            excluidas = set(db.session.execute(excluidas).scalars())
+            if visao == 'disponiveis':
+                # Cada disponível alterada empurra no máximo uma para fora do limite
+                novas = sum(1 for linha in alteradas
+                            if linha.status == 'Pendente' and linha.motorista_id is None)
+                if novas:
+                    excluidas.update(db.session.execute(
+                        disponiveis.order_by(*_ordem_disponiveis())
+                        .offset(LIMITE_DISPONIVEIS).limit(novas)).scalars())
+            viagens = [dados_viagem(linha) for linha in alteradas if linha.na_visao]
+            # Perdida e devolvida depois (ex: desassociada e aceita de novo) continua
+            removidas = sorted(({linha.id for linha in alteradas if not linha.na_visao}
+                                | excluidas) - {v['id'] for v in viagens})
+            if not viagens and not removidas:
+                token = since
+            corpo.update(token=str(token), completo=False,
+                         viagens=viagens, removidas=removidas)
+            return corpo
+
+    corpo.update(token=str(token), completo=True,
+                 viagens=_lista_completa(visao, motorista_id), removidas=[])
+    return corpo
+
+
+def detalhe_viagem(viagem):
+    """Dados de lista da viagem mais os colaboradores (endereço e telefone)."""
+    linha = db.session.execute(
+        consulta_viagens().where(Viagem.id == viagem.id)).one()
+    corpo = dados_viagem(linha)
+
+    ids = viagem.get_colaboradores_lista()
+    colaboradores = {}
+    if ids:
+        colaboradores = {c.id: c for c in db.session.query(
+            Colaborador.id, Colaborador.nome, Colaborador.telefone,
+            Colaborador.endereco, Colaborador.nro, Colaborador.bairro,
+            Colaborador.cidade, Colaborador.uf
+        ).filter(Colaborador.id.in_(ids))}
+    corpo['versao_api'] = VERSAO_API
+    corpo['colaboradores'] = [{
+        'id': c.id, 'nome': c.nome, 'telefone': c.telefone,
+        'endereco': c.endereco, 'nro': c.nro, 'bairro': c.bairro,
+        'cidade': c.cidade, 'uf': c.uf
+    } for c in (colaboradores.get(i) for i in ids) if c]
+    return corpo
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Criação de Solicitações em Lote - Sistema Go Mobi
+=================================================
+
+Apoio à criação de várias solicitações de uma vez (ex: supervisor enviando
+200 colaboradores para um turno) com um número fixo de consultas,
+independente da quantidade de colaboradores:
+
+- Colaboradores e turnos da planta são pré-carregados em dicionários
+  (LoteSolicitacoes); as tarifas vêm da matriz em memória (utils/tarifas)
+- As solicitações são inseridas em lote com INSERT ... ON CONFLICT DO
+  NOTHING; duplicidades (colaborador, tipo de corrida, data) são barradas
+  pelo índice único parcial e devolvidas como ignoradas
+  (gravar_solicitacoes)
+
+Uso:
+    lote = LoteSolicitacoes(planta_id, colaborador_ids, matriculas)
+    colaborador = lote.por_matricula.get('12345')
+    turno_id = lote.turno_id('1° Turno')
+    valor, repasse = lote.valores(bloco_id, turno_id)
+    ids, ignorados = gravar_solicitacoes(registros)
+
+Autor: Sistema DOUG Moving
+"""
+
+from collections import defaultdict
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+
+from .. import db
+from ..models import Colaborador, Solicitacao, Turno
+from ..models.models_processos import FILTRO_SOLICITACAO_ATIVA
+from .sql_utils import insert_com_conflito
+from .tarifas import tarifa
+
+# Coluna de horário que define a data de cada tipo de corrida
+COLUNA_HORARIO = {
+    'entrada': 'horario_entrada',
+    'saida': 'horario_saida',
+    'desligamento': 'horario_desligamento',
+}
+
+
+def data_referencia(dados):
+    """Data da corrida de uma solicitação (dict), pelo horário do seu tipo."""
+    return Solicitacao.calcular_data_referencia(
+        dados.get('tipo_corrida'), dados.get('horario_entrada'),
+        dados.get('horario_saida'), dados.get('horario_desligamento'))
+
+
+class LoteSolicitacoes:
+    """Dados pré-carregados para criar as solicitações de uma planta."""
+
+    def __init__(self, planta_id, colaborador_ids=(), matriculas=()):
+        ids = {int(i) for i in colaborador_ids if str(i).strip().isdigit()}
+        matriculas = {str(m).strip() for m in matriculas if m}
+
+        # Colaboradores por id e por matrícula, em uma consulta
+        self.colaboradores = {}
+        self.por_matricula = {}
+        if ids or matriculas:
+            for c in db.session.query(
+                Colaborador.id, Colaborador.nome, Colaborador.bloco_id,
+                Colaborador.matricula, Colaborador.planta_id, Colaborador.status
+            ).filter(or_(Colaborador.id.in_(ids), Colaborador.matricula.in_(matriculas))):
+                self.colaboradores[c.id] = c
+                self.por_matricula[c.matricula] = c
+
+        # Nome -> turno (o de menor id, se houver nomes repetidos na planta)
+        self.turnos = {}
+        self.turnos_por_id = {}
+        for turno in Turno.query.filter_by(
+                planta_id=planta_id).order_by(Turno.id):
+            self.turnos.setdefault(turno.nome, turno)
+            self.turnos_por_id[turno.id] = turno
+
+    def colaborador(self, colaborador_id):
+        """Colaborador (id, nome, bloco_id, ...) ou None se não existir."""
+        try:
+            return self.colaboradores.get(int(colaborador_id))
+        except (TypeError, ValueError):
+            return None
+
+    def turno_id(self, nome_turno):
+        """ID do turno da planta pelo nome (None se não definido)."""
+        if not nome_turno or nome_turno == 'Não definido':
+            return None
+        turno = self.turnos.get(nome_turno)
+        return turno.id if turno else None
+
+    def valores(self, bloco_id, turno_id):
+        """(valor, repasse) do bloco para o turno, ou (None, None)."""
+        turno = self.turnos_por_id.get(turno_id)
+        if not bloco_id or not turno:
+            return None, None
+
+        valor, repasse = tarifa(bloco_id, turno.nome)
+        return float(valor) if valor else None, float(repasse) if repasse else None
+
+
+def _chave(dados):
+    return (int(dados['colaborador_id']), dados['tipo_corrida'],
+            dados['data_referencia'])
+
+
+def gravar_solicitacoes(registros, tamanho_lote=500):
+    """
+    Insere as solicitações em lote, ignorando as que já existem (mesmo
+    colaborador, tipo de corrida e data, não cancelada).
+
+    A duplicidade é decidida pelo índice único parcial
+    uq_solicitacao_colaborador_tipo_data, com INSERT ... ON CONFLICT DO
+    NOTHING, o que também protege contra envios simultâneos.
+
+    Args:
+        registros (list): Dicts com as colunas de Solicitacao
+        tamanho_lote (int): Linhas por INSERT
+
+    Returns:
+        tuple: (ids criados, índices dos registros ignorados por duplicidade)
+    """
+    if not registros:
+        return [], []
+
+    # Todas as linhas com as mesmas colunas (exigência do INSERT multi-VALUES)
+    colunas = set().union(*registros)
+    normalizados = []
+    for dados in registros:
+        linha = dict.fromkeys(colunas)
+        linha.update(dados)
+        linha['data_referencia'] = data_referencia(dados)
+        normalizados.append(linha)
+    registros = normalizados
+
+    tabela = Solicitacao.__table__
+    insert = insert_com_conflito()
+    if insert is None:
+        return _gravar_com_savepoint(registros)
+
+    def instrucao(linhas):
+        comando = insert(tabela)
+        if linhas is not None:
+            comando = comando.values(linhas)
+        return comando.on_conflict_do_nothing(
+            index_elements=['colaborador_id', 'tipo_corrida', 'data_referencia'],
+            index_where=FILTRO_SOLICITACAO_ATIVA
+        )
+
+    ids, ignorados = [], []
+    for inicio in range(0, len(registros), tamanho_lote):
+        lote = registros[inicio:inicio + tamanho_lote]
+        if db.engine.dialect.name == 'postgresql':
+            # Um INSERT multi-VALUES por lote; o RETURNING informa quais
+            # linhas entraram
+            inseridas = db.session.execute(instrucao(lote).returning(
+                tabela.c.id, tabela.c.colaborador_id,
+                tabela.c.tipo_corrida, tabela.c.data_referencia))
+        else:
+            # SQLite: sem RETURNING nesta versão do SQLAlchemy. Um executemany
+            # por lote e as linhas novas são lidas pelo id (as escritas são
+            # serializadas, então os ids acima do maior anterior são deste lote)
+            anterior = db.session.query(func.max(Solicitacao.id)).scalar() or 0
+            db.session.execute(instrucao(None), lote)
+            inseridas = db.session.query(
+                Solicitacao.id, Solicitacao.colaborador_id,
+                Solicitacao.tipo_corrida, Solicitacao.data_referencia
+            ).filter(Solicitacao.id > anterior).order_by(Solicitacao.id)
+
+        por_chave = defaultdict(list)
+        for linha in inseridas:
+            por_chave[tuple(linha)[1:]].append(linha.id)
+        for i, dados in enumerate(lote, start=inicio):
+            criados = por_chave.get(_chave(dados))
+            if criados:
+                ids.append(criados.pop(0))
+            else:
+                ignorados.append(i)
+    return ids, ignorados
+
+
+def _gravar_com_savepoint(registros):
+    """Fallback portável: um INSERT por linha dentro de um SAVEPOINT."""
+    ids, ignorados = [], []
+    for i, dados in enumerate(registros):
+        try:
+            with db.session.begin_nested():
+                solicitacao = Solicitacao(**dados)
+                db.session.add(solicitacao)
+            ids.append(solicitacao.id)
+        except IntegrityError:
+            ignorados.append(i)
+    return ids, ignorados
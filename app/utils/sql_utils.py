@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Utilitários SQL compartilhados - Sistema Go Mobi
+================================================
+
+Helpers para operações em lote que dependem do banco em uso
+(PostgreSQL em produção, SQLite em desenvolvimento).
+
+Autor: Sistema DOUG Moving
+"""
+
+from .. import db
+
+
+def insert_com_conflito():
+    """
+    Retorna a função insert() do dialeto em uso com suporte a
+    ON CONFLICT (PostgreSQL e SQLite), ou None para outros bancos.
+
+    Uso:
+        insert = insert_com_conflito()
+        if insert is not None:
+            stmt = insert(tabela).values(...).on_conflict_do_update(...)
+        else:
+            ...  # fallback portável
+    """
+    dialeto = db.engine.dialect.name
+    if dialeto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialeto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
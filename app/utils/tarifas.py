@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Matriz de Tarifas (Bloco × Turno) - Sistema Go Mobi
+===================================================
+
+Valores e repasses de todos os blocos por nome de turno, carregados uma
+única vez em memória e invalidados quando um Bloco é salvo.
+
+Com vários processos (workers), salvar um Bloco também incrementa a versão
+das tarifas em 'configuracao' (chave tarifas_versao), na mesma transação.
+Cada requisição (contexto da aplicação) lê essa versão uma vez e recarrega
+a matriz se ela mudou: os outros processos não ficam com preços antigos.
+
+Também faz o re-cálculo em massa (repreciar) das solicitações ainda não
+atribuídas a motorista quando as tarifas de um bloco mudam:
+- Solicitações 'Pendente' e as agrupadas em viagens ainda sem motorista
+  recebem o valor/repasse do bloco para o seu turno (um UPDATE)
+- Essas viagens recebem o maior valor/repasse das suas solicitações
+  (outro UPDATE)
+
+Uso:
+    valor, repasse = tarifa(bloco_id, '1° Turno')
+    solicitacoes, viagens = repreciar(bloco_id)
+
+Autor: Sistema DOUG Moving
+"""
+
+import threading
+import time
+
+from flask import g
+from sqlalchemy import (
+    Integer, String, and_, case, cast, event, exists, func, insert, or_, select, update
+)
+from sqlalchemy.exc import IntegrityError
+
+from .. import db
+from ..models import Bloco, Configuracao, Solicitacao, Turno, Viagem
+
+MATRIZ_TTL = 600  # segundos
+CHAVE_VERSAO = 'tarifas_versao'
+
+_matriz = {'expira': 0, 'versao': None, 'tarifas': {}}
+_matriz_lock = threading.Lock()
+
+
+def invalidar_tarifas(*args):
+    """Descarta a matriz em memória (aceita os argumentos dos eventos)."""
+    with _matriz_lock:
+        _matriz['expira'] = 0
+
+
+def _incrementar_versao(mapper, connection, target):
+    """Bloco salvo: nova versão das tarifas para todos os processos."""
+    invalidar_tarifas()
+    tabela = Configuracao.__table__
+    incremento = update(tabela).where(tabela.c.chave == CHAVE_VERSAO).values(
+        valor=cast(cast(tabela.c.valor, Integer) + 1, String))
+    if connection.execute(incremento).rowcount:
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(tabela).values(chave=CHAVE_VERSAO, valor='1'))
+    except IntegrityError:
+        # Outra transação criou a chave ao mesmo tempo
+        connection.execute(incremento)
+
+
+def _versao_tarifas():
+    """Versão das tarifas no banco, lida uma vez por contexto da aplicação."""
+    if 'versao_tarifas' not in g:
+        g.versao_tarifas = db.session.query(Configuracao.valor).filter(
+            Configuracao.chave == CHAVE_VERSAO).scalar()
+    return g.versao_tarifas
+
+
+def _carregar_matriz():
+    """{(bloco_id, nome do turno): (valor, repasse)} de todos os blocos."""
+    colunas = [Bloco.id]
+    for campo_valor, campo_repasse in Bloco.CAMPOS_TARIFA.values():
+        colunas += [getattr(Bloco, campo_valor), getattr(Bloco, campo_repasse)]
+
+    tarifas = {}
+    for linha in db.session.query(*colunas):
+        for nome_turno, (campo_valor, campo_repasse) in Bloco.CAMPOS_TARIFA.items():
+            tarifas[(linha.id, nome_turno)] = (
+                getattr(linha, campo_valor), getattr(linha, campo_repasse))
+    return tarifas
+
+
+def tarifa(bloco_id, nome_turno):
+    """
+    Valor e repasse do bloco para o turno.
+
+    Returns:
+        tuple: (valor, repasse) em Decimal, ou (None, None) se o bloco ou o
+        turno não existirem
+    """
+    agora = time.monotonic()
+    versao = _versao_tarifas()
+    if _matriz['expira'] <= agora or _matriz['versao'] != versao:
+        tarifas = _carregar_matriz()
+        with _matriz_lock:
+            _matriz['tarifas'] = tarifas
+            _matriz['versao'] = versao
+            _matriz['expira'] = agora + MATRIZ_TTL
+    return _matriz['tarifas'].get((bloco_id, nome_turno), (None, None))
+
+
+for _evento in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Bloco, _evento, _incrementar_versao)
+
+
+# =============================================================================
+# RE-CÁLCULO EM MASSA
+# =============================================================================
+
+def _tarifa_sql(indice):
+    """
+    Subconsulta com a tarifa do bloco da solicitação para o seu turno
+    principal (indice 0 = valor, 1 = repasse); zero vira NULL, como na
+    criação da solicitação.
+    """
+    turno_principal = func.coalesce(
+        Solicitacao.turno_entrada_id, Solicitacao.turno_saida_id,
+        Solicitacao.turno_desligamento_id)
+    por_turno = case(
+        *[(Turno.nome == nome, getattr(Bloco, campos[indice]))
+          for nome, campos in Bloco.CAMPOS_TARIFA.items()]
+    )
+    return select(func.nullif(por_turno, 0)).where(
+        Bloco.id == Solicitacao.bloco_id,
+        Turno.id == turno_principal
+    ).scalar_subquery()
+
+
+def repreciar(bloco_id=None):
+    """
+    Aplica as tarifas atuais às solicitações e viagens ainda não atribuídas
+    a motorista, com UPDATEs em massa. Não faz commit.
+
+    Args:
+        bloco_id (int): Restringe ao bloco (None = todos os blocos)
+
+    Returns:
+        tuple: (solicitações atualizadas, viagens atualizadas)
+    """
+    viagens_sem_motorista = select(Viagem.id).where(
+        Viagem.status == 'Pendente', Viagem.motorista_id.is_(None))
+
+    filtros = [
+        or_(Solicitacao.turno_entrada_id.isnot(None),
+            Solicitacao.turno_saida_id.isnot(None),
+            Solicitacao.turno_desligamento_id.isnot(None)),
+        or_(Solicitacao.status == 'Pendente',
+            Solicitacao.viagem_id.in_(viagens_sem_motorista)),
+    ]
+    if bloco_id is not None:
+        filtros.append(Solicitacao.bloco_id == bloco_id)
+
+    solicitacoes = db.session.execute(
+        update(Solicitacao).where(*filtros).values(
+            valor=_tarifa_sql(0),
+            valor_repasse=_tarifa_sql(1)
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+
+    # Viagens: maior valor entre as suas solicitações (não soma)
+    da_viagem = Solicitacao.viagem_id == Viagem.id
+    condicao = [da_viagem]
+    if bloco_id is not None:
+        condicao.append(Solicitacao.bloco_id == bloco_id)
+    viagens = db.session.execute(
+        update(Viagem).where(
+            Viagem.status == 'Pendente',
+            Viagem.motorista_id.is_(None),
+            exists().where(and_(*condicao))
+        ).values(
+            valor=select(func.max(Solicitacao.valor)).where(
+                da_viagem).scalar_subquery(),
+            valor_repasse=select(func.max(Solicitacao.valor_repasse)).where(
+                da_viagem).scalar_subquery()
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+
+    return solicitacoes, viagens
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Normalização de Texto - Sistema Go Mobi
+=======================================
+
+Funções para comparar nomes digitados pelos usuários com os cadastros
+independentemente de acentos, maiúsculas e pontuação.
+
+Autor: Sistema DOUG Moving
+"""
+
+import re
+import unicodedata
+
+_PONTUACAO = re.compile(r'[^\w\s]')
+_ESPACOS = re.compile(r'\s+')
+# Bloco Unicode 'Combining Diacritical Marks' (acentos, til, cedilha)
+_ACENTOS = re.compile('[\u0300-\u036f]')
+
+
+def remover_acentos(texto):
+    """Remove os acentos do texto. Ex: 'Itapuã' -> 'Itapua'."""
+    if texto.isascii():
+        return texto
+    # NFD separa a letra do acento, que é descartado
+    return _ACENTOS.sub('', unicodedata.normalize('NFD', texto))
+
+
+def normalizar_texto(texto):
+    """
+    Normaliza o texto para comparação: sem acentos, minúsculo, sem
+    pontuação e com espaços simples.
+
+    Exemplo: 'JD. ITAPUÃ' -> 'jd itapua'
+    """
+    if not texto:
+        return ''
+    texto = remover_acentos(texto).lower()
+    texto = _PONTUACAO.sub('', texto)
+    return _ESPACOS.sub(' ', texto).strip()
+
+
+def normalizar_busca(texto):
+    """
+    Normaliza um termo de busca: sem acentos, minúsculo e com espaços
+    simples. Diferente de normalizar_texto, preserva a pontuação (e-mails,
+    CPF/CNPJ, placas).
+
+    Exemplo: '  José  da Conceição ' -> 'jose da conceicao'
+    """
+    if not texto:
+        return ''
+    return _ESPACOS.sub(' ', remover_acentos(texto).lower()).strip()
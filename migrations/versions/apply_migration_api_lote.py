@@ -0,0 +1,69 @@
+"""
+Script para aplicar a estrutura da API de integração.
+
+Este script:
+1. Adiciona a coluna 'api_token_hash' na tabela 'user' (token de acesso à
+   API, gerado com 'flask gerar-token-api <email>')
+2. Cria o índice único de 'api_token_hash'
+3. Cria a tabela 'api_idempotencia' (respostas guardadas por Idempotency-Key)
+
+Compatível com SQLite (desenvolvimento) e PostgreSQL (produção).
+"""
+
+from app import create_app, db
+from app.models import ApiIdempotencia
+from sqlalchemy import text, inspect
+
+
+def aplicar_migration():
+    """Aplica a migration da API de integração."""
+    app = create_app()
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATION: API de integração (token e idempotência)")
+        print("=" * 80)
+
+        try:
+            print("\n1️⃣ Adicionando coluna 'api_token_hash' em 'user'...")
+            colunas = [c['name'] for c in inspect(db.engine).get_columns('user')]
+            if 'api_token_hash' not in colunas:
+                db.session.execute(text(
+                    'ALTER TABLE "user" ADD COLUMN api_token_hash VARCHAR(64)'))
+                db.session.commit()
+                print("   ✅ Coluna 'api_token_hash' adicionada com sucesso!")
+            else:
+                print("   ⚠️  Coluna 'api_token_hash' já existe. Pulando...")
+
+            print("\n2️⃣ Criando índice único do token...")
+            db.session.execute(text(
+                'CREATE UNIQUE INDEX IF NOT EXISTS uq_user_api_token_hash '
+                'ON "user" (api_token_hash)'))
+            db.session.commit()
+            print("   ✅ Índice 'uq_user_api_token_hash' criado!")
+
+            print("\n3️⃣ Criando tabela 'api_idempotencia'...")
+            if 'api_idempotencia' not in inspect(db.engine).get_table_names():
+                ApiIdempotencia.__table__.create(db.engine)
+                print("   ✅ Tabela 'api_idempotencia' criada com sucesso!")
+            else:
+                print("   ⚠️  Tabela 'api_idempotencia' já existe. Pulando...")
+
+            print("\n" + "=" * 80)
+            print("✅ MIGRATION CONCLUÍDA COM SUCESSO!")
+            print("=" * 80)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ ERRO ao aplicar migration: {str(e)}")
+            print("\nDetalhes do erro:")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return True
+
+
+if __name__ == '__main__':
+    sucesso = aplicar_migration()
+    exit(0 if sucesso else 1)
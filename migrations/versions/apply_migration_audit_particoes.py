@@ -0,0 +1,148 @@
+"""
+Script para aplicar o particionamento mensal das tabelas de auditoria.
+
+Este script:
+1. Cria a tabela 'audit_arquivo' (catálogo dos meses arquivados)
+2. PostgreSQL: converte 'audit_log' e 'viagem_auditoria' em tabelas
+   particionadas por RANGE(timestamp), com uma partição por mês e uma
+   partição DEFAULT, copiando os registros existentes
+3. SQLite: mantém as tabelas (o índice de timestamp delimita as
+   partições lógicas usadas pela retenção)
+
+Depois de aplicado, agende `flask audit-retencao` (ex: diariamente) para
+criar as partições futuras e arquivar os meses fora da retenção.
+
+Compatível com SQLite (desenvolvimento) e PostgreSQL (produção).
+"""
+
+from app import create_app, db
+from app.models import AuditArquivo
+from app.utils.audit_particoes import (
+    TABELAS_AUDITORIA, inicio_mes, somar_meses, criar_particao,
+    tabela_particionada
+)
+from sqlalchemy import text, inspect
+from datetime import datetime
+import os
+
+# Chaves estrangeiras e índices recriados na tabela particionada
+ESTRUTURA = {
+    'audit_log': {
+        'fks': [('user_id', '"user"(id)')],
+        'indices': ['timestamp', 'user_id', 'action', 'resource_type',
+                    'resource_id'],
+    },
+    'viagem_auditoria': {
+        'fks': [('viagem_id', 'viagem(id)'), ('user_id', '"user"(id)'),
+                ('motorista_id', 'motorista(id)')],
+        'indices': ['timestamp', 'viagem_id', 'motorista_id', 'action'],
+    },
+}
+
+
+def verificar_tabela_existe(tabela):
+    """Verifica se uma tabela existe no banco de dados."""
+    inspector = inspect(db.engine)
+    return tabela in inspector.get_table_names()
+
+
+def particionar_tabela(tabela):
+    """Converte uma tabela de auditoria em tabela particionada (PostgreSQL)."""
+    legado = f'{tabela}_legado'
+    estrutura = ESTRUTURA[tabela]
+
+    db.session.execute(text(f'ALTER TABLE {tabela} RENAME TO {legado}'))
+    db.session.execute(text(f"""
+        CREATE TABLE {tabela} (
+            LIKE {legado} INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+        ) PARTITION BY RANGE ("timestamp")
+    """))
+    # A chave primária de uma tabela particionada inclui a chave de partição
+    db.session.execute(text(
+        f'ALTER TABLE {tabela} ADD PRIMARY KEY (id, "timestamp")'))
+
+    # Uma partição por mês desde o registro mais antigo até 2 meses à frente
+    mais_antigo = db.session.execute(
+        text(f'SELECT MIN("timestamp") FROM {legado}')).scalar()
+    atual = inicio_mes(datetime.utcnow())
+    inicio = inicio_mes(mais_antigo) if mais_antigo else atual
+    while inicio <= somar_meses(atual, 2):
+        criar_particao(tabela, inicio)
+        inicio = somar_meses(inicio, 1)
+    db.session.execute(text(
+        f'CREATE TABLE IF NOT EXISTS {tabela}_default '
+        f'PARTITION OF {tabela} DEFAULT'))
+
+    db.session.execute(text(f'INSERT INTO {tabela} SELECT * FROM {legado}'))
+
+    # A sequence do id passa a pertencer à nova tabela antes do DROP
+    db.session.execute(text(
+        f'ALTER SEQUENCE {tabela}_id_seq OWNED BY {tabela}.id'))
+    db.session.execute(text(f'DROP TABLE {legado}'))
+
+    for coluna, referencia in estrutura['fks']:
+        db.session.execute(text(
+            f'ALTER TABLE {tabela} ADD FOREIGN KEY ({coluna}) '
+            f'REFERENCES {referencia}'))
+    for coluna in estrutura['indices']:
+        db.session.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{tabela}_{coluna} '
+            f'ON {tabela} ("{coluna}")'))
+
+
+def aplicar_migration():
+    """Aplica a migration de particionamento da auditoria."""
+    app = create_app()
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATION: Particionamento mensal da auditoria")
+        print("=" * 80)
+
+        db_url = os.environ.get('DATABASE_URL', 'sqlite:///doug_moving.db')
+        is_postgres = 'postgresql' in db_url
+
+        print(f"\n📊 Banco de dados: {'PostgreSQL' if is_postgres else 'SQLite'}")
+
+        try:
+            # 1. Catálogo de arquivos
+            print("\n1️⃣ Criando tabela 'audit_arquivo'...")
+            if not verificar_tabela_existe('audit_arquivo'):
+                AuditArquivo.__table__.create(db.engine)
+                print("   ✅ Tabela 'audit_arquivo' criada com sucesso!")
+            else:
+                print("   ⚠️  Tabela 'audit_arquivo' já existe. Pulando...")
+
+            # 2. Particionamento
+            print("\n2️⃣ Particionando tabelas de auditoria...")
+            if not is_postgres:
+                print("   ⚠️  SQLite não suporta particionamento nativo.")
+                print("      As partições mensais são lógicas (índice de timestamp).")
+            else:
+                for tabela in TABELAS_AUDITORIA:
+                    if tabela_particionada(tabela):
+                        print(f"   ⚠️  '{tabela}' já é particionada. Pulando...")
+                        continue
+                    particionar_tabela(tabela)
+                    db.session.commit()
+                    print(f"   ✅ '{tabela}' particionada por mês!")
+
+            print("\n" + "=" * 80)
+            print("✅ MIGRATION CONCLUÍDA COM SUCESSO!")
+            print("=" * 80)
+            print("\n📋 Próximo passo: agendar 'flask audit-retencao'.")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ ERRO ao aplicar migration: {str(e)}")
+            print("\nDetalhes do erro:")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return True
+
+
+if __name__ == '__main__':
+    sucesso = aplicar_migration()
+    exit(0 if sucesso else 1)
@@ -0,0 +1,57 @@
+"""
+Script para aplicar o rollup diário da auditoria.
+
+Este script:
+1. Cria a tabela 'audit_resumo_diario' (dia × ação × usuário × severidade)
+2. Popula o rollup a partir do audit_log existente
+
+A partir daí o rollup é mantido incrementalmente por log_audit().
+
+Compatível com SQLite (desenvolvimento) e PostgreSQL (produção).
+"""
+
+from app import create_app, db
+from app.models import AuditResumoDiario
+from app.utils.admin_audit import reconstruir_resumo_diario
+from sqlalchemy import inspect
+
+
+def aplicar_migration():
+    """Aplica a migration do rollup diário da auditoria."""
+    app = create_app()
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATION: Rollup diário da auditoria")
+        print("=" * 80)
+
+        try:
+            print("\n1️⃣ Criando tabela 'audit_resumo_diario'...")
+            if 'audit_resumo_diario' not in inspect(db.engine).get_table_names():
+                AuditResumoDiario.__table__.create(db.engine)
+                print("   ✅ Tabela 'audit_resumo_diario' criada com sucesso!")
+            else:
+                print("   ⚠️  Tabela 'audit_resumo_diario' já existe. Recalculando...")
+
+            print("\n2️⃣ Populando rollup a partir do audit_log...")
+            linhas = reconstruir_resumo_diario()
+            print(f"   ✅ {linhas} linhas gravadas no rollup!")
+
+            print("\n" + "=" * 80)
+            print("✅ MIGRATION CONCLUÍDA COM SUCESSO!")
+            print("=" * 80)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ ERRO ao aplicar migration: {str(e)}")
+            print("\nDetalhes do erro:")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return True
+
+
+if __name__ == '__main__':
+    sucesso = aplicar_migration()
+    exit(0 if sucesso else 1)
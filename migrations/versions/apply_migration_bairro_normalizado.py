@@ -0,0 +1,80 @@
+"""
+Script para aplicar o nome normalizado dos bairros.
+
+Este script:
+1. Adiciona a coluna 'nome_normalizado' na tabela 'bairro'
+2. Cria o índice 'ix_bairro_nome_normalizado'
+3. Preenche a coluna para os bairros existentes (sem acentos, minúsculo,
+   sem pontuação - ex: 'JD. ITAPUÃ' -> 'jd itapua')
+
+A partir daí a coluna é mantida pelo modelo Bairro a cada alteração do nome.
+
+Compatível com SQLite (desenvolvimento) e PostgreSQL (produção).
+"""
+
+from app import create_app, db
+from app.utils.texto import normalizar_texto
+from sqlalchemy import text, inspect
+
+
+def aplicar_migration():
+    """Aplica a migration do nome normalizado dos bairros."""
+    app = create_app()
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATION: Nome normalizado dos bairros")
+        print("=" * 80)
+
+        try:
+            inspector = inspect(db.engine)
+
+            print("\n1️⃣ Adicionando coluna 'nome_normalizado'...")
+            colunas = [c['name'] for c in inspector.get_columns('bairro')]
+            if 'nome_normalizado' not in colunas:
+                db.session.execute(text(
+                    'ALTER TABLE bairro ADD COLUMN nome_normalizado VARCHAR(100)'))
+                db.session.commit()
+                print("   ✅ Coluna 'nome_normalizado' adicionada com sucesso!")
+            else:
+                print("   ⚠️  Coluna 'nome_normalizado' já existe. Pulando...")
+
+            print("\n2️⃣ Criando índice 'ix_bairro_nome_normalizado'...")
+            db.session.execute(text(
+                'CREATE INDEX IF NOT EXISTS ix_bairro_nome_normalizado '
+                'ON bairro (nome_normalizado)'))
+            db.session.commit()
+            print("   ✅ Índice criado!")
+
+            print("\n3️⃣ Preenchendo nomes normalizados...")
+            linhas = db.session.execute(
+                text('SELECT id, nome FROM bairro')).fetchall()
+            atualizacoes = [
+                {'id': linha.id, 'nome_normalizado': normalizar_texto(linha.nome)}
+                for linha in linhas
+            ]
+            if atualizacoes:
+                db.session.execute(text(
+                    'UPDATE bairro SET nome_normalizado = :nome_normalizado '
+                    'WHERE id = :id'), atualizacoes)
+            db.session.commit()
+            print(f"   ✅ {len(atualizacoes)} bairros atualizados!")
+
+            print("\n" + "=" * 80)
+            print("✅ MIGRATION CONCLUÍDA COM SUCESSO!")
+            print("=" * 80)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ ERRO ao aplicar migration: {str(e)}")
+            print("\nDetalhes do erro:")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return True
+
+
+if __name__ == '__main__':
+    sucesso = aplicar_migration()
+    exit(0 if sucesso else 1)
@@ -0,0 +1,101 @@
+"""
+Script para aplicar os índices de busca textual (trigramas).
+
+Este script (PostgreSQL):
+1. Habilita as extensões 'pg_trgm' e 'unaccent'
+2. Cria a função f_unaccent(text), wrapper IMMUTABLE de unaccent()
+   (necessária para usar a função em índices)
+3. Cria índices GIN de trigramas sobre lower(f_unaccent(coluna)) nas
+   colunas usadas pelas buscas das listagens e do autocomplete
+
+Deve ser aplicado ANTES do deploy que usa app/utils/busca.py, pois os
+filtros de busca chamam f_unaccent().
+
+No SQLite (desenvolvimento) nada é criado: f_unaccent é registrada em cada
+conexão pela aplicação e o autocomplete usa um índice em memória.
+"""
+
+from app import create_app, db
+from sqlalchemy import text
+import os
+
+# (tabela, coluna) com índice de trigramas sobre lower(f_unaccent(coluna))
+COLUNAS_BUSCA = [
+    ('colaborador', 'nome'),
+    ('colaborador', 'matricula'),
+    ('supervisor', 'nome'),
+    ('supervisor', 'matricula'),
+    ('gerente', 'nome'),
+    ('motorista', 'nome'),
+    ('motorista', 'veiculo_placa'),
+    ('bloco', 'nome_bloco'),
+]
+
+
+def aplicar_migration():
+    """Aplica a migration dos índices de busca textual."""
+    app = create_app()
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATION: Índices de busca textual (trigramas)")
+        print("=" * 80)
+
+        db_url = os.environ.get('DATABASE_URL', 'sqlite:///doug_moving.db')
+        is_postgres = 'postgresql' in db_url
+
+        print(f"\n📊 Banco de dados: {'PostgreSQL' if is_postgres else 'SQLite'}")
+
+        if not is_postgres:
+            print("\n⚠️  SQLite: nada a aplicar (busca usa índice em memória).")
+            return True
+
+        try:
+            print("\n1️⃣ Habilitando extensões 'pg_trgm' e 'unaccent'...")
+            db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            db.session.execute(text('CREATE EXTENSION IF NOT EXISTS unaccent'))
+            print("   ✅ Extensões habilitadas!")
+
+            print("\n2️⃣ Criando função f_unaccent()...")
+            db.session.execute(text("""
+                CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+                AS $$ SELECT public.unaccent('public.unaccent', $1) $$
+                LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+            """))
+            db.session.commit()
+            print("   ✅ Função criada!")
+
+            print("\n3️⃣ Criando índices GIN de trigramas...")
+            for tabela, coluna in COLUNAS_BUSCA:
+                indice = f'ix_{tabela}_{coluna}_trgm'
+                db.session.execute(text(
+                    f'CREATE INDEX IF NOT EXISTS {indice} ON "{tabela}" '
+                    f'USING gin (lower(f_unaccent({coluna})) gin_trgm_ops)'))
+                db.session.commit()
+                print(f"   ✅ {indice}")
+
+            # Bairros já têm o nome normalizado em coluna própria
+            db.session.execute(text(
+                'CREATE INDEX IF NOT EXISTS ix_bairro_nome_normalizado_trgm '
+                'ON bairro USING gin (nome_normalizado gin_trgm_ops)'))
+            db.session.commit()
+            print("   ✅ ix_bairro_nome_normalizado_trgm")
+
+            print("\n" + "=" * 80)
+            print("✅ MIGRATION CONCLUÍDA COM SUCESSO!")
+            print("=" * 80)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ ERRO ao aplicar migration: {str(e)}")
+            print("\nDetalhes do erro:")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return True
+
+
+if __name__ == '__main__':
+    sucesso = aplicar_migration()
+    exit(0 if sucesso else 1)
@@ -0,0 +1,59 @@
+"""
+Script para aplicar os índices de viagem_id dos vínculos financeiros.
+
+Este script:
+1. Cria o índice 'ix_fin_receber_viagens_viagem_id'
+2. Cria o índice 'ix_fin_pagar_viagens_viagem_id'
+
+Usados na busca das viagens ainda sem título a receber / a pagar
+(NOT EXISTS, ver app/services/financeiro.py). A constraint única
+(título, viagem) começa pelo título e não atende essa busca.
+
+Compatível com SQLite (desenvolvimento) e PostgreSQL (produção).
+"""
+
+from app import create_app, db
+from sqlalchemy import text
+
+
+INDICES = [
+    ('ix_fin_receber_viagens_viagem_id', 'fin_receber_viagens'),
+    ('ix_fin_pagar_viagens_viagem_id', 'fin_pagar_viagens'),
+]
+
+
+def aplicar_migration():
+    """Aplica a migration dos índices financeiros."""
+    app = create_app()
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATION: Índices de viagem_id nos vínculos financeiros")
+        print("=" * 80)
+
+        try:
+            for passo, (indice, tabela) in enumerate(INDICES, start=1):
+                print(f"\n{passo}️⃣ Criando índice '{indice}'...")
+                db.session.execute(text(
+                    f'CREATE INDEX IF NOT EXISTS {indice} ON {tabela} (viagem_id)'))
+                db.session.commit()
+                print(f"   ✅ Índice '{indice}' criado!")
+
+            print("\n" + "=" * 80)
+            print("✅ MIGRATION CONCLUÍDA COM SUCESSO!")
+            print("=" * 80)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ ERRO ao aplicar migration: {str(e)}")
+            print("\nDetalhes do erro:")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return True
+
+
+if __name__ == '__main__':
+    sucesso = aplicar_migration()
+    exit(0 if sucesso else 1)
@@ -0,0 +1,62 @@
+"""
+Script para aplicar a tabela de linhas fixas (solicitações recorrentes).
+
+Este script:
+1. Cria a tabela 'linha_fixa' (colaborador, turno, tipo de corrida, dias
+   da semana e vigência), com o índice por colaborador
+2. Cria o índice parcial das linhas ativas, usado pelo agendador
+
+Depois, agende diariamente: flask gerar-linhas-fixas --dias 7
+
+Compatível com SQLite (desenvolvimento) e PostgreSQL (produção).
+"""
+
+from app import create_app, db
+from app.models import LinhaFixa
+from sqlalchemy import text, inspect
+
+
+def aplicar_migration():
+    """Aplica a migration das linhas fixas."""
+    app = create_app()
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATION: Linhas fixas (solicitações recorrentes)")
+        print("=" * 80)
+
+        try:
+            print("\n1️⃣ Criando tabela 'linha_fixa'...")
+            if 'linha_fixa' not in inspect(db.engine).get_table_names():
+                LinhaFixa.__table__.create(db.engine)
+                print("   ✅ Tabela 'linha_fixa' criada com sucesso!")
+            else:
+                print("   ⚠️  Tabela 'linha_fixa' já existe. Pulando...")
+
+            print("\n2️⃣ Criando índice das linhas ativas...")
+            db.session.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_linha_fixa_ativa
+                ON linha_fixa (gerado_ate, data_inicio)
+                WHERE ativa
+            """))
+            db.session.commit()
+            print("   ✅ Índice 'idx_linha_fixa_ativa' criado!")
+
+            print("\n" + "=" * 80)
+            print("✅ MIGRATION CONCLUÍDA COM SUCESSO!")
+            print("=" * 80)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ ERRO ao aplicar migration: {str(e)}")
+            print("\nDetalhes do erro:")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return True
+
+
+if __name__ == '__main__':
+    sucesso = aplicar_migration()
+    exit(0 if sucesso else 1)
@@ -0,0 +1,51 @@
+"""
+Script para aplicar a fila persistente de notificações (outbox).
+
+Este script:
+1. Cria a tabela 'notificacao_outbox' (mensagens WhatsApp gravadas na
+   mesma transação da alteração da viagem e enviadas pelo worker
+   'flask worker-notificacoes')
+
+Compatível com SQLite (desenvolvimento) e PostgreSQL (produção).
+"""
+
+from app import create_app, db
+from app.models import NotificacaoOutbox
+from sqlalchemy import inspect
+
+
+def aplicar_migration():
+    """Aplica a migration da fila de notificações."""
+    app = create_app()
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATION: Fila persistente de notificações (notificacao_outbox)")
+        print("=" * 80)
+
+        try:
+            print("\n1️⃣ Criando tabela 'notificacao_outbox'...")
+            if 'notificacao_outbox' not in inspect(db.engine).get_table_names():
+                NotificacaoOutbox.__table__.create(db.engine)
+                print("   ✅ Tabela 'notificacao_outbox' criada com sucesso!")
+            else:
+                print("   ⚠️  Tabela 'notificacao_outbox' já existe. Pulando...")
+
+            print("\n" + "=" * 80)
+            print("✅ MIGRATION CONCLUÍDA COM SUCESSO!")
+            print("=" * 80)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ ERRO ao aplicar migration: {str(e)}")
+            print("\nDetalhes do erro:")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return True
+
+
+if __name__ == '__main__':
+    sucesso = aplicar_migration()
+    exit(0 if sucesso else 1)
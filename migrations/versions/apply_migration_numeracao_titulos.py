@@ -0,0 +1,100 @@
+"""
+Script para aplicar a numeração dos títulos financeiros no banco.
+
+Este script:
+1. PostgreSQL: cria as sequences do ano atual ('fin_titulo_rec_2026_seq',
+   'fin_titulo_pag_2026_seq'), começando depois do maior número já usado
+   no ano, e remove as sequences sem ano de uma versão anterior
+2. SQLite: cria a tabela 'fin_numeracao' com o contador de cada série
+   (REC e PAG) no ano atual, a partir do maior número já usado no ano.
+   Uma tabela de uma versão anterior, sem a coluna 'ano', é recriada
+
+Sem esta migration os contadores são criados na primeira geração de
+título do ano (ver app/utils/numeracao.py).
+
+Compatível com SQLite (desenvolvimento) e PostgreSQL (produção).
+"""
+
+from datetime import date
+
+from app import create_app, db
+from app.models import FinNumeracao
+from app.utils.numeracao import SERIES, maior_numero_usado, nome_sequence
+from sqlalchemy import inspect, text
+
+
+def aplicar_migration():
+    """Aplica a migration da numeração dos títulos."""
+    app = create_app()
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATION: Numeração dos títulos financeiros (REC/PAG)")
+        print("=" * 80)
+
+        ano = date.today().year
+
+        try:
+            if db.engine.dialect.name == 'postgresql':
+                print(f"\n1️⃣ Criando sequences da numeração de {ano}...")
+                for serie in SERIES:
+                    nome = nome_sequence(serie, ano)
+                    existe = db.session.execute(
+                        text('SELECT to_regclass(:nome)'), {'nome': nome}).scalar()
+                    if existe is not None:
+                        print(f"   ⚠️  Sequence '{nome}' já existe. Pulando...")
+                        continue
+                    inicio = maior_numero_usado(serie, ano) + 1
+                    db.session.execute(text(
+                        f'CREATE SEQUENCE {nome} START WITH {inicio}'))
+                    print(f"   ✅ Sequence '{nome}' criada (próximo número: {inicio})")
+
+                print("\n2️⃣ Removendo sequences sem ano...")
+                for serie in SERIES:
+                    nome = f'fin_titulo_{serie.lower()}_seq'
+                    db.session.execute(text(f'DROP SEQUENCE IF EXISTS {nome}'))
+                    print(f"   ✅ Sequence '{nome}' removida (se existia)")
+            else:
+                print("\n1️⃣ Criando tabela 'fin_numeracao'...")
+                inspetor = inspect(db.engine)
+                if 'fin_numeracao' in inspetor.get_table_names() and 'ano' not in {
+                        coluna['name'] for coluna in inspetor.get_columns('fin_numeracao')}:
+                    # Contadores sem ano: são refeitos a partir dos títulos
+                    db.session.execute(text('DROP TABLE fin_numeracao'))
+                    db.session.commit()
+                    print("   ⚠️  Tabela sem a coluna 'ano' removida para ser recriada")
+                if 'fin_numeracao' not in inspect(db.engine).get_table_names():
+                    FinNumeracao.__table__.create(db.engine)
+                    print("   ✅ Tabela 'fin_numeracao' criada com sucesso!")
+                else:
+                    print("   ⚠️  Tabela 'fin_numeracao' já existe. Pulando...")
+
+                print(f"\n2️⃣ Iniciando contadores de {ano}...")
+                for serie in SERIES:
+                    if db.session.get(FinNumeracao, (serie, ano)):
+                        print(f"   ⚠️  Contador '{serie}-{ano}' já existe. Pulando...")
+                        continue
+                    ultimo = maior_numero_usado(serie, ano)
+                    db.session.add(FinNumeracao(serie=serie, ano=ano, ultimo=ultimo))
+                    print(f"   ✅ Contador '{serie}-{ano}' iniciado em {ultimo}")
+
+            db.session.commit()
+
+            print("\n" + "=" * 80)
+            print("✅ MIGRATION CONCLUÍDA COM SUCESSO!")
+            print("=" * 80)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ ERRO ao aplicar migration: {str(e)}")
+            print("\nDetalhes do erro:")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return True
+
+
+if __name__ == '__main__':
+    sucesso = aplicar_migration()
+    exit(0 if sucesso else 1)
@@ -0,0 +1,59 @@
+"""
+Script para aplicar os índices da paginação das contas a receber / a pagar.
+
+Este script:
+1. Cria o índice 'idx_fin_contas_receber_vencimento' (data_vencimento, id)
+2. Cria o índice 'idx_fin_contas_pagar_vencimento' (data_vencimento, id)
+
+Usados pelas listagens paginadas por chave (ver pagina_titulos em
+app/services/financeiro.py): cada página é lida pelo índice a partir do
+último título exibido.
+
+Compatível com SQLite (desenvolvimento) e PostgreSQL (produção).
+"""
+
+from app import create_app, db
+from sqlalchemy import text
+
+
+INDICES = [
+    ('idx_fin_contas_receber_vencimento', 'fin_contas_receber'),
+    ('idx_fin_contas_pagar_vencimento', 'fin_contas_pagar'),
+]
+
+
+def aplicar_migration():
+    """Aplica a migration dos índices da paginação financeira."""
+    app = create_app()
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATION: Índices da paginação de contas a receber / a pagar")
+        print("=" * 80)
+
+        try:
+            for passo, (indice, tabela) in enumerate(INDICES, start=1):
+                print(f"\n{passo}️⃣ Criando índice '{indice}'...")
+                db.session.execute(text(
+                    f'CREATE INDEX IF NOT EXISTS {indice} ON {tabela} (data_vencimento, id)'))
+                db.session.commit()
+                print(f"   ✅ Índice '{indice}' criado!")
+
+            print("\n" + "=" * 80)
+            print("✅ MIGRATION CONCLUÍDA COM SUCESSO!")
+            print("=" * 80)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ ERRO ao aplicar migration: {str(e)}")
+            print("\nDetalhes do erro:")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return True
+
+
+if __name__ == '__main__':
+    sucesso = aplicar_migration()
+    exit(0 if sucesso else 1)
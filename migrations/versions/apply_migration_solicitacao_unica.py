@@ -0,0 +1,97 @@
+"""
+Script para aplicar o índice único de solicitações por colaborador/tipo/dia.
+
+Este script:
+1. Adiciona a coluna 'data_referencia' na tabela 'solicitacao'
+2. Preenche a coluna com a data do horário correspondente ao tipo de corrida
+3. Verifica se já existem duplicidades ativas (mesmo colaborador, tipo e
+   data, status diferente de 'Cancelada') - se houver, lista os casos e
+   interrompe sem criar o índice
+4. Cria o índice único parcial 'uq_solicitacao_colaborador_tipo_data'
+   (colaborador_id, tipo_corrida, data_referencia) WHERE status <> 'Cancelada'
+
+Compatível com SQLite (desenvolvimento) e PostgreSQL (produção).
+"""
+
+from app import create_app, db
+from sqlalchemy import text, inspect
+
+
+def aplicar_migration():
+    """Aplica a migration do índice único de solicitações."""
+    app = create_app()
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATION: Índice único de solicitações (colaborador/tipo/dia)")
+        print("=" * 80)
+
+        try:
+            print("\n1️⃣ Adicionando coluna 'data_referencia'...")
+            colunas = [c['name']
+                       for c in inspect(db.engine).get_columns('solicitacao')]
+            if 'data_referencia' not in colunas:
+                db.session.execute(text(
+                    'ALTER TABLE solicitacao ADD COLUMN data_referencia DATE'))
+                db.session.commit()
+                print("   ✅ Coluna 'data_referencia' adicionada com sucesso!")
+            else:
+                print("   ⚠️  Coluna 'data_referencia' já existe. Pulando...")
+
+            print("\n2️⃣ Preenchendo 'data_referencia'...")
+            resultado = db.session.execute(text("""
+                UPDATE solicitacao SET data_referencia = CASE tipo_corrida
+                    WHEN 'saida' THEN DATE(horario_saida)
+                    WHEN 'desligamento' THEN DATE(horario_desligamento)
+                    ELSE DATE(horario_entrada)
+                END
+            """))
+            db.session.commit()
+            print(f"   ✅ {resultado.rowcount} solicitações atualizadas!")
+
+            print("\n3️⃣ Verificando duplicidades ativas...")
+            duplicadas = db.session.execute(text("""
+                SELECT colaborador_id, tipo_corrida, data_referencia, COUNT(*) AS total
+                FROM solicitacao
+                WHERE status <> 'Cancelada' AND data_referencia IS NOT NULL
+                GROUP BY colaborador_id, tipo_corrida, data_referencia
+                HAVING COUNT(*) > 1
+                ORDER BY data_referencia
+            """)).fetchall()
+            if duplicadas:
+                print(f"   ❌ {len(duplicadas)} duplicidades encontradas:")
+                for d in duplicadas[:50]:
+                    print(f"      colaborador {d.colaborador_id} | {d.tipo_corrida} | "
+                          f"{d.data_referencia} | {d.total} solicitações")
+                print("\n   Cancele (ou exclua) as solicitações excedentes e rode "
+                      "novamente este script.")
+                return False
+            print("   ✅ Nenhuma duplicidade.")
+
+            print("\n4️⃣ Criando índice único parcial...")
+            db.session.execute(text("""
+                CREATE UNIQUE INDEX IF NOT EXISTS uq_solicitacao_colaborador_tipo_data
+                ON solicitacao (colaborador_id, tipo_corrida, data_referencia)
+                WHERE status <> 'Cancelada'
+            """))
+            db.session.commit()
+            print("   ✅ Índice 'uq_solicitacao_colaborador_tipo_data' criado!")
+
+            print("\n" + "=" * 80)
+            print("✅ MIGRATION CONCLUÍDA COM SUCESSO!")
+            print("=" * 80)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ ERRO ao aplicar migration: {str(e)}")
+            print("\nDetalhes do erro:")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return True
+
+
+if __name__ == '__main__':
+    sucesso = aplicar_migration()
+    exit(0 if sucesso else 1)
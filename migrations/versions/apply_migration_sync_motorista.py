@@ -0,0 +1,72 @@
+"""
+Script para aplicar a estrutura do delta-sync do app do motorista.
+
+Este script:
+1. Cria a tabela 'viagem_exclusao' (viagens excluídas, devolvidas como
+   removidas para quem já as tinha no app)
+2. Adiciona a coluna 'versao' na tabela 'viagem' (versão da última
+   alteração, usada no ?since= da API /motorista/api/v1)
+3. Cria o índice de 'versao'
+
+Aplicar ANTES de publicar o código: toda gravação de viagem passa a
+preencher 'versao' (em SQLite, consultando também 'viagem_exclusao').
+
+Compatível com SQLite (desenvolvimento) e PostgreSQL (produção).
+"""
+
+from app import create_app, db
+from app.models import ViagemExclusao
+from sqlalchemy import text, inspect
+
+
+def aplicar_migration():
+    """Aplica a migration do delta-sync do motorista."""
+    app = create_app()
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATION: Delta-sync do app do motorista (versão das viagens)")
+        print("=" * 80)
+
+        try:
+            print("\n1️⃣ Criando tabela 'viagem_exclusao'...")
+            if 'viagem_exclusao' not in inspect(db.engine).get_table_names():
+                ViagemExclusao.__table__.create(db.engine)
+                print("   ✅ Tabela 'viagem_exclusao' criada com sucesso!")
+            else:
+                print("   ⚠️  Tabela 'viagem_exclusao' já existe. Pulando...")
+
+            print("\n2️⃣ Adicionando coluna 'versao' em 'viagem'...")
+            colunas = [c['name'] for c in inspect(db.engine).get_columns('viagem')]
+            if 'versao' not in colunas:
+                db.session.execute(text(
+                    'ALTER TABLE viagem ADD COLUMN versao BIGINT NOT NULL DEFAULT 0'))
+                db.session.commit()
+                print("   ✅ Coluna 'versao' adicionada com sucesso!")
+            else:
+                print("   ⚠️  Coluna 'versao' já existe. Pulando...")
+
+            print("\n3️⃣ Criando índice de 'versao'...")
+            db.session.execute(text(
+                'CREATE INDEX IF NOT EXISTS ix_viagem_versao ON viagem (versao)'))
+            db.session.commit()
+            print("   ✅ Índice 'ix_viagem_versao' criado!")
+
+            print("\n" + "=" * 80)
+            print("✅ MIGRATION CONCLUÍDA COM SUCESSO!")
+            print("=" * 80)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ ERRO ao aplicar migration: {str(e)}")
+            print("\nDetalhes do erro:")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return True
+
+
+if __name__ == '__main__':
+    sucesso = aplicar_migration()
+    exit(0 if sucesso else 1)
@@ -7,6 +7,7 @@ from sqlalchemy import text
 from flask_migrate import Migrate
 import logging
 from dotenv import load_dotenv
+from contextlib import contextmanager
 import os
 
 # Carrega .env automaticamente
@@ -61,6 +62,820 @@ def db_create():
             print("Admin 'admin@netyonsolutions.com' criado com sucesso!")
 
 
+@app.cli.command('audit-retencao')
+@click.option('--meses', type=int, default=None,
+              help='Meses mantidos no banco (padrão: AUDIT_RETENCAO_MESES).')
+@click.option('--pasta', default=None,
+              help='Diretório dos arquivos (padrão: AUDIT_ARQUIVO_DIR).')
+def audit_retencao(meses, pasta):
+    """Cria as partições futuras e arquiva os meses antigos da auditoria."""
+    from app.utils.audit_particoes import garantir_particoes, aplicar_retencao
+
+    particoes = garantir_particoes()
+    if particoes:
+        print(f'Partições verificadas: {", ".join(particoes)}')
+
+    arquivados = aplicar_retencao(meses_retencao=meses, pasta=pasta)
+    for registro in arquivados:
+        print(f'Arquivado {registro.tabela} {registro.periodo}: '
+              f'{registro.total_registros} registros -> {registro.arquivo}')
+    print(f'Retenção concluída ({len(arquivados)} partições arquivadas).')
+
+
+@app.cli.command('importar-cadastros')
+@click.argument('tipo', type=click.Choice(['colaboradores', 'supervisores', 'motoristas']))
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--sincronizar', is_flag=True,
+              help='Colaboradores: upsert por matrícula (atualiza o que mudou).')
+def importar_cadastros(tipo, arquivo, sincronizar):
+    """Importa um arquivo grande de cadastros sem o limite de tempo do HTTP."""
+    from app.utils import importacao
+
+    importadores = {
+        'colaboradores': importacao.importar_colaboradores,
+        'supervisores': importacao.importar_supervisores,
+        'motoristas': importacao.importar_motoristas,
+    }
+    if sincronizar:
+        if tipo != 'colaboradores':
+            raise click.UsageError('--sincronizar só é suportado para colaboradores.')
+        importadores['colaboradores'] = importacao.sincronizar_colaboradores
+
+    with open(arquivo, 'rb') as f:
+        resultado = importadores[tipo](
+            importacao.ler_linhas_arquivo(f, arquivo))
+
+    print(f'{resultado.adicionados} {tipo} importados, '
+          f'{resultado.atualizados} atualizados, '
+          f'{resultado.inalterados} inalterados, '
+          f'{resultado.ignorados} linhas ignoradas.')
+    for erro in resultado.erros:
+        print(f'  {erro}')
+
+
+@app.cli.command('repreciar-solicitacoes')
+@click.option('--bloco-id', type=int, default=None,
+              help='Restringe a um bloco (padrão: todos).')
+def repreciar_solicitacoes(bloco_id):
+    """Aplica as tarifas atuais às solicitações/viagens ainda sem motorista."""
+    from app.utils.tarifas import repreciar
+
+    solicitacoes, viagens = repreciar(bloco_id)
+    db.session.commit()
+    print(f'{solicitacoes} solicitações e {viagens} viagens repreciadas.')
+
+
+@app.cli.command('gerar-linhas-fixas')
+@click.option('--dias', type=int, default=7, show_default=True,
+              help='Quantidade de dias a gerar a partir de hoje.')
+def gerar_linhas_fixas(dias):
+    """Gera as solicitações FIXA dos próximos dias (agendar diariamente)."""
+    from app.utils.linhas_fixas import gerar_solicitacoes_fixas
+
+    resultado = gerar_solicitacoes_fixas(dias=dias)
+    print(f'{resultado.linhas} linhas fixas processadas de {resultado.inicio} '
+          f'a {resultado.fim}: {resultado.criadas} solicitações criadas, '
+          f'{resultado.ignoradas} já existiam.')
+
+
+@app.cli.command('gerar-token-api')
+@click.argument('email')
+def gerar_token_api(email):
+    """Gera (ou troca) o token de acesso à API de um usuário."""
+    user = User.query.filter_by(email=email).first()
+    if not user:
+        raise click.UsageError(f'Usuário {email} não encontrado.')
+    token = user.gerar_token_api()
+    db.session.commit()
+    print(f'Token de API de {email} ({user.role}) - guarde, ele não será exibido de novo:')
+    print(token)
+
+
+@app.cli.command('worker-notificacoes')
+@click.option('--uma-vez', is_flag=True,
+              help='Processa a fila até esvaziar e termina (ex: cron).')
+@click.option('--lote', type=int, default=None,
+              help='Mensagens reservadas por vez (padrão: NOTIFICACAO_LOTE).')
+@click.option('--reprocessar-falhas', is_flag=True,
+              help="Devolve as mensagens em 'Falha' para a fila e termina.")
+def worker_notificacoes(uma_vez, lote, reprocessar_falhas):
+    """Envia as notificações WhatsApp da fila (notificacao_outbox)."""
+    import signal
+    from app.config.whatsapp import NOTIFICACAO_LOTE
+    from app.services import notificacao_outbox
+    from app.services.whatsapp_gateway import EvolutionGateway
+
+    if reprocessar_falhas:
+        print(f'{notificacao_outbox.reprocessar_falhas()} mensagens devolvidas para a fila.')
+        return
+
+    gateway = EvolutionGateway()
+    if not gateway.configurado:
+        raise click.UsageError('EVOLUTION_API_URL não configurada.')
+
+    # SIGTERM/SIGINT: termina o lote atual e sai (o que não foi enviado
+    # volta para a fila quando a reserva expira)
+    parar = {'sinal': False}
+
+    def _parar(*_):
+        parar['sinal'] = True
+    signal.signal(signal.SIGTERM, _parar)
+    signal.signal(signal.SIGINT, _parar)
+
+    totais = notificacao_outbox.executar_worker(
+        gateway, quantidade=lote or NOTIFICACAO_LOTE,
+        espera_ociosa=None if uma_vez else 5, parar=lambda: parar['sinal'])
+    print(f'{totais.enviadas} enviadas, {totais.reagendadas} reagendadas, '
+          f'{totais.falhas} em falha. Fila: {notificacao_outbox.resumo_fila()}')
+
+
+@app.cli.command('benchmark-notificacoes')
+@click.option('--mensagens', type=int, default=500, show_default=True,
+              help='Mensagens (1 por colaborador, ex: confirmação de um turno).')
+@click.option('--lote', type=int, default=None,
+              help='Mensagens reservadas por vez (padrão: NOTIFICACAO_LOTE).')
+@click.option('--concorrencia', type=int, default=None,
+              help='Envios simultâneos (padrão: WHATSAPP_CONCORRENCIA).')
+@click.option('--intervalo', type=float, default=None,
+              help='Segundos entre mensagens do mesmo destino (padrão: WHATSAPP_MESSAGE_INTERVAL).')
+@click.option('--latencia', type=float, default=0.02, show_default=True,
+              help='Latência simulada do gateway, em segundos.')
+def benchmark_notificacoes(mensagens, lote, concorrencia, intervalo, latencia):
+    """Mede a vazão do worker contra um gateway simulado local."""
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from app.config.whatsapp import (NOTIFICACAO_LOTE, WHATSAPP_CONCORRENCIA,
+                                     WHATSAPP_MESSAGE_INTERVAL)
+    from app.models import NotificacaoOutbox
+    from app.services import notificacao_outbox
+    from app.services.whatsapp_gateway import EvolutionGateway
+
+    if intervalo is None:
+        intervalo = WHATSAPP_MESSAGE_INTERVAL
+    conexoes = {'total': 0}
+
+    class GatewaySimulado(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # mantém a conexão aberta (keep-alive)
+        disable_nagle_algorithm = True  # como um servidor HTTP de verdade
+
+        def setup(self):
+            super().setup()
+            conexoes['total'] += 1
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(latencia)
+            self.send_response(201)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), GatewaySimulado)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{servidor.server_port}'
+    canal = 'benchmark'
+
+    def medir(gateway, threads, primeiro_telefone):
+        conexoes['total'] = 0
+        try:
+            # Telefones novos a cada cenário: o intervalo por destino vale
+            # entre cenários também
+            for i in range(mensagens):
+                notificacao_outbox.enfileirar(f'5511{primeiro_telefone + i}', f'Benchmark {i}',
+                                              'benchmark', canal=canal, janela=0)
+            db.session.commit()
+
+            inicio = time.perf_counter()
+            totais = notificacao_outbox.executar_worker(
+                gateway, quantidade=lote or NOTIFICACAO_LOTE, canal=canal,
+                intervalo=intervalo, espera_ociosa=None, concorrencia=threads)
+            duracao = time.perf_counter() - inicio
+        finally:
+            NotificacaoOutbox.query.filter_by(canal=canal).delete()
+            db.session.commit()
+            gateway.fechar()
+        return totais.enviadas, duracao, conexoes['total']
+
+    # Referência: uma mensagem por vez e uma conexão por mensagem (como o
+    # requests.post sem Session)
+    sem_pool = EvolutionGateway(url=url, api_key='benchmark', instancia='benchmark',
+                                concorrencia=1)
+    sem_pool.sessao.headers['Connection'] = 'close'
+    threads = concorrencia or WHATSAPP_CONCORRENCIA
+    cenarios = [
+        ('sequencial, sem keep-alive', medir(sem_pool, 1, 900000000)),
+        (f'pool, concorrência {threads}', medir(
+            EvolutionGateway(url=url, api_key='benchmark', instancia='benchmark',
+                             concorrencia=threads), threads, 900000000 + mensagens)),
+    ]
+    servidor.shutdown()
+
+    print(f'{mensagens} mensagens, latência simulada {latencia * 1000:.0f} ms, '
+          f'intervalo por destino {intervalo}s:')
+    for nome, (enviadas, duracao, total_conexoes) in cenarios:
+        print(f'  {nome:<28} {enviadas} enviadas em {duracao:6.2f}s '
+              f'({enviadas / duracao:7.1f} msg/s, {total_conexoes} conexões)')
+
+
+@app.cli.command('benchmark-financeiro')
+@click.option('--viagens', type=int, default=100000, show_default=True,
+              help='Viagens já faturadas e pagas (vinculadas a títulos).')
+@click.option('--pendentes', type=int, default=200, show_default=True,
+              help='Viagens do período ainda sem título.')
+@click.option('--repeticoes', type=int, default=5, show_default=True,
+              help='Execuções de cada busca (mostra a mediana).')
+def benchmark_financeiro(viagens, pendentes, repeticoes):
+    """Compara a busca de viagens sem título: NOT IN (ids) x NOT EXISTS (banco temporário)."""
+    import statistics
+    import time
+    from datetime import date, datetime, timedelta
+    from app.models import (Empresa, Planta, Motorista, Viagem, FinContasReceber,
+                            FinReceberViagens, FinContasPagar, FinPagarViagens)
+    from app.services.financeiro import viagens_a_faturar, viagens_a_pagar
+
+    with _app_rascunho():
+        usuario = User(email='benchmark@benchmark', password='-', role='admin')
+        empresa = Empresa(nome='Benchmark financeiro')
+        db.session.add_all([usuario, empresa])
+        db.session.flush()
+        planta = Planta(nome='Benchmark', empresa_id=empresa.id)
+        motorista = Motorista(user_id=usuario.id, nome='Benchmark', cpf_cnpj='00000000000',
+                              email=usuario.email)
+        db.session.add_all([planta, motorista])
+        db.session.flush()
+        titulo_receber = FinContasReceber(
+            numero_titulo='BENCH-0001', empresa_id=empresa.id, valor_total=0,
+            data_emissao=date.today(), data_vencimento=date.today(),
+            created_by_user_id=usuario.id)
+        titulo_pagar = FinContasPagar(
+            numero_titulo='BENCH-0001', motorista_id=motorista.id, valor_total=0,
+            data_emissao=date.today(), data_vencimento=date.today(),
+            created_by_user_id=usuario.id)
+        db.session.add_all([titulo_receber, titulo_pagar])
+        db.session.flush()
+
+        print(f'Gravando {viagens} viagens faturadas e {pendentes} pendentes...')
+        fim = datetime.now().replace(microsecond=0)
+        inicio_periodo = fim - timedelta(days=30)
+        linhas = [{
+            'id': i + 1, 'empresa_id': empresa.id, 'planta_id': planta.id,
+            'motorista_id': motorista.id, 'tipo_linha': 'FIXA', 'tipo_corrida': 'entrada',
+            'quantidade_passageiros': 1, 'valor': 50, 'valor_repasse': 30,
+            'status': 'Finalizada', 'versao': 0,
+            # As faturadas antes do período, as pendentes dentro dele
+            'data_criacao': (fim - timedelta(days=31 + i % 700) if i < viagens
+                             else fim - timedelta(minutes=i - viagens)),
+        } for i in range(viagens + pendentes)]
+        db.session.execute(Viagem.__table__.insert(), linhas)
+        db.session.execute(FinReceberViagens.__table__.insert(), [
+            {'conta_receber_id': titulo_receber.id, 'viagem_id': i + 1,
+             'valor_viagem': 50} for i in range(viagens)])
+        db.session.execute(FinPagarViagens.__table__.insert(), [
+            {'conta_pagar_id': titulo_pagar.id, 'viagem_id': i + 1,
+             'valor_repasse': 30} for i in range(viagens)])
+        del linhas
+        db.session.commit()
+
+        # Versão anterior: carrega todos os ids vinculados e filtra com NOT IN
+        def not_in(vinculo, filtro):
+            ids = [v[0] for v in db.session.query(vinculo.viagem_id).all()]
+            return Viagem.query.options(db.joinedload(Viagem.hora_parada)).filter(
+                filtro, Viagem.status == 'Finalizada',
+                Viagem.data_criacao >= inicio_periodo, Viagem.data_criacao <= fim,
+                ~Viagem.id.in_(ids) if ids else True
+            ).order_by(Viagem.data_criacao.desc()).all()
+
+        def medir(busca):
+            tempos = []
+            for _ in range(repeticoes):
+                db.session.expunge_all()
+                inicio = time.perf_counter()
+                try:
+                    encontradas = len(busca())
+                except Exception as e:
+                    db.session.rollback()
+                    return f'falhou ({type(e).__name__}: {str(e).splitlines()[0][:60]})'
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            return f'{statistics.median(tempos):9.1f} ms ({encontradas} viagens)'
+
+        empresa_id, motorista_id = empresa.id, motorista.id
+        cenarios = [
+            ('receber, NOT IN (ids)',
+             lambda: not_in(FinReceberViagens, Viagem.empresa_id == empresa_id)),
+            ('receber, NOT EXISTS',
+             lambda: viagens_a_faturar(empresa_id, inicio_periodo, fim)),
+            ('pagar, NOT IN (ids)',
+             lambda: not_in(FinPagarViagens, Viagem.motorista_id == motorista_id)),
+            ('pagar, NOT EXISTS',
+             lambda: viagens_a_pagar(motorista_id, inicio_periodo, fim)),
+        ]
+        resultados = [(nome, medir(busca)) for nome, busca in cenarios]
+
+        print(f'{viagens} viagens faturadas/pagas, {pendentes} pendentes no período, '
+              f'mediana de {repeticoes} execuções ({db.engine.dialect.name}):')
+        for nome, resultado in resultados:
+            print(f'  {nome:<24} {resultado}')
+
+
+@app.cli.command('verificar-numeracao')
+@click.option('--serie', type=click.Choice(['REC', 'PAG']), default='REC', show_default=True)
+@click.option('--threads', type=int, default=8, show_default=True,
+              help='Gerações simultâneas.')
+@click.option('--por-thread', type=int, default=25, show_default=True,
+              help='Números gerados por thread (um commit por número).')
+@click.option('--ano', type=int, default=1999, show_default=True,
+              help='Ano sem títulos, usado só pela verificação (o contador é removido no final).')
+def verificar_numeracao(serie, threads, por_thread, ano):
+    """Gera números em paralelo e confere se são únicos, consecutivos e por ano."""
+    import threading
+    from datetime import date
+    from sqlalchemy import text
+    from app.models import FinNumeracao
+    from app.utils import numeracao
+
+    anos = (ano, ano + 1)
+    if any(numeracao.maior_numero_usado(serie, a) for a in anos):
+        raise click.ClickException(f'Já existem títulos {serie} em {ano}/{ano + 1}; use outro --ano.')
+
+    def limpar():
+        db.session.rollback()
+        for a in anos:
+            if db.engine.dialect.name == 'postgresql':
+                nome = numeracao.nome_sequence(serie, a)
+                db.session.execute(text(f'DROP SEQUENCE IF EXISTS {nome}'))
+                numeracao._sequences_criadas.discard(nome)
+            else:
+                FinNumeracao.query.filter_by(serie=serie, ano=a).delete()
+        db.session.commit()
+
+    gerados, erros = [], []
+
+    def gerar():
+        with app.app_context():
+            for _ in range(por_thread):
+                try:
+                    gerados.append(numeracao.proximo_numero_titulo(serie, date(ano, 12, 31)))
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    erros.append(f'{type(e).__name__}: {e}')
+
+    limpar()
+    try:
+        trabalhadores = [threading.Thread(target=gerar) for _ in range(threads)]
+        for trabalhador in trabalhadores:
+            trabalhador.start()
+        for trabalhador in trabalhadores:
+            trabalhador.join()
+        # Virada do ano: o ano seguinte recomeça em 0001
+        seguinte = numeracao.proximo_numero_titulo(serie, date(ano + 1, 1, 1))
+        db.session.commit()
+    finally:
+        limpar()
+
+    total = threads * por_thread
+    esperados = [f'{serie}-{ano}-{str(n).zfill(4)}' for n in range(1, total + 1)]
+    falhas = []
+    if erros:
+        falhas.append(f'{len(erros)} gerações falharam (ex: {erros[0]})')
+    if len(set(gerados)) != len(gerados):
+        falhas.append(f'{len(gerados) - len(set(gerados))} números repetidos')
+    if sorted(gerados) != esperados:
+        falhas.append(f'números fora da sequência {esperados[0]}..{esperados[-1]}')
+    if seguinte != f'{serie}-{ano + 1}-0001':
+        falhas.append(f'{ano + 1} começou em {seguinte}, e não em 0001')
+
+    print(f'{len(gerados)} números {serie}-{ano} em {threads} threads '
+          f'({db.engine.dialect.name}); primeiro de {ano + 1}: {seguinte}')
+    if falhas:
+        for falha in falhas:
+            print(f'  ❌ {falha}')
+        raise SystemExit(1)
+    print(f'  ✅ únicos e consecutivos de {esperados[0]} a {esperados[-1]}')
+
+
+@contextmanager
+def _app_rascunho(**variaveis):
+    """
+    App num banco SQLite temporário, com as tabelas criadas, para as
+    verificações e benchmarks que gravam dados. `variaveis` são variáveis
+    de ambiente lidas pelo create_app ({pasta} é a pasta temporária).
+    """
+    import shutil
+    import tempfile
+
+    pasta = tempfile.mkdtemp(prefix='gomobi-')
+    variaveis = {'DATABASE_URL': 'sqlite:///{pasta}/rascunho.db', **variaveis}
+    anteriores = {nome: os.environ.get(nome) for nome in variaveis}
+    os.environ.update({nome: valor.format(pasta=pasta) for nome, valor in variaveis.items()})
+    try:
+        rascunho = create_app()
+    finally:
+        for nome, valor in anteriores.items():
+            if valor is None:
+                os.environ.pop(nome, None)
+            else:
+                os.environ[nome] = valor
+    rascunho.config['WTF_CSRF_ENABLED'] = False
+
+    try:
+        with rascunho.app_context():
+            db.create_all()
+            yield rascunho, pasta
+            db.session.remove()
+            for engine in {db.get_engine(rascunho, bind=bind)
+                           for bind in [None, *(rascunho.config.get('SQLALCHEMY_BINDS') or {})]}:
+                engine.dispose()
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+@app.cli.command('verificar-aceite')
+@click.option('--motoristas', type=int, default=20, show_default=True,
+              help='Motoristas aceitando a mesma viagem ao mesmo tempo.')
+def verificar_aceite(motoristas):
+    """Aceites simultâneos: só um motorista fica com a viagem (banco temporário)."""
+    import threading
+    from collections import Counter
+    from datetime import datetime, time as hora, timedelta
+    from app.models import (Empresa, Planta, Bloco, Gerente, Supervisor, Motorista,
+                            Colaborador, Solicitacao, Viagem)
+
+    with _app_rascunho() as (rascunho, _):
+        empresa = Empresa(nome='Verificação')
+        db.session.add(empresa)
+        db.session.flush()
+        planta = Planta(nome='Verificação', empresa_id=empresa.id)
+        bloco = Bloco(codigo_bloco='V1', nome_bloco='Verificação', empresa_id=empresa.id)
+        usuario_gerente = User(email='gerente@verificacao', password='-', role='gerente')
+        usuario_supervisor = User(email='supervisor@verificacao', password='-', role='supervisor')
+        db.session.add_all([planta, bloco, usuario_gerente, usuario_supervisor])
+        db.session.flush()
+        gerente = Gerente(user_id=usuario_gerente.id, nome='Gerente',
+                          email=usuario_gerente.email, empresa_id=empresa.id)
+        db.session.add(gerente)
+        db.session.flush()
+        supervisor = Supervisor(user_id=usuario_supervisor.id, nome='Supervisor', matricula='S1',
+                                email=usuario_supervisor.email, empresa_id=empresa.id,
+                                planta_id=planta.id, gerente_id=gerente.id)
+        db.session.add(supervisor)
+        motoristas_ids = []
+        for i in range(motoristas):
+            usuario = User(email=f'motorista{i}@verificacao', password='-', role='motorista')
+            db.session.add(usuario)
+            db.session.flush()
+            motorista = Motorista(user_id=usuario.id, nome=f'Motorista {i}', cpf_cnpj=f'{i:011d}',
+                                  email=usuario.email, veiculo_placa=f'VRF{i:04d}')
+            db.session.add(motorista)
+            db.session.flush()
+            motoristas_ids.append((usuario.id, motorista.id))
+
+        amanha = datetime.combine(datetime.now().date() + timedelta(days=1), hora(6))
+
+        def nova_viagem():
+            colaborador = Colaborador(matricula=f'C{Colaborador.query.count() + 1}',
+                                      nome='Colaborador', empresa_id=empresa.id,
+                                      planta_id=planta.id, bloco_id=bloco.id)
+            viagem = Viagem(empresa_id=empresa.id, planta_id=planta.id, bloco_id=bloco.id,
+                            tipo_linha='FIXA', tipo_corrida='entrada', horario_entrada=amanha,
+                            quantidade_passageiros=1, colaboradores_ids='[]', status='Pendente')
+            db.session.add_all([colaborador, viagem])
+            db.session.flush()
+            db.session.add(Solicitacao(
+                colaborador_id=colaborador.id, supervisor_id=supervisor.id,
+                empresa_id=empresa.id, planta_id=planta.id, bloco_id=bloco.id,
+                tipo_linha='FIXA', tipo_corrida='entrada', horario_entrada=amanha,
+                status='Agrupada', viagem_id=viagem.id))
+            return viagem.id
+
+        disputada = nova_viagem()
+        # Duas viagens no mesmo horário para um motorista com duas abas abertas
+        abas = [nova_viagem(), nova_viagem()]
+        db.session.commit()
+
+        def aceitar(usuario_id, viagem_id, barreira, respostas):
+            cliente = rascunho.test_client()
+            with cliente.session_transaction() as sessao:
+                sessao['_user_id'] = str(usuario_id)
+                sessao['_fresh'] = True
+            barreira.wait()
+            resposta = cliente.post(f'/motorista/viagens/{viagem_id}/aceitar')
+            respostas.append((resposta.status_code, (resposta.get_json() or {}).get('sucesso')))
+
+        def disparar(pedidos):
+            barreira, respostas = threading.Barrier(len(pedidos)), []
+            trabalhadores = [threading.Thread(target=aceitar, args=(*pedido, barreira, respostas))
+                             for pedido in pedidos]
+            for trabalhador in trabalhadores:
+                trabalhador.start()
+            for trabalhador in trabalhadores:
+                trabalhador.join()
+            return Counter(respostas)
+
+        falhas = []
+        respostas = disparar([(usuario_id, disputada) for usuario_id, _ in motoristas_ids])
+        db.session.expire_all()
+        viagem = db.session.get(Viagem, disputada)
+        vencedores = [motorista_id for _, motorista_id in motoristas_ids
+                      if motorista_id == viagem.motorista_id]
+        print(f'{motoristas} motoristas aceitando a viagem #{disputada}: {dict(respostas)}')
+        if respostas != Counter({(200, True): 1, (409, False): motoristas - 1}):
+            falhas.append('esperado um 200 e os demais 409')
+        if viagem.status != 'Agendada' or len(vencedores) != 1:
+            falhas.append(f'viagem ficou {viagem.status} com o motorista {viagem.motorista_id}')
+        if {s.status for s in viagem.solicitacoes} != {'Agendada'}:
+            falhas.append('solicitações da viagem não ficaram Agendada')
+        # As solicitações das outras viagens não foram tocadas pelos perdedores
+        if Solicitacao.query.filter(Solicitacao.status == 'Agendada',
+                                    Solicitacao.viagem_id != disputada).count():
+            falhas.append('solicitações de outra viagem ficaram Agendada')
+
+        usuario_id, motorista_id = next(
+            par for par in motoristas_ids if par[1] != viagem.motorista_id)
+        respostas = disparar([(usuario_id, viagem_id) for viagem_id in abas])
+        db.session.expire_all()
+        aceitas = Viagem.query.filter(Viagem.id.in_(abas), Viagem.motorista_id == motorista_id).count()
+        print(f'Mesmo motorista, duas viagens no mesmo horário: {dict(respostas)}')
+        if aceitas != 1 or respostas != Counter({(200, True): 1, (400, False): 1}):
+            falhas.append(f'{aceitas} viagens no mesmo horário aceitas pelo mesmo motorista')
+
+    if falhas:
+        for falha in falhas:
+            print(f'  ❌ {falha}')
+        raise SystemExit(1)
+    print('  ✅ um aceite por viagem e por horário')
+
+
+@app.cli.command('benchmark-importacao')
+@click.option('--linhas', type=int, default=100000, show_default=True,
+              help='Linhas do CSV de colaboradores gerado.')
+@click.option('--lote', type=int, default=None,
+              help='Linhas por lote (padrão: TAMANHO_LOTE).')
+def benchmark_importacao(linhas, lote):
+    """Mede importar_colaboradores com um CSV gerado (banco temporário)."""
+    import csv
+    import time
+    from app.models import Empresa, Planta, Bloco, Colaborador
+    from app.utils import importacao
+
+    with _app_rascunho() as (_, pasta):
+        empresa = Empresa(nome='Benchmark')
+        db.session.add(empresa)
+        db.session.flush()
+        db.session.add_all([
+            Planta(nome='Planta 1', empresa_id=empresa.id),
+            Bloco(codigo_bloco='A1', nome_bloco='A1', empresa_id=empresa.id)])
+        db.session.commit()
+
+        arquivo = os.path.join(pasta, 'colaboradores.csv')
+        with open(arquivo, 'w', newline='', encoding='utf-8-sig') as f:
+            escritor = csv.writer(f, delimiter=';')
+            escritor.writerow(['matricula', 'nome', 'empresa', 'planta', 'email', 'telefone',
+                               'endereco', 'nro', 'bairro', 'cidade', 'uf', 'bloco', 'status'])
+            for i in range(linhas):
+                # 1% com bloco desconhecido (aviso) e a última repete a primeira matrícula
+                matricula = i if i < linhas - 1 else 0
+                escritor.writerow([
+                    f'{matricula:08d}', f'Colaborador {i}',
+                    'Benchmark', 'Planta 1', f'colaborador{i}@benchmark', '11999999999',
+                    'Rua Benchmark', str(i), 'Centro', 'São Paulo', 'SP',
+                    'ZZ' if i % 100 == 99 else 'A1', 'Ativo'])
+
+        with open(arquivo, 'rb') as f:
+            inicio = time.perf_counter()
+            resultado = importacao.importar_colaboradores(
+                importacao.ler_linhas_arquivo(f, arquivo),
+                tamanho_lote=lote or importacao.TAMANHO_LOTE)
+            duracao = time.perf_counter() - inicio
+        gravados = Colaborador.query.count()
+
+    print(f'{linhas} linhas, lotes de {lote or importacao.TAMANHO_LOTE} '
+          f'(sqlite temporário): {duracao:.2f}s ({linhas / duracao:,.0f} linhas/s)')
+    print(f'  {resultado.adicionados} adicionados, {resultado.ignorados} ignorados, '
+          f'{len(resultado.erros)} erros/avisos, {gravados} no banco')
+
+
+@app.cli.command('verificar-replica')
+def verificar_replica():
+    """Confere o roteamento primário x réplica da SessaoRoteada (dois SQLite temporários)."""
+    from sqlalchemy import insert, select
+    from app import BIND_REPLICA
+    from app.decorators import somente_leitura
+    from app.models import Empresa
+
+    with _app_rascunho(DATABASE_REPLICA_URL='sqlite:///{pasta}/replica.db') as (rascunho, _):
+        bancos = [(db.get_engine(rascunho), 'primário'),
+                  (db.get_engine(rascunho, bind=BIND_REPLICA), 'réplica')]
+        db.Model.metadata.create_all(bancos[1][0])
+        # A mesma empresa nos dois bancos, com o nome do banco
+        for engine, rotulo in bancos:
+            with engine.begin() as conexao:
+                conexao.execute(insert(Empresa.__table__).values(id=1, nome=rotulo))
+
+        def gravada_em(nome):
+            """Banco(s) onde a empresa `nome` foi gravada."""
+            encontrados = []
+            for engine, rotulo in bancos:
+                with engine.connect() as conexao:
+                    if conexao.execute(select(Empresa.id).where(Empresa.nome == nome)).first():
+                        encontrados.append(rotulo)
+            return ' e '.join(encontrados) or 'nenhum'
+
+        def flush():
+            db.session.add(Empresa(nome='flush'))
+            db.session.commit()
+            return gravada_em('flush')
+
+        def dml():
+            db.session.execute(insert(Empresa).values(nome='dml', status='Ativo'))
+            db.session.commit()
+            return gravada_em('dml')
+
+        def sem_replica_configurada():
+            binds = rascunho.config['SQLALCHEMY_BINDS']
+            rascunho.config['SQLALCHEMY_BINDS'] = None
+            try:
+                return db.session.get(Empresa, 1).nome
+            finally:
+                rascunho.config['SQLALCHEMY_BINDS'] = binds
+
+        verificacoes = [
+            ('sem @somente_leitura', 'primário', lambda: db.session.get(Empresa, 1).nome),
+            ('consulta do ORM', 'réplica', somente_leitura(
+                lambda: db.session.get(Empresa, 1).nome)),
+            ('select() do Core', 'réplica', somente_leitura(
+                lambda: db.session.execute(select(Empresa.nome).where(Empresa.id == 1)).scalar())),
+            ('SELECT ... FOR UPDATE', 'primário', somente_leitura(
+                lambda: Empresa.query.filter_by(id=1).with_for_update().one().nome)),
+            ('session.connection()', 'primário', somente_leitura(
+                lambda: db.session.connection().execute(
+                    select(Empresa.nome).where(Empresa.id == 1)).scalar())),
+            ('flush do ORM', 'primário', somente_leitura(flush)),
+            ('INSERT/UPDATE/DELETE', 'primário', somente_leitura(dml)),
+            ('sem DATABASE_REPLICA_URL', 'primário', somente_leitura(sem_replica_configurada)),
+        ]
+        falhas = 0
+        for descricao, esperado, verificacao in verificacoes:
+            db.session.remove()
+            obtido = verificacao()
+            falhas += obtido != esperado
+            print(f"  {'✅' if obtido == esperado else '❌'} {descricao:<26} {obtido}"
+                  + ('' if obtido == esperado else f' (esperado: {esperado})'))
+
+    if falhas:
+        raise SystemExit(1)
+
+
+def _periodo(mes, inicio, fim):
+    """(início, fim exclusivo) a partir de --mes AAAA-MM ou --inicio/--fim."""
+    from datetime import datetime, timedelta
+
+    if mes:
+        try:
+            primeiro = datetime.strptime(mes, '%Y-%m')
+        except ValueError:
+            raise click.BadParameter('use o formato AAAA-MM', param_hint='--mes')
+        proximo = (primeiro + timedelta(days=32)).replace(day=1)
+        return primeiro, proximo
+    if not inicio or not fim:
+        raise click.UsageError('Informe --mes ou --inicio e --fim.')
+    return inicio, fim + timedelta(days=1)
+
+
+def _gravar_csv(arquivo, cabecalho, linhas):
+    import csv
+
+    # utf-8-sig: BOM para o Excel
+    with open(arquivo, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(cabecalho)
+        writer.writerows(linhas)
+
+
+@app.cli.command('faturar-periodo')
+@click.option('--mes', default=None, help='Mês das viagens (AAAA-MM).')
+@click.option('--inicio', type=click.DateTime(['%Y-%m-%d']), default=None,
+              help='Primeiro dia do período (em vez de --mes).')
+@click.option('--fim', type=click.DateTime(['%Y-%m-%d']), default=None,
+              help='Último dia do período, inclusive (em vez de --mes).')
+@click.option('--vencimento', type=click.DateTime(['%Y-%m-%d']), default=None,
+              help='Vencimento dos títulos (AAAA-MM-DD).')
+@click.option('--usuario', default=None,
+              help='E-mail do usuário registrado como criador dos títulos.')
+@click.option('--empresa-id', type=int, multiple=True,
+              help='Restringe a uma empresa (pode repetir; padrão: todas).')
+@click.option('--simular', is_flag=True,
+              help='Mostra os títulos que seriam gerados, sem gravar.')
+@click.option('--csv', 'arquivo_csv', type=click.Path(dir_okay=False), default=None,
+              help='Grava o resumo num arquivo CSV.')
+def faturar_periodo(mes, inicio, fim, vencimento, usuario, empresa_id, simular,
+                    arquivo_csv):
+    """Gera os títulos a receber do período para todas as empresas."""
+    from app.services.financeiro import faturar_periodo as faturar
+
+    inicio, fim = _periodo(mes, inicio, fim)
+    user = None
+    if not simular:
+        if not vencimento or not usuario:
+            raise click.UsageError('--vencimento e --usuario são obrigatórios (ou use --simular).')
+        user = User.query.filter_by(email=usuario).first()
+        if not user:
+            raise click.UsageError(f'Usuário {usuario} não encontrado.')
+
+    try:
+        resultado = faturar(inicio, fim, vencimento.date() if vencimento else None,
+                            user.id if user else None, list(empresa_id), simular)
+        if simular:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    titulo = 'Simulação do faturamento' if simular else 'Faturamento'
+    print(f'{titulo} de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y} (exclusivo):')
+    for t in resultado.titulos:
+        print(f"  {t['numero'] or '-':<16} {t['empresa'][:40]:<40} "
+              f"{t['viagens']:>6} viagens  R$ {t['valor']:>12,.2f}")
+    print(f'{len(resultado.titulos)} títulos, {resultado.viagens} viagens, '
+          f'R$ {resultado.valor_total:,.2f}.')
+    if not resultado.titulos:
+        print('Nenhuma viagem finalizada sem título no período.')
+
+    if arquivo_csv:
+        _gravar_csv(arquivo_csv, ['Título', 'Empresa', 'Viagens', 'Valor'], [
+            [t['numero'] or '', t['empresa'], t['viagens'], f"{t['valor']:.2f}".replace('.', ',')]
+            for t in resultado.titulos])
+        print(f'Resumo gravado em {arquivo_csv}.')
+
+
+@app.cli.command('pagar-periodo')
+@click.option('--inicio', type=click.DateTime(['%Y-%m-%d']), default=None,
+              help='Primeiro dia do período (ex: quinzena).')
+@click.option('--fim', type=click.DateTime(['%Y-%m-%d']), default=None,
+              help='Último dia do período, inclusive.')
+@click.option('--mes', default=None, help='Mês das viagens (AAAA-MM), em vez de --inicio/--fim.')
+@click.option('--vencimento', type=click.DateTime(['%Y-%m-%d']), default=None,
+              help='Data do pagamento dos títulos (AAAA-MM-DD).')
+@click.option('--usuario', default=None,
+              help='E-mail do usuário registrado como criador dos títulos.')
+@click.option('--motorista-id', type=int, multiple=True,
+              help='Restringe a um motorista (pode repetir; padrão: todos).')
+@click.option('--simular', is_flag=True,
+              help='Mostra os títulos que seriam gerados, sem gravar.')
+@click.option('--arquivo', type=click.Path(dir_okay=False), default=None,
+              help='Arquivo de pagamento (CSV) com os títulos gerados.')
+def pagar_periodo(inicio, fim, mes, vencimento, usuario, motorista_id, simular, arquivo):
+    """Gera os títulos a pagar (repasse) do período para todos os motoristas."""
+    from app.services.financeiro import pagar_periodo as pagar
+
+    inicio, fim = _periodo(mes, inicio, fim)
+    user = None
+    if not simular:
+        if not vencimento or not usuario:
+            raise click.UsageError('--vencimento e --usuario são obrigatórios (ou use --simular).')
+        user = User.query.filter_by(email=usuario).first()
+        if not user:
+            raise click.UsageError(f'Usuário {usuario} não encontrado.')
+
+    try:
+        resultado = pagar(inicio, fim, vencimento.date() if vencimento else None,
+                          user.id if user else None, list(motorista_id), simular)
+        if simular:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    titulo = 'Simulação do repasse' if simular else 'Repasse'
+    print(f'{titulo} de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y} (exclusivo):')
+    for t in resultado.titulos:
+        print(f"  {t['numero'] or '-':<16} {t['motorista'][:40]:<40} "
+              f"{t['viagens']:>6} viagens  R$ {t['valor']:>12,.2f}"
+              f"{'' if t['chave_pix'] else '  (sem chave PIX)'}")
+    print(f'{len(resultado.titulos)} títulos, {resultado.viagens} viagens, '
+          f'R$ {resultado.valor_total:,.2f}.')
+    if not resultado.titulos:
+        print('Nenhuma viagem finalizada sem repasse no período.')
+
+    if arquivo:
+        _gravar_csv(arquivo, ['Título', 'Motorista', 'CPF/CNPJ', 'Chave PIX', 'Viagens',
+                              'Valor', 'Data do pagamento'], [
+            [t['numero'] or '', t['motorista'], t['cpf_cnpj'], t['chave_pix'] or '',
+             t['viagens'], f"{t['valor']:.2f}".replace('.', ','),
+             f'{vencimento:%d/%m/%Y}' if vencimento else '']
+            for t in resultado.titulos])
+        print(f'Arquivo de pagamento gravado em {arquivo}.')
+
 # =============================================================================
 # EXECUÇÃO DA APLICAÇÃO
 # =============================================================================